@@ -0,0 +1,64 @@
+"""
+Admin Endpoints
+Request profiling control and profile artifacts. Every endpoint requires the
+X-Admin-Token header to match ADMIN_TOKEN; without ADMIN_TOKEN they are disabled.
+"""
+
+import logging
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+from app.services.profiler import (
+    get_profile_store, get_sample_rate, is_admin_token, set_sample_rate,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Geçersiz veya eksik admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+class ProfilingSettings(BaseModel):
+    sample_rate: float = Field(ge=0.0, le=1.0, description="Profiled fraction of requests (0 disables sampling)")
+
+
+@router.get("/profiling")
+def get_profiling_settings():
+    return {"sample_rate": get_sample_rate()}
+
+
+@router.put("/profiling")
+def update_profiling_settings(settings: ProfilingSettings):
+    """Turn sampled profiling on/off for this worker at runtime"""
+    set_sample_rate(settings.sample_rate)
+    logger.info("🔬 Profiling sample rate set to %s", settings.sample_rate)
+    return {"sample_rate": get_sample_rate()}
+
+
+@router.get("/profiles")
+def list_profiles():
+    """Stored profiles, newest first (without stacks)"""
+    return {"profiles": get_profile_store().list()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = "json"):
+    """
+    A profile artifact. format=folded returns only the folded stacks, ready for
+    flamegraph.pl or speedscope; json also includes the agent steps and timings.
+    """
+    artifact = get_profile_store().load(profile_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    if format == "folded":
+        return PlainTextResponse(
+            artifact["folded"] + "\n",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+        )
+    return artifact
@@ -1,36 +1,145 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.models import ChatRequest, ChatResponse, ExecuteSQLRequest, ExecuteSQLResponse
 from app.services.agent import build_agent
-from app.services.memory import create_memory_backend, AbstractChatMemory
+from app.services.direct_sql import generate_sql
+from app.services.speculative import get_speculative_executor
+from app.services.chart_builder import ChartBuilder
+from app.services.export import EXPORT_FORMATS, open_export_cursor, stream_export
+from app.services.sql_executor import QueryResult, execute_query, validate_read_only_sql
+from app.services.async_memory import create_async_memory_backend, AsyncAbstractChatMemory
+from app.services.tiered_memory import TwoTierChatMemory
+from app.services.history_summary import HistorySummarizer
+from app.services.llm_cache import get_llm_cache
+from app.services.metrics import agent_metrics_handler, track_stage
+from app.services.profiler import profile_callbacks, profile_thread
+from app.services.query_templates import TemplateMatch, get_query_template_matcher
+from app.services.llm_scheduler import (
+    LLMDeadlineExceededError, LLMQueueFullError, get_llm_scheduler,
+)
 from app.services.user_database import get_user_database_service
-from app.core.config import MEMORY_BACKEND, REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, DB_PATH
-import json
+from app.core.logging_config import VERBOSE, bind_session
+from app.core.config import (
+    MEMORY_BACKEND, REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD, DB_PATH,
+    REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL,
+    CHAT_HISTORY_TTL, CHAT_HISTORY_MAX_MESSAGES, CHAT_COMPRESS_THRESHOLD,
+    MEMORY_MAX_SESSIONS, MEMORY_IDLE_TTL, MEMORY_MAX_BYTES,
+    MEMORY_L1_CACHE_ENABLED, MEMORY_L1_MAX_SESSIONS, MEMORY_L1_TTL,
+    SQLITE_MEMORY_PATH, SQLITE_MEMORY_CLEANUP_INTERVAL, SQLITE_MEMORY_BUSY_TIMEOUT,
+    CHAT_HISTORY_WINDOW, CHAT_HISTORY_MAX_TOKENS, CHAT_SUMMARY_THRESHOLD,
+    LLM_BACKEND, CHAT_REQUEST_DEADLINE, QUERY_TEMPLATES_ENABLED, AGENT_MODE,
+    SPECULATIVE_EXECUTION_ENABLED, EXECUTE_PREVIEW_ROWS,
+)
+import importlib.util
+import logging
 import re
+import sqlite3
+import time
 import uuid
-from typing import Dict
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_community.utilities import SQLDatabase
+from typing import List, Optional, Tuple
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize memory backend based on configuration
-try:
-    if MEMORY_BACKEND.lower() == "redis":
-        memory_backend: AbstractChatMemory = create_memory_backend(
-            backend_type="redis",
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            password=REDIS_PASSWORD,
-        )
-        print(f"✓ Using Redis memory backend at {REDIS_HOST}:{REDIS_PORT}")
-    else:
-        memory_backend: AbstractChatMemory = create_memory_backend(backend_type="in-memory")
-        print("⚠ Using in-memory backend (not recommended for production)")
-except Exception as e:
-    print(f"⚠ Failed to initialize {MEMORY_BACKEND} backend: {e}")
-    print("⚠ Falling back to in-memory backend")
-    memory_backend: AbstractChatMemory = create_memory_backend(backend_type="in-memory")
+
+def _create_in_memory_backend() -> AsyncAbstractChatMemory:
+    """Bounded in-memory backend, also used as the Redis fallback"""
+    return create_async_memory_backend(
+        backend_type="in-memory",
+        max_sessions=MEMORY_MAX_SESSIONS,
+        max_messages=CHAT_HISTORY_MAX_MESSAGES,
+        idle_ttl=MEMORY_IDLE_TTL,
+        max_bytes=MEMORY_MAX_BYTES,
+    )
+
+
+def _create_memory_backend() -> AsyncAbstractChatMemory:
+    """
+    Memory backend based on configuration.
+    Async Redis connects lazily; init_memory_backend() verifies it at startup.
+    """
+    try:
+        if MEMORY_BACKEND.lower() == "redis":
+            backend = create_async_memory_backend(
+                backend_type="redis",
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                password=REDIS_PASSWORD,
+                ttl=CHAT_HISTORY_TTL,
+                max_messages=CHAT_HISTORY_MAX_MESSAGES,
+                compress_threshold=CHAT_COMPRESS_THRESHOLD,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            if MEMORY_L1_CACHE_ENABLED:
+                backend = TwoTierChatMemory(
+                    backend,
+                    max_sessions=MEMORY_L1_MAX_SESSIONS,
+                    ttl=MEMORY_L1_TTL,
+                )
+            return backend
+        if MEMORY_BACKEND.lower() == "sqlite":
+            backend = create_async_memory_backend(
+                backend_type="sqlite",
+                path=SQLITE_MEMORY_PATH,
+                ttl=CHAT_HISTORY_TTL,
+                max_messages=CHAT_HISTORY_MAX_MESSAGES,
+                compress_threshold=CHAT_COMPRESS_THRESHOLD,
+                cleanup_interval=SQLITE_MEMORY_CLEANUP_INTERVAL,
+                busy_timeout_ms=SQLITE_MEMORY_BUSY_TIMEOUT,
+            )
+            logger.info("✓ Using SQLite memory backend at %s", SQLITE_MEMORY_PATH)
+            return backend
+        logger.warning("⚠ Using in-memory backend (not recommended for production)")
+        return _create_in_memory_backend()
+    except Exception as e:
+        logger.warning("⚠ Failed to initialize %s backend, falling back to in-memory backend: %s", MEMORY_BACKEND, e)
+        return _create_in_memory_backend()
+
+
+# init_memory_backend() her worker'da lifespan'de kurar: import sırasında redis yüklenmez,
+# pre-fork master da worker'ların kullanmayacağı bir backend oluşturmaz
+memory_backend: Optional[AsyncAbstractChatMemory] = None
+
+# Windowed history + rolling summary keeps per-turn memory cost constant
+history_summarizer = HistorySummarizer(
+    memory_backend,  # init_memory_backend() bağlar
+    window=CHAT_HISTORY_WINDOW,
+    max_tokens=CHAT_HISTORY_MAX_TOKENS,
+    threshold=CHAT_SUMMARY_THRESHOLD,
+)
+
+
+async def init_memory_backend() -> None:
+    """
+    Create the memory backend, verify it and fall back to in-memory if unreachable.
+    Called from the application lifespan, i.e. once per worker after the fork.
+    """
+    global memory_backend
+    memory_backend = _create_memory_backend()
+    history_summarizer.memory = memory_backend
+    try:
+        await memory_backend.ping()
+        await memory_backend.start()
+        if MEMORY_BACKEND.lower() == "redis":
+            logger.info("✓ Using Redis memory backend at %s:%s", REDIS_HOST, REDIS_PORT)
+    except Exception as e:
+        logger.warning("⚠ Failed to initialize %s backend, falling back to in-memory backend: %s", MEMORY_BACKEND, e)
+        await memory_backend.close()
+        memory_backend = _create_in_memory_backend()
+        history_summarizer.memory = memory_backend
+
+
+async def close_memory_backend() -> None:
+    """Release memory backend connections on shutdown"""
+    if memory_backend is not None:
+        await memory_backend.close()
 
 
 @router.get("/chat-history")
@@ -39,8 +148,10 @@ async def get_chat_history(session_id: str):
     Retrieve chat history for a session.
     Used to restore conversation when page is refreshed.
     """
+    bind_session(session_id)
     try:
-        messages = memory_backend.get_messages(session_id)
+        with track_stage("memory_read"):
+            messages = await memory_backend.get_messages(session_id)
         
         # Convert LangChain messages to frontend format
         formatted_messages = []
@@ -56,7 +167,7 @@ async def get_chat_history(session_id: str):
             "count": len(formatted_messages)
         }
     except Exception as e:
-        print(f"Error retrieving chat history: {e}")
+        logger.error("Error retrieving chat history: %s", e)
         return {
             "session_id": session_id,
             "messages": [],
@@ -64,77 +175,193 @@ async def get_chat_history(session_id: str):
         }
 
 
-def get_or_create_session(session_id: str = None) -> str:
+@router.get("/llm-scheduler/stats")
+def get_llm_scheduler_stats():
+    """Concurrency and queue state of the LLM scheduler in this worker"""
+    return get_llm_scheduler(LLM_BACKEND).stats()
+
+
+@router.get("/llm-cache/stats")
+def get_llm_cache_stats():
+    """LLM response cache hit/miss counters for this worker"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/speculative/stats")
+def get_speculative_stats():
+    """Speculative pre-execution reuse counters for this worker"""
+    if not SPECULATIVE_EXECUTION_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_speculative_executor().stats()}
+
+
+async def get_or_create_session(session_id: str = None) -> str:
     """
     Session ID'yi kontrol eder veya yeni oluşturur.
     
     Returns:
         session_id
     """
-    if session_id and memory_backend.session_exists(session_id):
+    if session_id and await memory_backend.session_exists(session_id):
         return session_id
     
     # Yeni session oluştur
     new_session_id = session_id or str(uuid.uuid4())
     return new_session_id
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    try:
-        # Session yönetimi
-        session_id = get_or_create_session(request.session_id)
-        print(f"📝 Session ID: {session_id}")
-        
-        # Mevcut chat history'yi al
-        chat_history = memory_backend.get_messages(session_id)
-        print(f"📚 Retrieved {len(chat_history)} messages from memory")
-        
-        # Check if user has uploaded database
-        user_db_service = get_user_database_service()
-        user_db_path = user_db_service.get_user_database_path(session_id)
-        user_schema = user_db_service.generate_user_schema_description(session_id)
-        
-        # Agent'ı chat history ve RAG ile oluştur
-        # If user has database, use it; otherwise use default Chinook
+@profile_thread()
+def _run_agent(
+    session_id: str, query: str, chat_history: List[BaseMessage], deadline: float
+) -> Tuple[str, Optional[str]]:
+    """
+    Generate the SQL answer for one turn (blocking).
+    AGENT_MODE=direct uses single-shot structured generation and falls back to the
+    tool-calling agent if that fails; AGENT_MODE=agent always uses the agent.
+    session_id and deadline are passed as run metadata to the LLM scheduler.
+    
+    Returns:
+        (answer text, suggested chart type or None)
+    """
+    # Check if user has uploaded database
+    user_db_service = get_user_database_service()
+    user_db_path = user_db_service.get_user_database_path(session_id)
+    user_schema = user_db_service.generate_user_schema_description(session_id)
+    config = {"metadata": {"session_id": session_id, "deadline": deadline}}
+    # Profillenen isteklerde LLM/tool adımları ve süreleri profile eklenir
+    callbacks = profile_callbacks()
+    if callbacks:
+        config["callbacks"] = callbacks
+    
+    if AGENT_MODE.lower() == "direct":
+        try:
+            with track_stage("direct_sql"):
+                result = generate_sql(
+                    chat_history=chat_history,
+                    user_query=query,
+                    db_path=user_db_path,
+                    user_schema=user_schema,
+                    use_rag=(user_db_path is None),
+                    config=config,
+                )
+            return result.to_text(), result.chart_type
+        except (LLMQueueFullError, LLMDeadlineExceededError):
+            raise
+        except Exception as e:
+            logger.warning("⚠ Direct SQL generation failed, falling back to agent: %s", e)
+    
+    # Agent'ı chat history ve RAG ile oluştur
+    # If user has database, use it; otherwise use default Chinook
+    with track_stage("agent_build"):
         agent, _ = build_agent(
             chat_history=chat_history,
-            user_query=request.query,
+            user_query=query,
             db_path=user_db_path,  # Will be None if no user database
             user_schema=user_schema,  # Will be None if no user database
             use_rag=(user_db_path is None)  # Use RAG only for default database
         )
-        
-        # Ajanı çalıştır
-        result = agent.invoke({"input": request.query})
-        
-        # Output'u düzgün al (list veya string olabilir)
-        output_text = result.get('output', '')
-        if isinstance(output_text, list):
-            # List ise, son text elementi al
-            output_text = ''
-            for item in result['output']:
-                if isinstance(item, dict) and 'text' in item:
-                    output_text += item['text'] + ' '
-                elif isinstance(item, str):
-                    output_text += item + ' '
-            output_text = output_text.strip()
+    
+    # Ajanı çalıştır (iterasyon ve tool süreleri metrics handler ile ölçülür)
+    metrics_handler = agent_metrics_handler()
+    if metrics_handler is not None:
+        config = {**config, "callbacks": config.get("callbacks", []) + [metrics_handler]}
+    with track_stage("agent_invoke"):
+        result = agent.invoke({"input": query}, config=config)
+    
+    # Output'u düzgün al (list veya string olabilir)
+    output_text = result.get('output', '')
+    if isinstance(output_text, list):
+        # List ise, son text elementi al
+        output_text = ''
+        for item in result['output']:
+            if isinstance(item, dict) and 'text' in item:
+                output_text += item['text'] + ' '
+            elif isinstance(item, str):
+                output_text += item + ' '
+        output_text = output_text.strip()
+    
+    return output_text, None
+
+
+def _match_query_template(session_id: str, query: str) -> Optional[TemplateMatch]:
+    """Fast path for the default database only; uploaded databases always use the agent"""
+    if not QUERY_TEMPLATES_ENABLED:
+        return None
+    if get_user_database_service().get_user_database_path(session_id):
+        return None
+    matcher = get_query_template_matcher()
+    return matcher.match(query) if matcher else None
+
+
+def _format_template_answer(match: TemplateMatch) -> str:
+    """Same shape as an agent answer, so the SQL approval flow is unchanged"""
+    return (
+        f"{match.description} için hazır sorgu:\n\n"
+        f"```sql\n{match.sql}\n```\n\n"
+        "Sorguyu onayladığınızda sonuçlar gösterilecektir."
+    )
+
+
+def _queue_full_response(error: LLMQueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="LLM servisi şu anda yoğun, lütfen biraz sonra tekrar deneyin.",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
+    try:
+        # Session yönetimi
+        session_id = await get_or_create_session(request.session_id)
+        bind_session(session_id)
+        
+        # Sık sorulan soru kalıpları hazır SQL şablonlarıyla LLM'siz cevaplanır
+        chart_type = None
+        with track_stage("template_match"):
+            template_match = _match_query_template(session_id, request.query)
+        if template_match is not None:
+            logger.info("⚡ Query template hit: %s %s", template_match.template_id, template_match.slots)
+            output_text = _format_template_answer(template_match)
+            chart_type = template_match.chart_type
+        else:
+            # LLM kuyruğu doluysa agent'ı hiç başlatmadan hemen reddet
+            scheduler = get_llm_scheduler(LLM_BACKEND)
+            if scheduler.is_saturated():
+                raise LLMQueueFullError(scheduler.backend, scheduler.retry_after())
+            
+            # Mevcut chat history'yi al (özet + son mesajlar penceresi)
+            with track_stage("memory_read"):
+                chat_history = await history_summarizer.load_context(session_id)
+            logger.info("📚 Retrieved %d messages from memory", len(chat_history), extra=VERBOSE)
+            
+            # Agent senkron çalışır; event loop'u bloklamaması için thread pool'da çalıştırılır
+            deadline = time.monotonic() + CHAT_REQUEST_DEADLINE
+            output_text, chart_type = await run_in_threadpool(
+                _run_agent, session_id, request.query, chat_history, deadline
+            )
         
         # Chat history'ye mesajları ekle (Abstract memory layer kullanarak)
-        memory_backend.add_messages(
-            session_id,
-            [
-                HumanMessage(content=request.query),
-                AIMessage(content=str(output_text))
-            ]
+        with track_stage("memory_write"):
+            await memory_backend.add_messages(
+                session_id,
+                [
+                    HumanMessage(content=request.query),
+                    AIMessage(content=str(output_text))
+                ]
+            )
+        background_tasks.add_task(history_summarizer.maybe_summarize, session_id)
+        logger.info(
+            "💾 Saved messages to memory. User: %s... AI: %s...",
+            request.query[:50], str(output_text)[:50], extra=VERBOSE,
         )
-        print(f"💾 Saved messages to memory for session {session_id}")
-        print(f"   User: {request.query[:50]}...")
-        print(f"   AI: {str(output_text)[:50]}...")
         
         # output_text'in string olduğundan emin ol
         output_str = str(output_text)
         
-        chart_data = None
         sql_query = None
         requires_approval = False
         
@@ -145,52 +372,42 @@ async def chat(request: ChatRequest):
         if sql_match:
             sql_query = sql_match.group(1).strip()
             requires_approval = True  # User must approve before execution
-        
-        # JSON verisini parse et
-        # Format: CHART_JSON_START{...}CHART_JSON_END
-        json_pattern = r"CHART_JSON_START(.*?)CHART_JSON_END"
-        match = re.search(json_pattern, output_str, re.DOTALL)
-        
-        cleaned_answer = output_str
-        if match:
-            json_str = match.group(1)
-            try:
-                chart_info = json.loads(json_str)
-                # chart_info içinde "data" var mı kontrol et
-                if "data" in chart_info:
-                     # Frontend'in beklediği formatta data gönder
-                    chart_data = chart_info["data"]
-                    # Answer'dan JSON bloğunu temizle, kullanıcıya ham JSON göstermeyelim
-                    cleaned_answer = output_str.replace(match.group(0), "").strip()
-                    # Ek bilgi ekle
-                    cleaned_answer += f"\n\n(Aşağıda {chart_info.get('title', 'Grafik')} grafiği görüntülenmektedir)"
-            except json.JSONDecodeError:
-                print("JSON Parse Hatası")
+            # Kullanıcı sorguyu okurken sorgu arka planda (satır/süre sınırıyla) çalışmaya başlar
+            if SPECULATIVE_EXECUTION_ENABLED:
+                get_speculative_executor().start(
+                    session_id, sql_query, _session_db_path(session_id), chart_type
+                )
         
         return ChatResponse(
-            answer=cleaned_answer,
+            answer=output_str,
             session_id=session_id,
-            chart_data=chart_data,
+            chart_type=chart_type,  # Onaydan sonra grafik türü ipucu olarak geri gönderilir
             sql_query=sql_query,
             requires_approval=requires_approval  # True if SQL needs user approval
         )
-        
+    
+    except LLMQueueFullError as e:
+        logger.warning("⚠ %s", e)
+        raise _queue_full_response(e)
+    except LLMDeadlineExceededError as e:
+        logger.warning("⚠ %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="LLM servisi şu anda yoğun, lütfen biraz sonra tekrar deneyin.",
+        )
     except Exception as e:
-        print(f"Hata: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Hata: %s", e)
         
         # Hata durumunda bile memory'ye kaydet
         try:
             error_message = f"Bir hata oluştu: {str(e)}"
-            memory_backend.add_messages(
+            await memory_backend.add_messages(
                 request.session_id or str(uuid.uuid4()),
                 [
                     HumanMessage(content=request.query),
                     AIMessage(content=error_message)
                 ]
             )
-            print(f"💾 Saved error to memory")
         except:
             pass  # Ignore memory errors during error handling
         
@@ -201,64 +418,59 @@ async def chat(request: ChatRequest):
         )
 
 
+def _session_db_path(session_id: str) -> str:
+    """The session's uploaded database, or the default Chinook database"""
+    user_db_path = get_user_database_service().get_user_database_path(session_id)
+    return user_db_path if user_db_path else DB_PATH
+
+
+@profile_thread()
+def _run_query(session_id: str, sql_query: str, chart_type: Optional[str] = None) -> QueryResult:
+    """Execute a validated query against the session's database (blocking)"""
+    # Grafik, satırlar cursor'dan okunurken tüm sonuçtan oluşturulur; bellekte sadece önizleme kalır
+    with track_stage("sql_execute"):
+        return execute_query(
+            _session_db_path(session_id),
+            sql_query,
+            chart_builder=ChartBuilder(chart_type),
+            preview_rows=EXECUTE_PREVIEW_ROWS,
+        )
+
+
 @router.post("/execute-sql", response_model=ExecuteSQLResponse)
 async def execute_sql(request: ExecuteSQLRequest):
     """
     Execute user-approved SQL query.
     Provides a safety mechanism for reviewing SQL before execution.
     """
+    bind_session(request.session_id)
     try:
         # Validate SQL - only allow SELECT statements
-        sql_upper = request.sql_query.strip().upper()
-        
-        # Security check: Block dangerous operations
-        dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE', 'GRANT', 'REVOKE']
-        for keyword in dangerous_keywords:
-            if keyword in sql_upper:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Güvenlik nedeniyle {keyword} komutu engellenmiştir. Sadece SELECT sorguları çalıştırılabilir."
-                )
-        
-        if not sql_upper.startswith('SELECT'):
-            raise HTTPException(
-                status_code=400,
-                detail="Güvenlik nedeniyle sadece SELECT sorguları çalıştırılabilir."
+        try:
+            validate_read_only_sql(request.sql_query)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Onay beklerken arka planda çalıştırılmış sonuç varsa onu kullan
+        result = None
+        if SPECULATIVE_EXECUTION_ENABLED:
+            result = await get_speculative_executor().take(
+                request.session_id, request.sql_query, _session_db_path(request.session_id)
             )
+            if result is not None:
+                logger.info("⚡ Speculative result reused", extra=VERBOSE)
         
-        # Get appropriate database
-        user_db_service = get_user_database_service()
-        user_db_path = user_db_service.get_user_database_path(request.session_id)
-        
-        # Connect to database
-        if user_db_path:
-            db_uri = f"sqlite:///{user_db_path}"
-        else:
-            from app.core.config import DB_PATH
-            db_uri = f"sqlite:///{DB_PATH}"
-        
-        db = SQLDatabase.from_uri(db_uri)
-        
-        # Execute query using direct connection for better result parsing
-        import sqlite3
-        conn = sqlite3.connect(user_db_path if user_db_path else DB_PATH)
-        conn.row_factory = sqlite3.Row  # Enable column name access
-        cursor = conn.cursor()
-        
-        cursor.execute(request.sql_query)
-        rows = cursor.fetchall()
-        
-        # Convert to list of dicts
-        result_data = [dict(row) for row in rows]
-        row_count = len(result_data)
-        
-        conn.close()
+        if result is None:
+            # sqlite sorgusu event loop'u bloklamaması için thread pool'da çalışır
+            result = await run_in_threadpool(
+                _run_query, request.session_id, request.sql_query, request.chart_type
+            )
+        result_data = result.rows
+        row_count = result.row_count
         
         # Format result as markdown table
         result_summary = f"✓ Sorgu başarıyla çalıştırıldı. **{row_count} satır** döndü.\n\n"
         
-        chart_data = None
-        
         if row_count > 0:
             # Create markdown table
             columns = list(result_data[0].keys())
@@ -273,40 +485,29 @@ async def execute_sql(request: ExecuteSQLRequest):
                 result_summary += "| " + " | ".join(str(v) for v in row.values()) + " |\n"
             
             if row_count > 10:
-                result_summary += f"\n*... ve {row_count - 10} satır daha (tüm sonuçları CSV/Excel olarak indirmek için aşağıdaki butonları kullanabilirsiniz).*"
-            
-            # Auto-generate chart data if suitable (2 columns, second is numeric)
-            if len(columns) == 2:
-                try:
-                    # Check if second column is numeric
-                    first_val = result_data[0][columns[1]]
-                    if isinstance(first_val, (int, float)):
-                        chart_data = [
-                            {"name": str(row[columns[0]]), "value": float(row[columns[1]])}
-                            for row in result_data[:10]  # Max 10 bars for chart
-                        ]
-                except:
-                    pass  # If conversion fails, no chart
+                result_summary += f"\n*... ve {row_count - 10} satır daha (tüm sonuçları CSV/Excel/Parquet olarak indirmek için aşağıdaki butonları kullanabilirsiniz).*"
         
         # Save to chat history
         try:
-            memory_backend.add_messages(
-                request.session_id,
-                [
-                    HumanMessage(content=f"Şu SQL sorgusunu çalıştırdım:\n```sql\n{request.sql_query}\n```"),
-                    AIMessage(content=result_summary)
-                ]
-            )
-            print(f"💾 Saved SQL execution results to memory for session {request.session_id}")
+            with track_stage("memory_write"):
+                await memory_backend.add_messages(
+                    request.session_id,
+                    [
+                        HumanMessage(content=f"Şu SQL sorgusunu çalıştırdım:\n```sql\n{request.sql_query}\n```"),
+                        AIMessage(content=result_summary)
+                    ]
+                )
+            logger.info("💾 Saved SQL execution results to memory", extra=VERBOSE)
         except Exception as mem_error:
-            print(f"⚠ Failed to save to memory: {mem_error}")
+            logger.warning("⚠ Failed to save to memory: %s", mem_error)
         
         return ExecuteSQLResponse(
             success=True,
             message=result_summary,
             row_count=row_count,
-            chart_data=chart_data,  # Auto-generated chart or None
-            data=result_data  # Full raw rows for download on frontend
+            chart_data=result.chart.data if result.chart else None,  # Built server-side from all rows
+            chart_type=result.chart.chart_type if result.chart else None,
+            data=result_data  # Preview rows; the full result is streamed by /export
         )
         
     except HTTPException:
@@ -317,3 +518,46 @@ async def execute_sql(request: ExecuteSQLRequest):
             message="Sorgu çalıştırılamadı.",
             error=str(e)
         )
+
+
+@router.get("/export/{fmt}")
+async def export_sql(fmt: str, session_id: str, sql_query: str):
+    """
+    Stream the full result of an approved query as CSV, JSON, XLSX or Parquet.
+    The query is re-run and rows are written from the cursor batch by batch.
+    """
+    bind_session(session_id)
+    export_format = EXPORT_FORMATS.get(fmt)
+    if export_format is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Desteklenmeyen format: {fmt}. Desteklenenler: {', '.join(EXPORT_FORMATS)}"
+        )
+    if export_format.module and importlib.util.find_spec(export_format.module) is None:
+        raise HTTPException(
+            status_code=501,
+            detail=f"{fmt} dışa aktarımı için '{export_format.module}' paketi kurulu değil."
+        )
+
+    try:
+        validate_read_only_sql(sql_query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Sorgu hataları yanıt başlamadan önce 400 olarak dönsün diye sorgu burada çalıştırılır
+    try:
+        with track_stage("sql_export_open"):
+            export = await run_in_threadpool(open_export_cursor, _session_db_path(session_id), sql_query)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=400, detail=f"Sorgu çalıştırılamadı: {e}")
+
+    logger.info("📤 Streaming %s export", fmt)
+    filename = f"query-results.{export_format.extension}"
+    return StreamingResponse(
+        stream_export(export, fmt),  # Sync generator; Starlette iterates it in the threadpool
+        media_type=export_format.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
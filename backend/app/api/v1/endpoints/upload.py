@@ -7,6 +7,9 @@ from fastapi import APIRouter, UploadFile, File, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from app.services.user_database import get_user_database_service
+from app.services.profiler import profile_thread
+from app.services.session_janitor import get_session_janitor
+from app.core.logging_config import bind_session
 
 router = APIRouter()
 
@@ -44,7 +47,8 @@ async def upload_file(
     """
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id gerekli")
-    
+    bind_session(session_id)
+
     if not file.filename:
         raise HTTPException(status_code=400, detail="Dosya adı bulunamadı")
     
@@ -60,10 +64,14 @@ async def upload_file(
     
     # Process upload
     service = get_user_database_service()
-    success, message, metadata = await service.process_upload(file, session_id)
+    # Ayrıştırma event loop thread'inde bloklayarak çalışır; profil açıksa bu thread örneklenir
+    with profile_thread():
+        success, message, metadata = await service.process_upload(file, session_id)
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
+    # Toplam kota aşılmış olabilir; janitor bir sonraki aralığı beklemeden tarar
+    get_session_janitor().wake()
     
     # Return success response with metadata
     return UploadResponse(
@@ -16,16 +16,130 @@ LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")  # Options: 'gemini', 'ollama'
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))  # saniye, tek LLM isteği için
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # model Ollama belleğinde ne kadar kalsın
+LLM_WARMUP_ENABLED = os.getenv("LLM_WARMUP_ENABLED", "true").lower() == "true"  # startup'ta ilk çağrıyı yap
+
+# LLM Admission Control (backend başına eşzamanlı üretim sınırı + adil kuyruk)
+LLM_MAX_CONCURRENCY_OLLAMA = int(os.getenv("LLM_MAX_CONCURRENCY_OLLAMA", "2"))
+LLM_MAX_CONCURRENCY_GEMINI = int(os.getenv("LLM_MAX_CONCURRENCY_GEMINI", "16"))
+LLM_QUEUE_MAX_SIZE = int(os.getenv("LLM_QUEUE_MAX_SIZE", "32"))  # dolunca 429 + Retry-After
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))  # saniye, kuyrukta en fazla bekleme
+CHAT_REQUEST_DEADLINE = float(os.getenv("CHAT_REQUEST_DEADLINE", "120"))  # saniye, /chat isteğinin LLM kuyruğu için son süresi
+
+# Embedding Configuration (schema indexing)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+EMBEDDING_RETRY_BACKOFF = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "0.5"))  # saniye, her denemede 2 katına çıkar
+
+# Prompt Token Budget (agent prompt: rules > schema > history > samples)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+PROMPT_HISTORY_MESSAGE_MAX_TOKENS = int(os.getenv("PROMPT_HISTORY_MESSAGE_MAX_TOKENS", "400"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))  # şema RAG'inden getirilen doküman sayısı
+
+# SQL Generation Mode
+# 'agent': tool-calling SQL agent (birden fazla LLM turu), 'direct': tek yapılandırılmış LLM çağrısı
+AGENT_MODE = os.getenv("AGENT_MODE", "agent")
+DIRECT_SQL_REPAIR_ENABLED = os.getenv("DIRECT_SQL_REPAIR_ENABLED", "true").lower() == "true"  # EXPLAIN hatasında 1 düzeltme turu
+
+# SQL Execution Results
+# /execute-sql sadece ilk N satırı döner; tüm sonuç /export/{csv,json,xlsx,parquet} ile indirilir
+EXECUTE_PREVIEW_ROWS = int(os.getenv("EXECUTE_PREVIEW_ROWS", "100"))
+
+# Logging (kuyruk tabanlı: istek thread'i stdout'a yazmaz)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # Options: 'text', 'json'
+LOG_VERBOSE_SAMPLE_RATE = float(os.getenv("LOG_VERBOSE_SAMPLE_RATE", "1.0"))  # 0-1, tur başına ayrıntı satırlarının tutulduğu istek oranı
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # dolunca kayıt atılır, istek beklemez
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() == "true"  # LangChain agent adımlarını stdout'a yazar (sadece geliştirme)
+
+# Metrics (Prometheus /metrics; prometheus_client kurulu değilse devre dışı)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Server (python main.py)
+# 'development': tek process + auto-reload; 'production': paylaşılan state fork öncesi yüklenir, N worker
+SERVER_MODE = os.getenv("SERVER_MODE", "development").lower()
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# 0 = tüm CPU çekirdekleri; development modunda her zaman 1
+SERVER_WORKERS = (int(os.getenv("SERVER_WORKERS", "0")) or os.cpu_count() or 1) if SERVER_MODE == "production" else 1
+
+# Admin & Request Profiling
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # Boşsa /admin uçları ve X-Profile header'ı kapalı
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # 0-1, isteklerin profillenen oranı
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "data", "profiles"))
+PROFILE_MAX_ARTIFACTS = int(os.getenv("PROFILE_MAX_ARTIFACTS", "50"))
+
+# Speculative Execution (önerilen SQL, kullanıcı onayı beklenirken arka planda çalıştırılır)
+# 'auto': tek worker'da açık. Çok worker'da kapalı: onay isteği çoğunlukla başka bir worker'a düşer,
+# sonuç bulunamaz ve sorgu iki kez çalışır
+_SPECULATIVE_EXECUTION = os.getenv("SPECULATIVE_EXECUTION_ENABLED", "auto").lower()
+SPECULATIVE_EXECUTION_ENABLED = SERVER_WORKERS == 1 if _SPECULATIVE_EXECUTION == "auto" else _SPECULATIVE_EXECUTION == "true"
+SPECULATIVE_MAX_ROWS = int(os.getenv("SPECULATIVE_MAX_ROWS", "10000"))  # fazlası çıkarsa sonuç atılır
+SPECULATIVE_TIME_BUDGET = float(os.getenv("SPECULATIVE_TIME_BUDGET", "5"))  # saniye
+SPECULATIVE_RESULT_TTL = float(os.getenv("SPECULATIVE_RESULT_TTL", "120"))  # saniye, onaylanmazsa silinir
+SPECULATIVE_MAX_WORKERS = int(os.getenv("SPECULATIVE_MAX_WORKERS", "2"))
+
+# Chart Builder (sonuçlar sunucuda bu nokta bütçesine indirgenir)
+CHART_MAX_CATEGORIES = int(os.getenv("CHART_MAX_CATEGORIES", "12"))  # bar/pie: top-N + "Diğer"
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "200"))  # line: zaman gruplama + LTTB
+
+# Query Template Fast Path (sık sorulan sorular LLM'siz, schema_metadata.json -> query_templates)
+QUERY_TEMPLATES_ENABLED = os.getenv("QUERY_TEMPLATES_ENABLED", "true").lower() == "true"
+
+# LLM Response Cache (temperature=0 olduğu için aynı istek aynı cevabı verir)
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")  # Options: 'sqlite', 'redis', 'none'
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "data", "llm_cache.db"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))  # saniye
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
 
 # Memory Backend Configuration
-MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "redis")  # Options: 'redis', 'in-memory'
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "redis")  # Options: 'redis', 'sqlite', 'in-memory'
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))  # process başına havuz boyutu
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))  # saniye
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))  # saniye
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))  # saniye
+
+# Chat History Storage
+CHAT_HISTORY_TTL = int(os.getenv("CHAT_HISTORY_TTL", "86400"))  # saniye (24 saat)
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "200"))  # oturum başına üst sınır
+CHAT_COMPRESS_THRESHOLD = int(os.getenv("CHAT_COMPRESS_THRESHOLD", "1024"))  # byte, üstü zstd ile sıkıştırılır
+
+# SQLite Memory Backend (MEMORY_BACKEND=sqlite, Redis olmayan tek sunuculu kurulumlar)
+SQLITE_MEMORY_PATH = os.getenv("SQLITE_MEMORY_PATH", os.path.join(BASE_DIR, "data", "chat_memory.db"))
+SQLITE_MEMORY_CLEANUP_INTERVAL = int(os.getenv("SQLITE_MEMORY_CLEANUP_INTERVAL", "300"))  # saniye
+SQLITE_MEMORY_BUSY_TIMEOUT = int(os.getenv("SQLITE_MEMORY_BUSY_TIMEOUT", "5000"))  # ms, yazma kilidi beklemesi
+
+# Two-tier memory: worker-local L1 cache in front of Redis
+MEMORY_L1_CACHE_ENABLED = os.getenv("MEMORY_L1_CACHE_ENABLED", "true").lower() == "true"
+MEMORY_L1_MAX_SESSIONS = int(os.getenv("MEMORY_L1_MAX_SESSIONS", "1000"))
+MEMORY_L1_TTL = float(os.getenv("MEMORY_L1_TTL", "60"))  # saniye, invalidation kaçarsa üst sınır
+
+# In-Memory Backend Limits (MEMORY_BACKEND=in-memory veya Redis'e ulaşılamadığında)
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))
+MEMORY_IDLE_TTL = int(os.getenv("MEMORY_IDLE_TTL", str(CHAT_HISTORY_TTL)))  # saniye
+MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Chat History Window & Rolling Summary
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "20"))  # son N mesaj
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "3000"))  # son N token
+CHAT_SUMMARY_THRESHOLD = int(os.getenv("CHAT_SUMMARY_THRESHOLD", "40"))  # bu sayının üstünde özetle
 
 # ChromaDB Configuration
-CHROMA_PERSIST_DIRECTORY = os.path.join(BASE_DIR, "data", "chroma_db")
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", os.path.join(BASE_DIR, "data", "chroma_db"))
 
 # User Upload Configuration
-USER_DB_DIRECTORY = os.path.join(BASE_DIR, "data", "user_databases")
\ No newline at end of file
+USER_DB_DIRECTORY = os.getenv("USER_DB_DIRECTORY", os.path.join(BASE_DIR, "data", "user_databases"))
+
+# Session Database Lifecycle (USER_DB_DIRECTORY'deki yüklenen veritabanları; 0 = kural kapalı)
+SESSION_DB_TTL = int(os.getenv("SESSION_DB_TTL", str(CHAT_HISTORY_TTL)))  # saniye, son kullanımdan sonra silinir
+SESSION_DB_MAX_BYTES = int(os.getenv("SESSION_DB_MAX_BYTES", str(200 * 1024 * 1024)))  # oturum başına, aşan upload reddedilir
+SESSION_DB_TOTAL_MAX_BYTES = int(os.getenv("SESSION_DB_TOTAL_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))  # toplam, aşılınca LRU silinir
+SESSION_DB_JANITOR_INTERVAL = int(os.getenv("SESSION_DB_JANITOR_INTERVAL", "600"))  # saniye
+SESSION_DB_VACUUM_FREE_RATIO = float(os.getenv("SESSION_DB_VACUUM_FREE_RATIO", "0.25"))  # boş sayfa oranı bunu aşınca VACUUM
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Structured Logging
+Log calls on the request path only build a record and put it on a bounded queue;
+one QueueListener thread formats and writes it to stdout (JSON lines or text),
+so slow or contended stdout never blocks a request. request_id and session_id
+come from contextvars (set by RequestContextMiddleware and bind_session) and are
+attached to every line, including lines logged from thread-pool work.
+Verbose per-turn lines are logged with extra=VERBOSE and kept for a
+LOG_VERBOSE_SAMPLE_RATE fraction of requests (all lines of a request or none).
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.core.config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_VERBOSE_SAMPLE_RATE
+
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+
+# logger.info("...", extra=VERBOSE): per-turn detail, subject to sampling
+VERBOSE = {"verbose": True}
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "verbose", "request_id", "session_id",
+}
+
+logger = logging.getLogger("app.requests")
+
+
+def bind_session(session_id: Optional[str]) -> None:
+    """Attach the session id to the rest of the current request's log lines"""
+    session_id_var.set(session_id)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the correlation ids onto the record (runs on the calling thread, where the contextvars are)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.session_id = session_id_var.get()
+        return True
+
+
+class VerboseSamplingFilter(logging.Filter):
+    """Drops VERBOSE records outside the sampled requests"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "verbose", False) or self.rate >= 1:
+            return True
+        if self.rate <= 0:
+            return False
+        # Karar istek id'sinden türetilir: örneklenen isteğin tüm satırları birlikte kalır
+        key = record.request_id or uuid.uuid4().hex
+        return zlib.crc32(key.encode("utf-8")) % 10_000 < self.rate * 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra={...} fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("request_id", "session_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s%(context)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        ids = [f"{key}={getattr(record, key)}" for key in ("request_id", "session_id") if getattr(record, key, None)]
+        record.context = f" [{' '.join(ids)}]" if ids else ""
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Never blocks the caller: a full queue drops the record (counted) instead of
+    waiting for the writer thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mesaj argümanları ve traceback şimdi çözülür (nesneler sonradan değişebilir);
+        # asıl formatlama listener thread'inde yapılır
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging() -> None:
+    """Route the app.* loggers through the queue; safe to call more than once"""
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if LOG_FORMAT.lower() == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    _queue_handler.addFilter(VerboseSamplingFilter(LOG_VERBOSE_SAMPLE_RATE))
+
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [_queue_handler]
+    app_logger.setLevel(LOG_LEVEL.upper())
+    app_logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        if _queue_handler is not None and _queue_handler.dropped:
+            print(f"⚠ {_queue_handler.dropped} log records dropped (queue full)", file=sys.stderr)
+
+
+def restart_logging() -> None:
+    """
+    Fresh queue and writer thread in a forked worker: the parent's listener
+    thread does not exist in the child, so its queue would never drain.
+    """
+    global _listener, _queue_handler
+
+    _listener = None
+    _queue_handler = None
+    setup_logging()
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware: a request id per request (incoming X-Request-ID or a
+    new one), echoed in the response, plus one access line with status and duration.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming[:64] if incoming.isprintable() and incoming else uuid.uuid4().hex
+        request_token = request_id_var.set(request_id)
+        session_token = session_id_var.set(None)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            logger.info(
+                "%s %s %s %.1fms", scope["method"], scope["path"], status[0], duration_ms,
+                extra={"http_method": scope["method"], "path": scope["path"],
+                       "status": status[0], "duration_ms": duration_ms},
+            )
+            request_id_var.reset(request_token)
+            session_id_var.reset(session_token)
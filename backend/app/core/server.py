@@ -0,0 +1,185 @@
+"""
+Server Launcher
+Entry point of `python main.py`.
+
+development: a single uvicorn process with auto-reload.
+production: the master process loads the read-only state once (imported
+libraries, Chinook reflection, schema metadata, query templates, the schema RAG
+index), binds the listening socket and forks SERVER_WORKERS uvicorn workers
+that accept on it. The preloaded state is shared copy-on-write; what each
+worker must own (log writer thread, LLM/embedding HTTP clients, database pool,
+Chroma client, chat memory backend) is recreated after the fork. LLM
+concurrency limits are enforced server-wide through lock files. The master
+restarts workers that die and stops them on SIGINT/SIGTERM.
+uvicorn's own --workers spawns fresh interpreters, which would load all of
+that state once per worker instead.
+"""
+
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict, Optional
+
+from app.core.config import (
+    MEMORY_BACKEND, METRICS_ENABLED, SERVER_HOST, SERVER_MODE, SERVER_PORT, SERVER_WORKERS,
+    SPECULATIVE_EXECUTION_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hemen ölen worker'lar için yeniden başlatma beklemesi (saniye)
+_RESTART_BACKOFF = 1.0
+
+
+def run(app) -> None:
+    """Serve the app according to SERVER_MODE"""
+    import uvicorn
+
+    if SERVER_MODE != "production":
+        # Reload sadece geliştirme ortamında
+        uvicorn.run("main:app", host=SERVER_HOST, port=SERVER_PORT, reload=True)
+        return
+    PreforkServer(app, SERVER_HOST, SERVER_PORT, SERVER_WORKERS).run()
+
+
+def _warn_multi_worker_config(workers: int, shared_llm_slots: bool) -> None:
+    if workers < 2:
+        return
+    if MEMORY_BACKEND.lower() not in ("redis", "sqlite"):
+        logger.warning(
+            "⚠ MEMORY_BACKEND=%s keeps chat history per worker; with %d workers a session's "
+            "requests land on different workers. Use redis or sqlite.", MEMORY_BACKEND, workers,
+        )
+    if METRICS_ENABLED and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        logger.warning("⚠ PROMETHEUS_MULTIPROC_DIR is not set; /metrics shows only the worker serving the scrape")
+    if not shared_llm_slots:
+        logger.warning("⚠ Cross-process locks unavailable; LLM concurrency limits are split between %d workers", workers)
+    if SPECULATIVE_EXECUTION_ENABLED:
+        logger.warning(
+            "⚠ SPECULATIVE_EXECUTION_ENABLED with %d workers: results are kept per worker, so most "
+            "approvals miss them and the query runs twice. Use SPECULATIVE_EXECUTION_ENABLED=auto.", workers,
+        )
+
+
+def _reset_after_fork() -> None:
+    """Recreate per-process state inherited from the master"""
+    import sys
+    from app.core.logging_config import restart_logging
+    from app.services.database import release_db_connections
+    from app.services.llm_factory import LLMFactory
+
+    restart_logging()
+    LLMFactory.reset()
+    release_db_connections()
+    if "app.services.schema_rag" in sys.modules:
+        from app.services.schema_rag import reopen_schema_rag
+        reopen_schema_rag()
+    # Chat memory backend master'da hiç kurulmaz; her worker lifespan'de (init_memory_backend) oluşturur
+
+
+class PreforkServer:
+    """Master process: preload, bind, fork and supervise uvicorn workers"""
+
+    def __init__(self, app, host: str, port: int, workers: int):
+        import uvicorn
+
+        # Erişim logu RequestContextMiddleware'de (kuyruk üzerinden); uvicorn'unki kapalı
+        self.config = uvicorn.Config(app, host=host, port=port, access_log=False)
+        self.workers = workers
+        self.children: Dict[int, int] = {}  # pid -> worker slot
+        self.started_at: Dict[int, float] = {}
+        self.stopping = False
+        self.socket: Optional[socket.socket] = None
+        self.slot_dir: Optional[str] = None
+
+    def run(self) -> None:
+        from app.services.llm_scheduler import share_llm_slots
+        from app.services.metrics import clear_multiprocess_dir
+        from app.services.warmup import preload_shared_state
+
+        logger.info("🚀 Production mode: preloading shared state for %d workers", self.workers)
+        # LLM eşzamanlılık sınırı tüm worker'lar için ortak: slotlar bu dizindeki kilit dosyaları
+        self.slot_dir = tempfile.mkdtemp(prefix="text2sql-llm-slots-")
+        _warn_multi_worker_config(self.workers, share_llm_slots(self.slot_dir))
+        clear_multiprocess_dir()
+        preload_shared_state()
+
+        self.socket = self.config.bind_socket()
+        # Yüklenen nesneler GC nesillerinden çıkarılır: worker'lardaki toplama turları
+        # bu sayfalara yazmaz, copy-on-write paylaşım korunur
+        gc.freeze()
+
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        logger.info("✓ Listening on http://%s:%d with %d workers", self.config.host, self.config.port, self.workers)
+
+        self._supervise()
+        self.socket.close()
+        shutil.rmtree(self.slot_dir, ignore_errors=True)
+        logger.info("👋 All workers stopped")
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            self.started_at[pid] = time.monotonic()
+            return
+
+        # Worker process
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            import uvicorn
+
+            _reset_after_fork()
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            logger.exception("Worker %d crashed", slot)
+            exit_code = 1
+        finally:
+            from app.core.logging_config import shutdown_logging
+
+            shutdown_logging()
+            # Master'dan devralınan atexit kayıtları (ör. Chroma) worker'da çalıştırılmaz
+            os._exit(exit_code)
+
+    def _supervise(self) -> None:
+        from app.services.metrics import mark_worker_dead
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            started_at = self.started_at.pop(pid, 0.0)
+            if slot is None:
+                continue
+            mark_worker_dead(pid)
+            if self.stopping:
+                continue
+
+            logger.warning("⚠ Worker %d (pid %d) exited with code %d, restarting", slot, pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started_at < _RESTART_BACKOFF:
+                time.sleep(_RESTART_BACKOFF)
+            self._spawn(slot)
+
+    def _handle_stop(self, signum, frame) -> None:
+        # İkinci sinyal worker'ları beklemeden sonlandırır
+        kill = signal.SIGKILL if self.stopping else signal.SIGTERM
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, kill)
+            except ProcessLookupError:
+                pass
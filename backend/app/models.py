@@ -24,6 +24,7 @@ class ExecuteSQLRequest(BaseModel):
     """Request model for executing approved SQL"""
     sql_query: str
     session_id: str
+    chart_type: Optional[str] = None  # Hint from the chat response ('bar', 'line', 'pie')
 
 
 class ExecuteSQLResponse(BaseModel):
@@ -33,5 +34,5 @@ class ExecuteSQLResponse(BaseModel):
     chart_data: Optional[List[Dict[str, Any]]] = None
     chart_type: Optional[str] = None
     row_count: Optional[int] = None
-    data: Optional[List[Dict[str, Any]]] = None  # Full result set for export/download
+    data: Optional[List[Dict[str, Any]]] = None  # First EXECUTE_PREVIEW_ROWS rows; full result via /export/{fmt}
     error: Optional[str] = None
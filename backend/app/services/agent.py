@@ -1,16 +1,68 @@
-from langchain_community.agent_toolkits import create_sql_agent
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
 from app.services.database import get_db
 from app.services.llm import get_llm
-from app.services.tools import chart_tool
+from app.services.prompt_budget import PromptBudget
+from app.services.schema_context import resolve_schema_description
+from app.core.config import AGENT_VERBOSE, PROMPT_TOKEN_BUDGET, PROMPT_HISTORY_MESSAGE_MAX_TOKENS
 from typing import Optional, List, Dict
 
+
+INTRO_PROMPT = "Sen bir SQL veri analisti asistanısın. Kullanıcıların veritabanı sorularını anlamak ve doğru SQL sorguları üretmek için tasarlandın."
+
+RULES_PROMPT = """## GÖREV KURALLARI:
+1. Kullanıcının sorusunu dikkatlice analiz et ve önceki konuşma bağlamını (chat history) dikkate al.
+2. Uygun SQL sorgusunu YAZ ama ÇALIŞTIRMA - sadece SQL kodunu öner.
+3. SQL sorgusunu şu formatta sun:
+   ```sql
+   SELECT ... FROM ... WHERE ...
+   ```
+4. SQL kodunun dışına uzun açıklamalar yazma. Gerekirse en fazla **1 kısa cümlelik** bir açıklama ekle (örnek: "Bu sorgu gemideki yolcuların yaş dağılımını getirir."). Paragraf, hikâye veya detaylı metin yazma.
+5. Tarih sorgularında SQLite tarih fonksiyonlarını kullan: strftime('%Y-%m-%d', column_name).
+6. Türkçe sütun adları için tırnak işareti kullanmayı unutma.
+
+## ÖNEMLİ: SORGUYU ÇALIŞTIRMA!
+Kullanıcı SQL sorgusunu onayladıktan sonra sistem otomatik olarak çalıştıracak.
+Senin görevin sadece DOĞRU SQL SORGUSU YAZMAK ve (varsa) ÇOK KISA bir açıklama eklemek."""
+
+SAMPLES_PROMPT = """Örnek:
+Kullanıcı: "Kaç kişi hayatta kaldı?"
+Cevap: "İşte ihtiyacınız olan SQL sorgusu:
+
+```sql
+SELECT COUNT(*) AS hayatta_kalan_sayisi
+FROM train
+WHERE Survived = 1;
+```
+
+Bu sorgu, 'train' tablosundaki 'Survived' sütununda 1 değeri olan (hayatta kalanlar) kayıtları sayar.\""""
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def format_history(chat_history: List[BaseMessage]) -> str:
+    """Render chat history as a prompt section"""
+    lines = ["## ÖNCEKİ KONUŞMA:"]
+    for message in chat_history:
+        if isinstance(message, SystemMessage):
+            lines.append(f"Önceki konuşmanın özeti: {message.content}")
+            continue
+        role = "Kullanıcı" if isinstance(message, HumanMessage) else "Asistan"
+        lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
+
+
 def build_agent(
     chat_history: Optional[List[BaseMessage]] = None,
     user_query: str = "",
     db_path: Optional[str] = None,
     user_schema: Optional[str] = None,
-    use_rag: bool = True
+    use_rag: bool = True,
+    llm: Optional[BaseChatModel] = None,
+    rules: str = RULES_PROMPT,
+    samples: str = SAMPLES_PROMPT,
 ):
     """
     SQL Agent oluşturur. Chat history ile konuşma geçmişi desteklenir.
@@ -22,72 +74,50 @@ def build_agent(
         db_path: Custom database path. If None, uses default Chinook DB.
         user_schema: User-uploaded database schema description. Takes precedence over RAG.
         use_rag: Whether to use RAG for schema retrieval (default: True)
+        llm: Chat model to use instead of the configured one (e.g. for evaluations)
+        rules: Task rules section of the prompt
+        samples: Few-shot examples section of the prompt ("" to leave out)
     """
     db = get_db(db_path)
-    llm = get_llm()
+    if llm is None:
+        llm = get_llm()
     
     # Chat history yoksa boş liste kullan
     if chat_history is None:
         chat_history = []
     
-    # Schema description: Priority order: user_schema > RAG > full schema
-    if user_schema:
-        # User uploaded database - use its schema
-        schema_description = user_schema
-        print("Using user-uploaded database schema")
-    elif use_rag and user_query:
-        try:
-            from app.services.schema_rag import get_schema_rag
-            rag = get_schema_rag()
-            schema_description = rag.get_relevant_schema(user_query, top_k=5)
-        except Exception as e:
-            print(f"⚠ RAG failed, falling back to full schema: {e}")
-            from app.services.database import generate_enhanced_schema_description
-            schema_description = generate_enhanced_schema_description()
-    else:
-        # Fallback to full schema
-        from app.services.database import generate_enhanced_schema_description
-        schema_description = generate_enhanced_schema_description()
+    schema_description = resolve_schema_description(user_query, user_schema, use_rag)
+    
+    # Prompt bölümleri token bütçesine göre kırpılır: kurallar > şema > geçmiş > örnekler
+    budget = PromptBudget(
+        max_tokens=PROMPT_TOKEN_BUDGET,
+        history_message_max_tokens=PROMPT_HISTORY_MESSAGE_MAX_TOKENS,
+    )
+    prompt = budget.fit(
+        rules=rules,
+        schema=schema_description,
+        history=chat_history,
+        samples=samples,
+    )
+    chat_history = prompt.history
     
     # Custom prefix prompt (schema bilgileri ile zenginleştirilmiş)
-    prefix_prompt = f"""Sen bir SQL veri analisti asistanısın. Kullanıcıların veritabanı sorularını anlamak ve doğru SQL sorguları üretmek için tasarlandın.
-
-{schema_description}
-
-## GÖREV KURALLARI:
-1. Kullanıcının sorusunu dikkatlice analiz et ve önceki konuşma bağlamını (chat history) dikkate al.
-2. Uygun SQL sorgusunu YAZ ama ÇALIŞTIRMA - sadece SQL kodunu öner.
-3. SQL sorgusunu şu formatta sun:
-   ```sql
-   SELECT ... FROM ... WHERE ...
-   ```
-4. SQL kodunun dışına uzun açıklamalar yazma. Gerekirse en fazla **1 kısa cümlelik** bir açıklama ekle (örnek: "Bu sorgu gemideki yolcuların yaş dağılımını getirir."). Paragraf, hikâye veya detaylı metin yazma.
-5. Tarih sorgularında SQLite tarih fonksiyonlarını kullan: strftime('%Y-%m-%d', column_name).
-6. Türkçe sütun adları için tırnak işareti kullanmayı unutma.
-
-## ÖNEMLİ: SORGUYU ÇALIŞTIRMA!
-Kullanıcı SQL sorgusunu onayladıktan sonra sistem otomatik olarak çalıştıracak.
-Senin görevin sadece DOĞRU SQL SORGUSU YAZMAK ve (varsa) ÇOK KISA bir açıklama eklemek.
-
-Örnek:
-Kullanıcı: "Kaç kişi hayatta kaldı?"
-Cevap: "İşte ihtiyacınız olan SQL sorgusu:
-
-```sql
-SELECT COUNT(*) AS hayatta_kalan_sayisi
-FROM train
-WHERE Survived = 1;
-```
+    # create_sql_agent prefix'i str.format ile işler; dinamik bölümlerdeki süslü parantezler kaçırılır
+    prefix_parts = [INTRO_PROMPT, _escape_braces(prompt.schema), prompt.rules]
+    if chat_history:
+        prefix_parts.append(_escape_braces(format_history(chat_history)))
+    if prompt.samples:
+        prefix_parts.append(prompt.samples)
+    prefix_prompt = "\n\n".join(prefix_parts) + "\n"
 
-Bu sorgu, 'train' tablosundaki 'Survived' sütununda 1 değeri olan (hayatta kalanlar) kayıtları sayar."
-"""
+    # SQL toolkit (sqlalchemy dahil) ilk agent kurulumunda yüklenir, import süresine eklenmez
+    from langchain_community.agent_toolkits import create_sql_agent
 
     agent_executor = create_sql_agent(
         llm=llm,
         db=db,
         agent_type="openai-tools",
-        extra_tools=[chart_tool],
-        verbose=True,
+        verbose=AGENT_VERBOSE,  # StdOutCallbackHandler yazar; sadece geliştirmede açılır
         max_iterations=15,  # Metadata ile daha karmaşık sorgular için artırıldı
         agent_executor_kwargs={
             "return_intermediate_steps": True
@@ -0,0 +1,273 @@
+"""
+Async Chat Memory Layer
+Non-blocking counterpart of AbstractChatMemory for use inside async endpoints.
+Redis goes through redis.asyncio with a shared connection pool; synchronous
+backends are wrapped by an adapter.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage
+from app.services.memory import (
+    AbstractChatMemory,
+    InMemoryChatMemory,
+    MessageCodec,
+    SHIFT_SUMMARY_SCRIPT,
+    _trim_to_tokens,
+)
+
+
+class AsyncAbstractChatMemory(ABC):
+    """
+    Async interface mirroring AbstractChatMemory.
+    """
+
+    @abstractmethod
+    async def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
+        """Add messages to the session history"""
+        pass
+
+    @abstractmethod
+    async def get_messages(self, session_id: str) -> List[BaseMessage]:
+        """Retrieve all messages for a session"""
+        pass
+
+    @abstractmethod
+    async def clear_session(self, session_id: str) -> None:
+        """Clear all messages for a session"""
+        pass
+
+    @abstractmethod
+    async def session_exists(self, session_id: str) -> bool:
+        """Check if session exists"""
+        pass
+
+    @abstractmethod
+    async def count_messages(self, session_id: str) -> int:
+        """Number of stored messages for a session"""
+        pass
+
+    @abstractmethod
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the rolling summary ({"content", "covered"}) or None"""
+        pass
+
+    @abstractmethod
+    async def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        """Store the rolling summary of the oldest `covered` messages"""
+        pass
+
+    @abstractmethod
+    async def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        pass
+
+    async def get_recent_messages(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ) -> List[BaseMessage]:
+        """Retrieve only the most recent messages (last N and/or last N tokens)"""
+        messages = await self._read_last(session_id, limit)
+        if max_tokens is not None:
+            messages = _trim_to_tokens(messages, max_tokens)
+        return messages
+
+    async def ping(self) -> None:
+        """Raise ConnectionError if the backend is unreachable"""
+        return None
+
+    async def start(self) -> None:
+        """Start background work (e.g. cache invalidation listeners)"""
+        return None
+
+    async def close(self) -> None:
+        """Release connections"""
+        return None
+
+
+class AsyncRedisChatMemory(AsyncAbstractChatMemory):
+    """
+    redis.asyncio implementation sharing one connection pool per process.
+    Uses the same key layout and encoding as RedisChatMemory.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        ttl: int = 86400,
+        max_messages: int = 200,
+        compress_threshold: int = 1024,
+        max_connections: int = 50,
+        socket_timeout: float = 5.0,
+        socket_connect_timeout: float = 2.0,
+        health_check_interval: int = 30,
+    ):
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.codec = MessageCodec(compress_threshold)
+        import redis.asyncio as aioredis
+
+        # Connections are opened lazily on first command, inside the event loop
+        self.pool = aioredis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            db=db,
+            password=password,
+            max_connections=max_connections,
+            timeout=socket_timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            health_check_interval=health_check_interval,
+            decode_responses=False,
+        )
+        self.redis_client = aioredis.Redis(connection_pool=self.pool)
+        self._shift_summary = self.redis_client.register_script(SHIFT_SUMMARY_SCRIPT)
+
+    async def ping(self) -> None:
+        from redis.exceptions import RedisError
+
+        try:
+            await self.redis_client.ping()
+        except RedisError as e:
+            raise ConnectionError(f"Failed to connect to Redis: {e}")
+
+    async def close(self) -> None:
+        await self.redis_client.aclose()
+        await self.pool.disconnect()
+
+    async def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
+        """Append messages with a single RPUSH, cap the list and refresh TTLs"""
+        if not messages:
+            return
+        key = f"chat_history:{session_id}"
+        summary_key = f"chat_summary:{session_id}"
+        serialized = [self.codec.encode(msg) for msg in messages]
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *serialized)
+            pipe.ltrim(key, -self.max_messages, -1)
+            pipe.expire(key, self.ttl)
+            pipe.expire(summary_key, self.ttl)
+            length = (await pipe.execute())[0]
+
+        # Trimmed messages shift list indexes; keep the summary's covered count aligned
+        trimmed = length - self.max_messages
+        if trimmed > 0:
+            await self._shift_summary(keys=[summary_key], args=[trimmed, self.ttl])
+
+    async def get_messages(self, session_id: str) -> List[BaseMessage]:
+        raw_messages = await self.redis_client.lrange(f"chat_history:{session_id}", 0, -1)
+        return self.codec.decode_all(raw_messages)
+
+    async def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        if limit is None:
+            return await self.get_messages(session_id)
+        if limit <= 0:
+            return []
+        raw_messages = await self.redis_client.lrange(f"chat_history:{session_id}", -limit, -1)
+        return self.codec.decode_all(raw_messages)
+
+    async def count_messages(self, session_id: str) -> int:
+        return await self.redis_client.llen(f"chat_history:{session_id}")
+
+    async def clear_session(self, session_id: str) -> None:
+        await self.redis_client.delete(f"chat_history:{session_id}", f"chat_summary:{session_id}")
+
+    async def session_exists(self, session_id: str) -> bool:
+        return await self.redis_client.exists(f"chat_history:{session_id}") > 0
+
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data = await self.redis_client.hgetall(f"chat_summary:{session_id}")
+        if not data or b"content" not in data:
+            return None
+        return {
+            "content": data[b"content"].decode("utf-8"),
+            "covered": max(int(data.get(b"covered", 0)), 0),
+        }
+
+    async def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        key = f"chat_summary:{session_id}"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"content": content, "covered": covered})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+
+class SyncMemoryAdapter(AsyncAbstractChatMemory):
+    """
+    Exposes a synchronous AbstractChatMemory through the async interface.
+    With offload=True calls run in a worker thread (for backends doing I/O);
+    pure in-process backends are called directly.
+    """
+
+    def __init__(self, backend: AbstractChatMemory, offload: bool = True):
+        self.backend = backend
+        self.offload = offload
+
+    async def _call(self, func, *args, **kwargs):
+        if self.offload:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
+        await self._call(self.backend.add_messages, session_id, messages)
+
+    async def get_messages(self, session_id: str) -> List[BaseMessage]:
+        return await self._call(self.backend.get_messages, session_id)
+
+    async def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        return await self._call(self.backend._read_last, session_id, limit)
+
+    async def count_messages(self, session_id: str) -> int:
+        return await self._call(self.backend.count_messages, session_id)
+
+    async def clear_session(self, session_id: str) -> None:
+        await self._call(self.backend.clear_session, session_id)
+
+    async def session_exists(self, session_id: str) -> bool:
+        return await self._call(self.backend.session_exists, session_id)
+
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.backend.get_summary, session_id)
+
+    async def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        await self._call(self.backend.set_summary, session_id, content, covered)
+
+    async def close(self) -> None:
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+
+def create_async_memory_backend(backend_type: str = "redis", **kwargs) -> AsyncAbstractChatMemory:
+    """
+    Factory function for async memory backends.
+
+    Args:
+        backend_type: Type of backend ('redis', 'sqlite', 'in-memory')
+        **kwargs: Backend-specific configuration
+
+    Returns:
+        AsyncAbstractChatMemory implementation
+
+    Raises:
+        ValueError: If backend_type is not supported
+    """
+    if backend_type.lower() == "redis":
+        return AsyncRedisChatMemory(**kwargs)
+    elif backend_type.lower() == "sqlite":
+        from app.services.sqlite_memory import SQLiteChatMemory
+        # Disk I/O (and busy_timeout waits) must not block the event loop
+        return SyncMemoryAdapter(SQLiteChatMemory(**kwargs), offload=True)
+    elif backend_type.lower() == "in-memory":
+        return SyncMemoryAdapter(InMemoryChatMemory(**kwargs), offload=False)
+    else:
+        raise ValueError(
+            f"Unsupported memory backend: {backend_type}. "
+            f"Supported backends: 'redis', 'sqlite', 'in-memory'"
+        )
@@ -0,0 +1,280 @@
+"""
+Chart Builder
+Builds chart payloads ([{name, value}, ...] for Recharts) from the full result of an
+executed query, so the LLM never copies data points by hand. Rows are consumed as they
+are fetched from the cursor and reduced to a fixed point budget:
+- categories: top-N by value plus an "Diğer" (other) bucket
+- time series: rolled up day -> month -> year until they fit, then LTTB
+- numeric x axis: LTTB (Largest-Triangle-Three-Buckets) downsampling
+Without a chart type hint only aggregate-shaped results (one label column plus one
+measure) are charted, and ID columns are never used as the measure or numeric axis.
+Only additive measures (sums, counts) are summed when labels repeat or buckets merge;
+averages, ratios, prices and min/max are averaged instead and get no "Diğer" bucket.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.core.config import CHART_MAX_CATEGORIES, CHART_MAX_POINTS
+
+
+CHART_TYPES = ("bar", "line", "pie")
+OTHER_LABEL = "Diğer"
+
+# "2009", "2009-01", "2009-01-01", "2009-01-01 00:00:00"
+_TIME_PATTERN = re.compile(r"^\d{4}(?:-\d{2}(?:-\d{2}(?:[ T][\d:.]+)?)?)?$")
+# Rollup steps as key prefix lengths: day, month, year
+_TIME_ROLLUPS = (10, 7, 4)
+
+# CustomerId, customer_id, ID: anahtar kolonlar ölçü veya sayısal eksen olamaz
+_ID_COLUMN_PATTERN = re.compile(r"(?i:^id$|_id$)|[a-z0-9]Id$|ID$")
+
+# Toplanamayan ölçüler (kolon adındaki kelimeler): bunların toplamı anlamsız, ortalaması alınır
+_NON_ADDITIVE_WORDS = {
+    "avg", "average", "mean", "median", "ratio", "rate", "percent", "percentage", "pct", "share",
+    "min", "max", "minimum", "maximum", "price",
+}
+# Türkçe ekler (ortalaması, oranı, fiyatı) için önek eşleşmesi
+_NON_ADDITIVE_PREFIXES = ("ortalama", "oran", "yüzde", "yuzde", "medyan", "fiyat")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_time(value: Any) -> bool:
+    return isinstance(value, str) and _TIME_PATTERN.match(value) is not None
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def is_id_column(column: str) -> bool:
+    """Whether the column name marks a key (CustomerId, customer_id, id)"""
+    return _ID_COLUMN_PATTERN.search(column.strip()) is not None
+
+
+def is_additive(column: str) -> bool:
+    """Whether values of this column can be summed across rows (SUM/COUNT-like measures)"""
+    # camelCase ve AVG(Total) gibi adları kelimelere böl
+    words = re.split(r"[\W_]+", re.sub(r"(?<=[a-z])(?=[A-Z])", "_", column).lower())
+    return not any(
+        word in _NON_ADDITIVE_WORDS or word.startswith(_NON_ADDITIVE_PREFIXES) for word in words if word
+    )
+
+
+def _point(name: str, value: float) -> Dict[str, Any]:
+    # Float sums carry noise like 523.0600000000003
+    return {"name": name, "value": round(value, 6) if isinstance(value, float) else value}
+
+
+def lttb(points: List[Tuple[float, float]], threshold: int) -> List[Tuple[float, float]]:
+    """
+    Largest-Triangle-Three-Buckets downsampling of an x-sorted series.
+
+    Keeps the first and last point and, from each of the threshold - 2 buckets in
+    between, the point forming the largest triangle with the previously kept point
+    and the average of the next bucket, which preserves peaks and the overall shape.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0  # Index of the last kept point
+
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / count
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / count
+
+        ax, ay = points[a]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+class ChartPayload:
+    """Chart built from a query result"""
+
+    def __init__(self, chart_type: str, data: List[Dict[str, Any]], source_points: int):
+        self.chart_type = chart_type
+        self.data = data
+        self.source_points = source_points  # Distinct labels before reduction
+
+    @property
+    def reduced(self) -> bool:
+        return len(self.data) < self.source_points
+
+
+class ChartBuilder:
+    """
+    Streaming accumulator: set_columns() once, add_rows() per fetched batch, then build().
+
+    The label is the first non-numeric column (else the first ID column, as a
+    category, else the first numeric column) and the value is the first other
+    numeric column that is not an ID, inferred from the first row. Without a
+    chart_type hint the result must have exactly two columns (label + measure). Values of repeated labels are summed for additive measures and
+    averaged otherwise (see is_additive), so memory grows with the number of
+    distinct labels, not rows.
+    """
+
+    def __init__(
+        self,
+        chart_type: Optional[str] = None,
+        max_categories: int = CHART_MAX_CATEGORIES,
+        max_points: int = CHART_MAX_POINTS,
+    ):
+        self.chart_type = chart_type if chart_type in CHART_TYPES else None
+        self.max_categories = max_categories
+        self.max_points = max_points
+        self.row_count = 0
+        self._columns: List[str] = []
+        self._label_index: Optional[int] = None
+        self._value_index: Optional[int] = None
+        self._kind: Optional[str] = None  # "category", "time" or "numeric"
+        self._disabled = False
+        self._additive = True
+        self._totals: Dict[Any, float] = {}
+        self._counts: Dict[Any, int] = {}  # Toplanamayan ölçülerde ortalama için
+
+    def set_columns(self, columns: List[str]) -> None:
+        self._columns = list(columns)
+        # İpucu yoksa sadece GROUP BY biçimli sonuçlar (etiket + ölçü) grafiğe dönüşür
+        if len(self._columns) < 2 or (self.chart_type is None and len(self._columns) != 2):
+            self._disabled = True
+
+    def _infer(self, row: Sequence[Any]) -> None:
+        ids = {i for i, name in enumerate(self._columns[:len(row)]) if is_id_column(name)}
+        numeric = [i for i, value in enumerate(row) if _is_number(value)]
+        text = [i for i in range(len(row)) if i not in numeric]
+        id_labels = [i for i in numeric if i in ids]
+        self._label_index = text[0] if text else (id_labels[0] if id_labels else 0)
+        values = [i for i in numeric if i != self._label_index and i not in ids]
+        if not values:
+            self._disabled = True
+            return
+        self._value_index = values[0]
+        if self._value_index < len(self._columns):
+            self._additive = is_additive(self._columns[self._value_index])
+
+        label = row[self._label_index]
+        if self._label_index in ids:
+            self._kind = "category"  # Anahtarlar sayısal eksen değil, kategori
+        elif _is_number(label):
+            self._kind = "numeric"
+        elif _is_time(label):
+            self._kind = "time"
+        else:
+            self._kind = "category"
+
+    def add_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        if self._disabled:
+            return
+        totals, counts = self._totals, self._counts
+        for row in rows:
+            self.row_count += 1
+            if self._kind is None:
+                self._infer(row)
+                if self._disabled:
+                    return
+
+            value = row[self._value_index]
+            if not _is_number(value):
+                continue  # NULL or mixed-type cell
+            label = row[self._label_index]
+
+            if self._kind == "numeric":
+                if not _is_number(label):
+                    continue
+                key = float(label)
+            else:
+                if self._kind == "time" and not _is_time(label):
+                    self._kind = "category"  # Not a time axis after all
+                key = str(label)
+            totals[key] = totals.get(key, 0) + value
+            counts[key] = counts.get(key, 0) + 1
+
+    def build(self) -> Optional[ChartPayload]:
+        """Reduce the accumulated series to the point budget"""
+        if self._disabled or not self._totals:
+            return None
+
+        if self._kind == "category":
+            chart_type = self.chart_type or "bar"
+            data = self._build_categories(chart_type)
+        elif self._kind == "time":
+            chart_type = self.chart_type or "line"
+            data = self._build_time_series(chart_type)
+        else:
+            chart_type = self.chart_type or ("bar" if len(self._totals) <= self.max_categories else "line")
+            data = self._build_numeric(chart_type)
+
+        return ChartPayload(chart_type, data, len(self._totals))
+
+    def _budget(self, chart_type: str) -> int:
+        return self.max_points if chart_type == "line" else self.max_categories
+
+    def _values(self, totals: Dict[Any, float], counts: Dict[Any, int]) -> Dict[Any, float]:
+        """Per-label value: the sum for additive measures, the row-weighted mean otherwise"""
+        if self._additive:
+            return totals
+        return {key: total / counts[key] for key, total in totals.items()}
+
+    def _build_categories(self, chart_type: str) -> List[Dict[str, Any]]:
+        items = list(self._values(self._totals, self._counts).items())
+        budget = self._budget(chart_type)
+        if len(items) > budget:
+            # Sorguların ORDER BY sırası, sadece bütçe aşılınca değere göre bozulur
+            items.sort(key=lambda item: item[1], reverse=True)
+            if self._additive:
+                other = sum(value for _, value in items[budget - 1:])
+                items = items[:budget - 1] + [(OTHER_LABEL, other)]
+            else:
+                # Ortalama/oran toplanamaz: "Diğer" yerine sadece ilk N
+                items = items[:budget]
+        return [_point(name, value) for name, value in items]
+
+    def _build_time_series(self, chart_type: str) -> List[Dict[str, Any]]:
+        totals, counts = self._totals, self._counts
+        budget = self._budget(chart_type)
+        for length in _TIME_ROLLUPS:
+            if len(totals) <= budget:
+                break
+            rolled: Dict[str, float] = {}
+            rolled_counts: Dict[str, int] = {}
+            for key, value in totals.items():
+                bucket = key[:length]
+                rolled[bucket] = rolled.get(bucket, 0) + value
+                rolled_counts[bucket] = rolled_counts.get(bucket, 0) + counts[key]
+            totals, counts = rolled, rolled_counts
+
+        items = sorted(self._values(totals, counts).items())
+        if len(items) > budget:
+            keep = lttb([(float(i), item[1]) for i, item in enumerate(items)], budget)
+            items = [items[int(x)] for x, _ in keep]
+        return [_point(name, value) for name, value in items]
+
+    def _build_numeric(self, chart_type: str) -> List[Dict[str, Any]]:
+        points = sorted(self._values(self._totals, self._counts).items())
+        points = lttb(points, self._budget(chart_type))
+        return [_point(_format_number(x), y) for x, y in points]
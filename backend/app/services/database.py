@@ -1,8 +1,21 @@
-from langchain_community.utilities import SQLDatabase
+import logging
+import threading
 from app.core.config import DB_PATH
 import json
 import os
 
+logger = logging.getLogger(__name__)
+
+# Chinook şeması değişmez: yansıtma (reflection) bir kez yapılır ve paylaşılır
+_default_db = None
+_default_db_lock = threading.Lock()
+
+def _connect(db_path: str):
+    from langchain_community.utilities import SQLDatabase
+
+    # SQLite için URI formatı
+    return SQLDatabase.from_uri(f"sqlite:///{db_path}")
+
 def get_db(db_path: str = None):
     """
     Veritabanı bağlantı nesnesini döndürür.
@@ -13,12 +26,25 @@ def get_db(db_path: str = None):
     Returns:
         SQLDatabase connection object
     """
-    if db_path is None:
-        db_path = DB_PATH
-    
-    # SQLite için URI formatı
-    db_uri = f"sqlite:///{db_path}"
-    return SQLDatabase.from_uri(db_uri)
+    global _default_db
+
+    if db_path is not None and db_path != DB_PATH:
+        # Kullanıcı veritabanları yeniden yüklenebilir, her seferinde yansıtılır
+        return _connect(db_path)
+
+    if _default_db is None:
+        with _default_db_lock:
+            if _default_db is None:
+                _default_db = _connect(DB_PATH)
+    return _default_db
+
+def release_db_connections() -> None:
+    """
+    Fork edilen worker'da çağrılır: parent'tan gelen havuz bağlantıları kullanılmadan
+    bırakılır, yansıtılmış şema (paylaşılan bellek) korunur.
+    """
+    if _default_db is not None:
+        _default_db._engine.dispose(close=False)
 
 def get_schema_metadata():
     """
@@ -36,10 +62,10 @@ def get_schema_metadata():
         with open(metadata_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
-        print(f"Warning: Schema metadata dosyası bulunamadı: {metadata_path}")
+        logger.warning("Schema metadata dosyası bulunamadı: %s", metadata_path)
         return {}
     except json.JSONDecodeError as e:
-        print(f"Error: Schema metadata JSON parse hatası: {e}")
+        logger.error("Schema metadata JSON parse hatası: %s", e)
         return {}
 
 def generate_enhanced_schema_description():
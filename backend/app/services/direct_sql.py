@@ -0,0 +1,161 @@
+"""
+Direct SQL Generation
+Single-shot alternative to the tool-calling SQL agent: one LLM call with the
+retrieved schema returns {sql, explanation, chart_type} as structured output.
+The SQL is compiled with EXPLAIN against the target database and, if SQLite
+rejects it, the error is sent back for one repair round.
+"""
+
+import logging
+import sqlite3
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from app.services.agent import INTRO_PROMPT, format_history
+from app.services.llm import get_llm
+from app.services.prompt_budget import PromptBudget
+from app.services.schema_context import resolve_schema_description
+from app.core.config import (
+    DB_PATH,
+    PROMPT_TOKEN_BUDGET,
+    PROMPT_HISTORY_MESSAGE_MAX_TOKENS,
+    DIRECT_SQL_REPAIR_ENABLED,
+)
+from app.core.logging_config import VERBOSE
+
+logger = logging.getLogger(__name__)
+
+
+DIRECT_RULES_PROMPT = """## GÖREV KURALLARI:
+1. Kullanıcının sorusunu ve önceki konuşma bağlamını dikkate alarak TEK bir SQLite SELECT sorgusu yaz.
+2. Sadece yukarıdaki şemada bulunan tablo ve sütunları kullan.
+3. Tarih sorgularında SQLite tarih fonksiyonlarını kullan: strftime('%Y-%m-%d', column_name).
+4. Türkçe veya boşluk içeren sütun adlarını çift tırnak içine al.
+5. explanation alanına en fazla 1 kısa cümle yaz.
+6. Sonuç grafiğe uygunsa chart_type seç: zaman serisi için line, karşılaştırma/sıralama için bar, dağılım için pie; değilse none.
+7. Soru veritabanıyla ilgili değilse sql alanını boş bırak ve cevabı explanation alanına yaz.
+8. Sorguyu çalıştırma; kullanıcı onayladıktan sonra sistem çalıştıracak."""
+
+REPAIR_PROMPT = """Bu sorgu SQLite tarafından derlenemedi:
+{error}
+
+Şemaya göre sorguyu düzelt ve aynı formatta tekrar ver."""
+
+
+class SQLAnswer(BaseModel):
+    """Yapılandırılmış SQL cevabı"""
+    sql: str = Field(description="Soruyu cevaplayan tek bir SQLite SELECT sorgusu; soru veritabanıyla ilgili değilse boş")
+    explanation: str = Field(description="Sorgunun ne getirdiğini anlatan en fazla 1 kısa cümle")
+    chart_type: Literal["bar", "line", "pie", "none"] = Field(
+        default="none", description="Sonuç için önerilen grafik türü"
+    )
+
+
+class DirectSQLResult:
+    """Outcome of direct generation"""
+
+    def __init__(self, answer: SQLAnswer, error: Optional[str], llm_calls: int):
+        self.answer = answer
+        self.error = error  # Remaining SQLite error after the repair round, if any
+        self.llm_calls = llm_calls
+
+    @property
+    def chart_type(self) -> Optional[str]:
+        return None if self.answer.chart_type == "none" else self.answer.chart_type
+
+    def to_text(self) -> str:
+        """Same shape as an agent answer, so the SQL approval flow is unchanged"""
+        parts = []
+        if self.answer.sql.strip():
+            parts.append(f"```sql\n{self.answer.sql.strip()}\n```")
+        if self.answer.explanation:
+            parts.append(self.answer.explanation.strip())
+        if self.error:
+            parts.append(f"⚠ Sorgu doğrulanamadı: {self.error}")
+        return "\n\n".join(parts)
+
+
+def explain_sql(sql: str, db_path: str) -> Optional[str]:
+    """
+    Compile the query with EXPLAIN on a read-only connection (nothing is executed).
+
+    Returns:
+        SQLite error message, or None if the query compiles
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        conn.execute(f"EXPLAIN {sql.strip().rstrip(';')}")
+        return None
+    except sqlite3.Error as e:
+        return str(e)
+    finally:
+        conn.close()
+
+
+def _build_messages(
+    chat_history: List[BaseMessage],
+    user_query: str,
+    user_schema: Optional[str],
+    use_rag: bool,
+) -> List[BaseMessage]:
+    schema_description = resolve_schema_description(user_query, user_schema, use_rag)
+
+    # Aynı bütçe sırası: kurallar > şema > geçmiş (örnekler structured output'ta gereksiz)
+    budget = PromptBudget(
+        max_tokens=PROMPT_TOKEN_BUDGET,
+        history_message_max_tokens=PROMPT_HISTORY_MESSAGE_MAX_TOKENS,
+    )
+    prompt = budget.fit(rules=DIRECT_RULES_PROMPT, schema=schema_description, history=chat_history)
+
+    system_parts = [INTRO_PROMPT, prompt.schema, prompt.rules]
+    if prompt.history:
+        system_parts.append(format_history(prompt.history))
+    return [SystemMessage(content="\n\n".join(system_parts)), HumanMessage(content=user_query)]
+
+
+def generate_sql(
+    chat_history: Optional[List[BaseMessage]] = None,
+    user_query: str = "",
+    db_path: Optional[str] = None,
+    user_schema: Optional[str] = None,
+    use_rag: bool = True,
+    config: Optional[Dict[str, Any]] = None,
+) -> DirectSQLResult:
+    """
+    Generate SQL with one structured LLM call (plus at most one repair call).
+
+    Args:
+        chat_history: Summary + recent messages
+        user_query: User's question
+        db_path: Custom database path. If None, uses default Chinook DB.
+        user_schema: User-uploaded database schema description. Takes precedence over RAG.
+        use_rag: Whether to use RAG for schema retrieval
+        config: Runnable config (run metadata for the LLM scheduler, callbacks)
+
+    Returns:
+        DirectSQLResult
+    """
+    db_path = db_path or DB_PATH
+    structured_llm = get_llm().with_structured_output(SQLAnswer)
+    messages = _build_messages(chat_history or [], user_query, user_schema, use_rag)
+
+    answer = structured_llm.invoke(messages, config=config)
+    if answer is None:
+        raise ValueError("LLM did not return a structured SQL answer")
+    llm_calls = 1
+    error = explain_sql(answer.sql, db_path) if answer.sql.strip() else None
+
+    if error and DIRECT_SQL_REPAIR_ENABLED:
+        logger.info("🔧 Repairing generated SQL: %s", error)
+        messages = messages + [
+            AIMessage(content=answer.sql),
+            HumanMessage(content=REPAIR_PROMPT.format(error=error)),
+        ]
+        repaired = structured_llm.invoke(messages, config=config)
+        llm_calls += 1
+        if repaired is not None:
+            answer = repaired
+        error = explain_sql(answer.sql, db_path) if answer.sql.strip() else None
+
+    logger.info("⚡ Direct SQL generation finished in %d LLM call(s)", llm_calls, extra=VERBOSE)
+    return DirectSQLResult(answer, error, llm_calls)
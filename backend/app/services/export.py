@@ -0,0 +1,261 @@
+"""
+Streaming Result Export
+Writes an approved query's result as CSV, JSON, XLSX or Parquet straight from the
+SQLite cursor, batch by batch, so memory stays constant regardless of the result size.
+Formats that need a finished file (XLSX, Parquet) are spooled to a temporary file first.
+"""
+
+import base64
+import csv
+import io
+import json
+import sqlite3
+import tempfile
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from app.services.sql_executor import connect_read_only, iter_batches
+
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat:
+    def __init__(self, media_type: str, extension: str, writer: Callable[..., Iterator[bytes]], module: Optional[str] = None):
+        self.media_type = media_type
+        self.extension = extension
+        self.writer = writer
+        self.module = module  # Optional dependency needed by the writer
+
+
+class ExportCursor:
+    """An executed query whose rows are streamed by an export writer"""
+
+    def __init__(self, conn: sqlite3.Connection, cursor: sqlite3.Cursor):
+        self.conn = conn
+        self.cursor = cursor
+        self.columns = [column[0] for column in cursor.description or []]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_export_cursor(db_path: str, sql_query: str) -> ExportCursor:
+    """
+    Execute a validated query, leaving the rows unread.
+
+    Raises:
+        sqlite3.Error: Query failed (before any bytes are sent)
+    """
+    conn = connect_read_only(db_path)
+    try:
+        cursor = conn.execute(sql_query)
+    except Exception:
+        conn.close()
+        raise
+    return ExportCursor(conn, cursor)
+
+
+def _stream_csv(export: ExportCursor) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM: Excel, Türkçe karakterleri ancak BOM varsa UTF-8 olarak açar
+    buffer.write("\ufeff")
+    writer.writerow(export.columns)
+    for batch in iter_batches(export.cursor):
+        writer.writerows(tuple(row) for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _xlsx_cell(value: Any) -> Any:
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    # Çalışma sayfası BLOB ve kontrol karakterlerini kabul etmez; satırın ortasında hata vermesin
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def _stream_xlsx(export: ExportCursor) -> Iterator[bytes]:
+    from openpyxl import Workbook
+
+    # write_only streams rows to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Results")
+    sheet.append(export.columns)
+    for batch in iter_batches(export.cursor):
+        for row in batch:
+            sheet.append([_xlsx_cell(value) for value in row])
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        yield from _spool_chunks(spool)
+
+
+def _json_default(value: Any) -> str:
+    # BLOB sütunları
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+def _stream_json(export: ExportCursor) -> Iterator[bytes]:
+    """Array of row objects, the same shape the client-side JSON download produced"""
+    separator = "[\n  "
+    for batch in iter_batches(export.cursor):
+        parts = []
+        for row in batch:
+            parts.append(separator)
+            parts.append(json.dumps(dict(zip(export.columns, row)), ensure_ascii=False, default=_json_default))
+            separator = ",\n  "
+        yield "".join(parts).encode("utf-8")
+    yield b"[]\n" if separator == "[\n  " else b"\n]\n"
+
+
+def _spool_chunks(spool: BinaryIO) -> Iterator[bytes]:
+    spool.seek(0)
+    while True:
+        chunk = spool.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _arrow_type(values: List[Any]):
+    """Narrowest type for one batch of a column; null if every value is NULL"""
+    import pyarrow as pa
+
+    seen = {type(value) for value in values if value is not None}
+    if not seen:
+        return pa.null()
+    if seen == {int}:
+        return pa.int64()
+    if seen <= {int, float}:
+        return pa.float64()
+    if seen == {bytes}:
+        return pa.binary()
+    return pa.string()
+
+
+def _widen(current, new):
+    """Common type of two batch types: null < int64 < float64, anything else string"""
+    import pyarrow as pa
+
+    if current == new or new == pa.null():
+        return current
+    if current == pa.null():
+        return new
+    if {current, new} == {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_values(values: List[Any], arrow_type) -> List[Any]:
+    import pyarrow as pa
+
+    # SQLite sütunları tip karıştırabilir; metin ve ondalık sütunlarda değerler şemaya çevrilir
+    if arrow_type == pa.string():
+        return [None if value is None else str(value) for value in values]
+    if arrow_type == pa.float64():
+        return [None if value is None else float(value) for value in values]
+    return values
+
+
+def _arrow_table(schema, columns: List[List[Any]]):
+    import pyarrow as pa
+
+    arrays = [
+        pa.array(_arrow_values(values, field.type), type=field.type)
+        for values, field in zip(columns, schema)
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _rewrite_spool(spool: BinaryIO, schema) -> Tuple[BinaryIO, Any]:
+    """Copy the row groups written so far into a new spool with a wider schema"""
+    import pyarrow.parquet as pq
+
+    spool.seek(0)
+    source = pq.ParquetFile(spool)
+    target = tempfile.TemporaryFile()
+    writer = pq.ParquetWriter(target, schema)
+    for index in range(source.num_row_groups):
+        table = source.read_row_group(index)
+        writer.write_table(_arrow_table(schema, [column.to_pylist() for column in table.columns]))
+    return target, writer
+
+
+def _stream_parquet(export: ExportCursor) -> Iterator[bytes]:
+    """
+    One row group per batch. SQLite has no result schema, so column types are
+    inferred from the rows; when a later batch needs a wider type (a REAL after
+    INTEGERs, text in a numeric column, values after NULL-only rows) the row
+    groups written so far are rewritten with the widened schema. A column
+    widens at most three times (null, int64, float64, string).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spool = tempfile.TemporaryFile()
+    writer = None
+    schema = pa.schema([pa.field(name, pa.null()) for name in export.columns])
+    try:
+        for batch in iter_batches(export.cursor):
+            columns = [list(values) for values in zip(*batch)]
+            widened = pa.schema([
+                pa.field(field.name, _widen(field.type, _arrow_type(values)))
+                for field, values in zip(schema, columns)
+            ])
+            if writer is None:
+                writer = pq.ParquetWriter(spool, widened)
+            elif not widened.equals(schema):
+                writer.close()
+                new_spool, writer = _rewrite_spool(spool, widened)
+                spool.close()
+                spool = new_spool
+            schema = widened
+            writer.write_table(_arrow_table(schema, columns))
+
+        # Hiç değer almayan (tamamen NULL veya boş sonuç) sütunlar metin olarak yazılır
+        final = pa.schema([
+            pa.field(field.name, pa.string() if field.type == pa.null() else field.type)
+            for field in schema
+        ])
+        if writer is None:
+            writer = pq.ParquetWriter(spool, final)
+        elif not final.equals(schema):
+            writer.close()
+            new_spool, writer = _rewrite_spool(spool, final)
+            spool.close()
+            spool = new_spool
+        writer.close()
+        writer = None
+        yield from _spool_chunks(spool)
+    finally:
+        if writer is not None:
+            writer.close()
+        spool.close()
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("text/csv; charset=utf-8", "csv", _stream_csv),
+    "json": ExportFormat("application/json; charset=utf-8", "json", _stream_json),
+    "xlsx": ExportFormat(
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx", _stream_xlsx, "openpyxl"
+    ),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet", _stream_parquet, "pyarrow"),
+}
+
+
+def stream_export(export: ExportCursor, fmt: str) -> Iterator[bytes]:
+    """Yield the encoded result; closes the connection when done or abandoned"""
+    try:
+        for chunk in EXPORT_FORMATS[fmt].writer(export):
+            if chunk:
+                yield chunk
+    finally:
+        export.close()
@@ -0,0 +1,121 @@
+"""
+Windowed Chat History with Rolling Summary
+Keeps per-turn history cost constant: the agent sees a summary of older messages
+plus a window of recent ones, and the summary is refreshed in the background
+"""
+
+import logging
+from typing import List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from app.services.async_memory import AsyncAbstractChatMemory
+from app.services.metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_INSTRUCTIONS = (
+    "Aşağıdaki konuşmayı SQL asistanının ileride ihtiyaç duyacağı bilgileri koruyarak özetle: "
+    "kullanıcının ilgilendiği tablolar, filtreler, tercihler ve çalıştırılan sorguların amacı. "
+    "En fazla 8 madde yaz, tablo veya ham veri kopyalama."
+)
+
+
+class HistorySummarizer:
+    """
+    Builds the chat context for a turn and maintains the rolling summary.
+    """
+
+    def __init__(
+        self,
+        memory: AsyncAbstractChatMemory,
+        window: int = 20,
+        max_tokens: Optional[int] = None,
+        threshold: int = 40,
+    ):
+        self.memory = memory
+        self.window = window
+        self.max_tokens = max_tokens
+        self.threshold = threshold
+        # Summarize in batches so the LLM is not called on every turn
+        self.batch = max(window // 2, 1)
+        # Background tasks run on the event loop, so a plain set is enough
+        self._in_progress = set()
+
+    async def load_context(self, session_id: str) -> List[BaseMessage]:
+        """
+        Read the summary (as a SystemMessage) followed by the messages it does not cover.
+        At most 2 * window recent messages are read, regardless of session length.
+        """
+        summary = await self.memory.get_summary(session_id)
+        if not summary:
+            return await self.memory.get_recent_messages(
+                session_id, limit=self.window, max_tokens=self.max_tokens
+            )
+
+        uncovered = await self.memory.count_messages(session_id) - summary["covered"]
+        limit = min(max(uncovered, 0), 2 * self.window)
+        recent = await self.memory.get_recent_messages(
+            session_id, limit=limit, max_tokens=self.max_tokens
+        )
+        return [SystemMessage(content=summary["content"])] + recent
+
+    async def maybe_summarize(self, session_id: str) -> None:
+        """
+        Fold messages older than the window into the summary once enough are pending.
+        Meant to run as a background task after the response is sent.
+        """
+        if session_id in self._in_progress:
+            return
+        self._in_progress.add(session_id)
+
+        try:
+            count = await self.memory.count_messages(session_id)
+            if count <= self.threshold:
+                return
+
+            summary = await self.memory.get_summary(session_id)
+            covered = summary["covered"] if summary else 0
+            target = count - self.window
+            if target - covered < self.batch:
+                return
+
+            # Only the uncovered tail is read, never the whole history
+            tail = await self.memory.get_recent_messages(session_id, limit=count - covered)
+            to_fold = tail[:target - covered]
+            with track_stage("history_summary"):
+                content = await self._summarize(
+                    session_id, summary["content"] if summary else None, to_fold
+                )
+            await self.memory.set_summary(session_id, content, target)
+            logger.info("📝 Summarized %d messages for session %s", len(to_fold), session_id)
+        except Exception as e:
+            logger.warning("⚠ History summarization failed for session %s: %s", session_id, e)
+        finally:
+            self._in_progress.discard(session_id)
+
+    async def _summarize(
+        self, session_id: str, previous: Optional[str], messages: List[BaseMessage]
+    ) -> str:
+        from app.services.llm import get_llm
+
+        lines = []
+        if previous:
+            lines.append(f"Önceki özet:\n{previous}\n")
+        for message in messages:
+            role = "Kullanıcı" if isinstance(message, HumanMessage) else "Asistan"
+            lines.append(f"{role}: {message.content}")
+
+        response = await get_llm().ainvoke(
+            [
+                SystemMessage(content=SUMMARY_INSTRUCTIONS),
+                HumanMessage(content="\n".join(lines)),
+            ],
+            config={"metadata": {"session_id": session_id}},
+        )
+        content = response.content
+        if isinstance(content, list):
+            content = " ".join(
+                item.get("text", "") if isinstance(item, dict) else str(item)
+                for item in content
+            )
+        return str(content).strip()
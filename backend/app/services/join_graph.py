@@ -0,0 +1,163 @@
+"""
+Join Graph for Schema Context Expansion
+Builds an undirected table graph from SQLite foreign keys and metadata relationships,
+so retrieval can add the intermediate tables needed to join the retrieved ones
+"""
+
+import re
+import sqlite3
+from collections import deque
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# "Invoice.CustomerId -> Customer.CustomerId" style relationship strings
+_COLUMN_REF_PATTERN = re.compile(r"(\w+)\.(\w+)\s*->\s*(\w+)\.(\w+)")
+
+
+class JoinGraph:
+    """
+    Undirected graph of joinable tables.
+    Each edge keeps the join condition so it can be shown to the LLM.
+    """
+
+    def __init__(self):
+        self._edges: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def tables(self) -> Set[str]:
+        return set(self._edges)
+
+    def add_table(self, table: str) -> None:
+        self._edges.setdefault(table, {})
+
+    def add_edge(self, left: str, right: str, condition: str = "") -> None:
+        """Add an undirected edge; an existing condition is never overwritten by an empty one"""
+        if left == right:
+            return
+        self.add_table(left)
+        self.add_table(right)
+        if condition or right not in self._edges[left]:
+            self._edges[left][right] = condition
+            self._edges[right][left] = condition
+
+    def join_condition(self, left: str, right: str) -> str:
+        return self._edges.get(left, {}).get(right, "")
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        Breadth-first search between two tables.
+
+        Returns:
+            List of tables from source to target (inclusive) or None if not connected
+        """
+        if source not in self._edges or target not in self._edges:
+            return None
+        if source == target:
+            return [source]
+
+        previous: Dict[str, Optional[str]] = {source: None}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbor in sorted(self._edges[current]):
+                if neighbor in previous:
+                    continue
+                previous[neighbor] = current
+                if neighbor == target:
+                    path = [target]
+                    while previous[path[-1]] is not None:
+                        path.append(previous[path[-1]])
+                    return list(reversed(path))
+                queue.append(neighbor)
+        return None
+
+    def expand(self, tables: Iterable[str]) -> Tuple[List[str], List[Tuple[str, str, str]]]:
+        """
+        Connect the given tables through their shortest join paths.
+
+        Args:
+            tables: Tables retrieved for the question
+
+        Returns:
+            Tuple of (added_tables, join_edges). added_tables are the intermediate
+            tables that were not in the input, in path order. join_edges are
+            (left, right, condition) tuples along the connecting paths.
+        """
+        requested = [t for t in dict.fromkeys(tables) if t in self._edges]
+        added: List[str] = []
+        edges: List[Tuple[str, str, str]] = []
+        seen_edges: Set[frozenset] = set()
+
+        for source, target in combinations(requested, 2):
+            path = self.shortest_path(source, target)
+            if not path:
+                continue
+            for table in path[1:-1]:
+                if table not in requested and table not in added:
+                    added.append(table)
+            for left, right in zip(path, path[1:]):
+                key = frozenset((left, right))
+                if key not in seen_edges:
+                    seen_edges.add(key)
+                    edges.append((left, right, self.join_condition(left, right)))
+
+        return added, edges
+
+    @classmethod
+    def from_sources(
+        cls,
+        db_path: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+    ) -> "JoinGraph":
+        """
+        Build the graph from PRAGMA foreign_key_list and metadata relationships.
+
+        Args:
+            db_path: SQLite database to read foreign keys from
+            metadata: Parsed schema_metadata.json content
+        """
+        graph = cls()
+        if db_path:
+            graph._load_foreign_keys(db_path)
+        if metadata:
+            graph._load_metadata_relationships(metadata)
+        return graph
+
+    def _load_foreign_keys(self, db_path: str) -> None:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            tables = [
+                row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master "
+                    "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+                )
+            ]
+            for table in tables:
+                self.add_table(table)
+                escaped = table.replace('"', '""')
+                for fk in conn.execute(f'PRAGMA foreign_key_list("{escaped}")'):
+                    # (id, seq, table, from, to, on_update, on_delete, match)
+                    ref_table, from_col, to_col = fk[2], fk[3], fk[4]
+                    self.add_edge(
+                        table, ref_table,
+                        f"{table}.{from_col} = {ref_table}.{to_col}"
+                    )
+        finally:
+            conn.close()
+
+    def _load_metadata_relationships(self, metadata: Dict) -> None:
+        tables = metadata.get("tables", {})
+        for table_name, table_info in tables.items():
+            self.add_table(table_name)
+            for rel in table_info.get("relationships") or []:
+                match = _COLUMN_REF_PATTERN.search(rel)
+                if match:
+                    left, left_col, right, right_col = match.groups()
+                    if left in tables and right in tables:
+                        self.add_edge(left, right, f"{left}.{left_col} = {right}.{right_col}")
+                    continue
+                # "InvoiceLine: One-to-Many with InvoiceLine table" style entries
+                target = rel.split(":", 1)[0].strip()
+                if target in tables:
+                    self.add_edge(table_name, target)
@@ -1,15 +1,24 @@
+import logging
+from langchain_core.messages import HumanMessage
 from app.services.llm_factory import LLMFactory
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_scheduler import get_llm_scheduler
 from app.core.config import (
-    LLM_BACKEND, 
-    GOOGLE_API_KEY, 
-    OLLAMA_BASE_URL, 
-    OLLAMA_MODEL
+    LLM_BACKEND,
+    GOOGLE_API_KEY,
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    LLM_REQUEST_TIMEOUT,
+    OLLAMA_KEEP_ALIVE
 )
 
+logger = logging.getLogger(__name__)
+
 def get_llm():
     """
     Yapılandırılmış LLM modelini döndürür.
     Backend type (Gemini/Ollama) config'den okunur.
+    İstemci process başına bir kez oluşturulur; sonraki çağrılar aynı örneği döndürür.
     """
     if LLM_BACKEND.lower() == "gemini":
         if not GOOGLE_API_KEY:
@@ -17,12 +26,31 @@ def get_llm():
         return LLMFactory.create_chat_model(
             backend="gemini",
             api_key=GOOGLE_API_KEY,
-            model="gemini-2.5-flash"
+            model="gemini-2.5-flash",
+            cache=get_llm_cache(),
+            scheduler=get_llm_scheduler("gemini"),
+            timeout=LLM_REQUEST_TIMEOUT
         )
     else:  # ollama
-        print(f"✓ Using Ollama LLM: {OLLAMA_MODEL} at {OLLAMA_BASE_URL}")
         return LLMFactory.create_chat_model(
             backend="ollama",
             base_url=OLLAMA_BASE_URL,
-            model=OLLAMA_MODEL
-        )
\ No newline at end of file
+            model=OLLAMA_MODEL,
+            cache=get_llm_cache(),
+            scheduler=get_llm_scheduler("ollama"),
+            timeout=LLM_REQUEST_TIMEOUT,
+            keep_alive=OLLAMA_KEEP_ALIVE
+        )
+
+
+def warm_up_llm() -> None:
+    """
+    Startup'ta modele küçük bir istek atar: bağlantı havuzu açılır ve Ollama
+    modeli belleğe yükler, böylece ilk kullanıcı isteği bu maliyeti ödemez.
+    Response cache atlanır, aksi halde ikinci startup'ta istek hiç gitmez.
+    """
+    # Shallow copy: shares the underlying HTTP client of the shared instance
+    llm = get_llm().model_copy(update={"cache": False})
+    logger.info("🔥 Warming up %s LLM...", LLM_BACKEND)
+    llm.invoke([HumanMessage(content="ping")], config={"run_name": "llm_warmup"})
+    logger.info("✓ LLM warm-up complete")
@@ -0,0 +1,283 @@
+"""
+LLM Response Cache
+Persistent cache for chat model calls. With temperature=0 an identical request
+(model + parameters + bound tool schemas + messages) yields the same completion,
+so repeated agent steps are answered locally instead of calling the provider.
+"""
+
+import logging
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_key(prompt: str, llm_string: str) -> str:
+    """
+    LangChain puts the model config and invocation kwargs (including bound tools)
+    into llm_string and the serialized messages into prompt.
+    """
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _serialize(return_val: RETURN_VAL_TYPE) -> str:
+    return dumps(list(return_val))
+
+
+def _deserialize(data: str) -> Optional[RETURN_VAL_TYPE]:
+    try:
+        return loads(data)
+    except Exception:
+        # Written by an incompatible langchain version; treat as a miss
+        return None
+
+
+class _CacheStats:
+    """Thread-safe hit/miss counters shared by the cache implementations"""
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _record(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class SQLiteLLMCache(_CacheStats, BaseCache):
+    """
+    Local SQLite cache bounded by entry count (LRU) and TTL.
+    Eviction runs every `evict_every` writes rather than on each call.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        ttl: int = 86400,
+        evict_every: int = 100,
+    ):
+        _CacheStats.__init__(self)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._writes = 0
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = _cache_key(prompt, llm_string)
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        value = None
+        if row is not None:
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            else:
+                value = _deserialize(row[0])
+                if value is not None:
+                    conn.execute(
+                        "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+                    )
+        self._record(value is not None)
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_access) "
+            "VALUES (?, ?, ?, ?)",
+            (_cache_key(prompt, llm_string), _serialize(return_val), now, now),
+        )
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self._evict()
+
+    def _evict(self) -> None:
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,)
+        ).rowcount
+        overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        with self._stats_lock:
+            self.evictions += removed
+
+    def clear(self, **kwargs: Any) -> None:
+        self._conn().execute("DELETE FROM llm_cache")
+
+
+class RedisLLMCache(_CacheStats, BaseCache):
+    """
+    Redis cache shared by all workers. Entries expire via TTL; the entry count is
+    bounded with a sorted set of access times (least recently used evicted first).
+    Redis errors are treated as cache misses so the LLM call still goes through.
+    """
+
+    KEY_PREFIX = "llm_cache:"
+    INDEX_KEY = "llm_cache_index"
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        max_entries: int = 10000,
+        ttl: int = 86400,
+    ):
+        import redis
+
+        _CacheStats.__init__(self)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_client = redis.Redis(
+            host=host,
+            port=port,
+            db=db,
+            password=password,
+            socket_timeout=2,
+            socket_connect_timeout=2,
+        )
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = _cache_key(prompt, llm_string)
+        value = None
+        try:
+            data = self.redis_client.get(self.KEY_PREFIX + key)
+            if data is not None:
+                value = _deserialize(data.decode("utf-8"))
+                self.redis_client.zadd(self.INDEX_KEY, {key: time.time()})
+        except Exception as e:
+            logger.warning("⚠ LLM cache lookup failed: %s", e)
+        self._record(value is not None)
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = _cache_key(prompt, llm_string)
+        try:
+            with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(self.KEY_PREFIX + key, _serialize(return_val), ex=self.ttl)
+                pipe.zadd(self.INDEX_KEY, {key: time.time()})
+                pipe.zcard(self.INDEX_KEY)
+                size = pipe.execute()[-1]
+            if size > self.max_entries:
+                self._evict(size - self.max_entries)
+        except Exception as e:
+            logger.warning("⚠ LLM cache update failed: %s", e)
+
+    def _evict(self, count: int) -> None:
+        # Index entries of TTL-expired keys are evicted here too (they sort oldest)
+        evicted: List = [member for member, _ in self.redis_client.zpopmin(self.INDEX_KEY, count)]
+        if evicted:
+            self.redis_client.delete(*[self.KEY_PREFIX + k.decode("utf-8") for k in evicted])
+            with self._stats_lock:
+                self.evictions += len(evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        keys = [self.KEY_PREFIX + k.decode("utf-8") for k in self.redis_client.zrange(self.INDEX_KEY, 0, -1)]
+        if keys:
+            self.redis_client.delete(*keys)
+        self.redis_client.delete(self.INDEX_KEY)
+
+
+_llm_cache: Optional[BaseCache] = None
+_llm_cache_initialized = False
+
+
+def get_llm_cache() -> Optional[BaseCache]:
+    """
+    Get the process-wide LLM cache configured by LLM_CACHE_BACKEND
+    ('sqlite', 'redis' or 'none'). Returns None when caching is disabled
+    or the backend cannot be initialized.
+    """
+    global _llm_cache, _llm_cache_initialized
+    if _llm_cache_initialized:
+        return _llm_cache
+
+    from app.core.config import (
+        LLM_CACHE_BACKEND, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+        REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD,
+    )
+
+    backend = LLM_CACHE_BACKEND.lower()
+    try:
+        if backend == "sqlite":
+            _llm_cache = SQLiteLLMCache(
+                LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL
+            )
+        elif backend == "redis":
+            _llm_cache = RedisLLMCache(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                password=REDIS_PASSWORD,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                ttl=LLM_CACHE_TTL,
+            )
+        if _llm_cache is not None:
+            logger.info("✓ LLM response cache enabled (%s)", backend)
+    except Exception as e:
+        logger.warning("⚠ LLM cache initialization failed, caching disabled: %s", e)
+        _llm_cache = None
+
+    _llm_cache_initialized = True
+    return _llm_cache
@@ -3,10 +3,19 @@ LLM Factory - Configurable LLM Backend
 Supports multiple LLM providers (Gemini, Ollama) following Factory Pattern
 """
 
-from typing import Protocol
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple, Union
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.language_models import BaseChatModel
 from langchain_core.embeddings import Embeddings
 
+logger = logging.getLogger(__name__)
+
 
 class LLMProvider(Protocol):
     """Abstract LLM Provider Interface"""
@@ -17,19 +26,71 @@ class LLMProvider(Protocol):
         ...
 
 
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+
+def _keep_alive_seconds(keep_alive: Optional[Union[int, str]]) -> Optional[int]:
+    """
+    Convert an Ollama keep_alive duration ("30m", "1h30m", "300", -1) to
+    integer seconds. OllamaEmbeddings only accepts an int, ChatOllama also
+    takes the duration string as is.
+    """
+    if keep_alive is None or isinstance(keep_alive, int):
+        return keep_alive
+    value = keep_alive.strip()
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-")
+    try:
+        return sign * int(float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        raise ValueError(f"Invalid keep_alive duration: {keep_alive!r}")
+    return sign * int(sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts))
+
+
+def _build_chat_model(model_cls: type, scheduler: Optional[Any], **kwargs) -> BaseChatModel:
+    """Instantiate model_cls; with a scheduler, every provider call is admission controlled"""
+    if scheduler is None:
+        return model_cls(**kwargs)
+    from app.services.llm_scheduler import admission_controlled
+    model = admission_controlled(model_cls)(**kwargs)
+    model._llm_scheduler = scheduler
+    return model
+
+
 class GeminiProvider:
     """Google Gemini LLM Provider"""
     
-    def __init__(self, api_key: str, model: str = "gemini-2.0-flash-exp"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.0-flash-exp",
+        cache: Optional[BaseCache] = None,
+        timeout: Optional[float] = None,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+        scheduler: Optional[Any] = None
+    ):
         self.api_key = api_key
         self.model = model
+        self.cache = cache
+        self.timeout = timeout
+        self.callbacks = callbacks
+        self.scheduler = scheduler
     
     def create_chat_model(self) -> BaseChatModel:
         from langchain_google_genai import ChatGoogleGenerativeAI
-        return ChatGoogleGenerativeAI(
+        return _build_chat_model(
+            ChatGoogleGenerativeAI,
+            self.scheduler,
             model=self.model,
             google_api_key=self.api_key,
-            temperature=0
+            temperature=0,
+            cache=self.cache,
+            timeout=self.timeout,
+            callbacks=self.callbacks
         )
     
     def create_embedding_model(self) -> Embeddings:
@@ -47,69 +108,213 @@ class OllamaProvider:
         self, 
         base_url: str = "http://localhost:11434",
         model: str = "llama3.1:8b",
-        embedding_model: str = "nomic-embed-text"
+        embedding_model: str = "nomic-embed-text",
+        cache: Optional[BaseCache] = None,
+        timeout: Optional[float] = None,
+        keep_alive: Optional[Union[int, str]] = None,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+        scheduler: Optional[Any] = None
     ):
         self.base_url = base_url
         self.model = model
         self.embedding_model = embedding_model
+        self.cache = cache
+        # httpx client options; the client keeps pooled keep-alive connections
+        self.client_kwargs = {"timeout": timeout} if timeout else {}
+        # How long the Ollama server keeps the model loaded between requests
+        self.keep_alive = keep_alive
+        self.callbacks = callbacks
+        # LLMScheduler: provider calls (not cache hits) wait for a slot
+        self.scheduler = scheduler
     
     def create_chat_model(self) -> BaseChatModel:
         from langchain_ollama import ChatOllama
-        return ChatOllama(
+        return _build_chat_model(
+            ChatOllama,
+            self.scheduler,
             base_url=self.base_url,
             model=self.model,
-            temperature=0
+            temperature=0,
+            cache=self.cache,
+            client_kwargs=self.client_kwargs,
+            keep_alive=self.keep_alive,
+            callbacks=self.callbacks
         )
     
     def create_embedding_model(self) -> Embeddings:
         from langchain_ollama import OllamaEmbeddings
         return OllamaEmbeddings(
             base_url=self.base_url,
-            model=self.embedding_model
+            model=self.embedding_model,
+            client_kwargs=self.client_kwargs,
+            keep_alive=_keep_alive_seconds(self.keep_alive)
         )
 
 
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps a provider embedding model and embeds documents in fixed-size batches.
+    Batches are sent with bounded parallelism, retried with exponential backoff
+    and reported to an optional progress callback as they complete.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.progress_callback = progress_callback
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a single batch, retrying transient provider errors"""
+        attempt = 0
+        while True:
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning("⚠ Embedding batch failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents batch by batch, preserving input order"""
+        batches = [
+            texts[i:i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        done = 0
+
+        if len(batches) <= 1 or self.max_concurrency == 1:
+            for idx, batch in enumerate(batches):
+                results[idx] = self._embed_batch(batch)
+                done += len(batch)
+                if self.progress_callback:
+                    self.progress_callback(done, len(texts))
+        else:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._embed_batch, batch): idx
+                    for idx, batch in enumerate(batches)
+                }
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    results[idx] = future.result()
+                    done += len(batches[idx])
+                    if self.progress_callback:
+                        self.progress_callback(done, len(texts))
+
+        return [vector for batch in results for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are single requests, so they go straight to the provider"""
+        return self.embeddings.embed_query(text)
+
+
 class LLMFactory:
     """
     Factory for creating LLM instances based on configuration.
     Follows Factory Pattern and Dependency Inversion Principle.
+    
+    Clients are created once per provider configuration and shared process-wide,
+    so HTTP connection pools (and TLS sessions) are reused across requests.
+    LangChain chat models are stateless per call; binding tools returns a new
+    runnable and does not modify the shared instance.
     """
     
+    _chat_models: Dict[Tuple, BaseChatModel] = {}
+    _embedding_models: Dict[Tuple, Embeddings] = {}
+    _lock = threading.Lock()
+    
     @staticmethod
-    def create_chat_model(
-        backend: str = "ollama",
-        **kwargs
-    ) -> BaseChatModel:
-        """
-        Create chat model based on backend type.
-        
-        Args:
-            backend: "gemini" or "ollama"
-            **kwargs: Provider-specific configuration
-        
-        Returns:
-            BaseChatModel instance
-        """
-        backend = backend.lower()
-        
+    def _config_key(backend: str, kwargs: Dict[str, Any], keys: Tuple[str, ...]) -> Tuple:
+        # Caches and schedulers are keyed by identity (they are not hashable by value)
+        return (backend,) + tuple(
+            id(kwargs.get(k)) if k in ("cache", "scheduler") else kwargs.get(k) for k in keys
+        )
+    
+    @staticmethod
+    def _create_provider(backend: str, kwargs: Dict[str, Any]) -> LLMProvider:
         if backend == "gemini":
-            provider = GeminiProvider(
+            return GeminiProvider(
                 api_key=kwargs.get("api_key", ""),
-                model=kwargs.get("model", "gemini-2.0-flash-exp")
+                model=kwargs.get("model", "gemini-2.0-flash-exp"),
+                cache=kwargs.get("cache"),
+                timeout=kwargs.get("timeout"),
+                callbacks=kwargs.get("callbacks"),
+                scheduler=kwargs.get("scheduler")
             )
         elif backend == "ollama":
-            provider = OllamaProvider(
+            return OllamaProvider(
                 base_url=kwargs.get("base_url", "http://localhost:11434"),
                 model=kwargs.get("model", "llama3.1:8b"),
-                embedding_model=kwargs.get("embedding_model", "nomic-embed-text")
+                embedding_model=kwargs.get("embedding_model", "nomic-embed-text"),
+                cache=kwargs.get("cache"),
+                timeout=kwargs.get("timeout"),
+                keep_alive=kwargs.get("keep_alive"),
+                callbacks=kwargs.get("callbacks"),
+                scheduler=kwargs.get("scheduler")
             )
         else:
             raise ValueError(
                 f"Unknown LLM backend: {backend}. "
                 f"Supported backends: 'gemini', 'ollama'"
             )
+    
+    @staticmethod
+    def create_chat_model(
+        backend: str = "ollama",
+        **kwargs
+    ) -> BaseChatModel:
+        """
+        Get the shared chat model for this backend configuration, creating it on first use.
+        
+        Args:
+            backend: "gemini" or "ollama"
+            **kwargs: Provider-specific configuration (api_key, base_url, model,
+                timeout, keep_alive); `cache` is an optional BaseCache for
+                response caching (see app.services.llm_cache); `scheduler` is an
+                optional LLMScheduler enforced on every provider call,
+                cache hits excluded (see app.services.llm_scheduler)
         
-        return provider.create_chat_model()
+        Returns:
+            BaseChatModel instance
+        """
+        backend = backend.lower()
+        key = LLMFactory._config_key(
+            backend, kwargs,
+            ("api_key", "base_url", "model", "timeout", "keep_alive", "cache", "scheduler")
+        )
+        model = LLMFactory._chat_models.get(key)
+        if model is None:
+            with LLMFactory._lock:
+                model = LLMFactory._chat_models.get(key)
+                if model is None:
+                    provider_kwargs = dict(kwargs)
+                    callbacks = []
+                    from app.services.metrics import llm_metrics_handler
+                    metrics_handler = llm_metrics_handler(backend, kwargs.get("model"))
+                    if metrics_handler is not None:
+                        callbacks.append(metrics_handler)
+                    if callbacks:
+                        provider_kwargs["callbacks"] = callbacks
+                    model = LLMFactory._create_provider(backend, provider_kwargs).create_chat_model()
+                    LLMFactory._chat_models[key] = model
+                    logger.info("✓ Created %s chat client: %s", backend, kwargs.get("model"))
+        return model
     
     @staticmethod
     def create_embedding_model(
@@ -118,31 +323,42 @@ class LLMFactory:
     ) -> Embeddings:
         """
         Create embedding model based on backend type.
+        The shared provider model is wrapped in BatchedEmbeddings so bulk indexing
+        is split into batches and sent concurrently.
         
         Args:
             backend: "gemini" or "ollama"
-            **kwargs: Provider-specific configuration
+            **kwargs: Provider-specific configuration plus batching options
+                (batch_size, max_concurrency, max_retries, retry_backoff,
+                progress_callback)
         
         Returns:
             Embeddings instance
         """
         backend = backend.lower()
+        key = LLMFactory._config_key(
+            backend, kwargs, ("api_key", "base_url", "embedding_model", "timeout", "keep_alive")
+        )
+        embeddings = LLMFactory._embedding_models.get(key)
+        if embeddings is None:
+            with LLMFactory._lock:
+                embeddings = LLMFactory._embedding_models.get(key)
+                if embeddings is None:
+                    embeddings = LLMFactory._create_provider(backend, kwargs).create_embedding_model()
+                    LLMFactory._embedding_models[key] = embeddings
         
-        if backend == "gemini":
-            provider = GeminiProvider(
-                api_key=kwargs.get("api_key", ""),
-                model=kwargs.get("model", "gemini-2.0-flash-exp")
-            )
-        elif backend == "ollama":
-            provider = OllamaProvider(
-                base_url=kwargs.get("base_url", "http://localhost:11434"),
-                model=kwargs.get("model", "llama3.1:8b"),
-                embedding_model=kwargs.get("embedding_model", "nomic-embed-text")
-            )
-        else:
-            raise ValueError(
-                f"Unknown LLM backend: {backend}. "
-                f"Supported backends: 'gemini', 'ollama'"
-            )
-        
-        return provider.create_embedding_model()
+        return BatchedEmbeddings(
+            embeddings,
+            batch_size=kwargs.get("batch_size", 32),
+            max_concurrency=kwargs.get("max_concurrency", 4),
+            max_retries=kwargs.get("max_retries", 3),
+            retry_backoff=kwargs.get("retry_backoff", 0.5),
+            progress_callback=kwargs.get("progress_callback"),
+        )
+    
+    @staticmethod
+    def reset() -> None:
+        """Drop shared clients (e.g. after fork, where pooled connections must not be reused)"""
+        with LLMFactory._lock:
+            LLMFactory._chat_models.clear()
+            LLMFactory._embedding_models.clear()
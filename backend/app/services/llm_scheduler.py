@@ -0,0 +1,396 @@
+"""
+LLM Admission Control
+Limits concurrent generations per LLM backend. Requests beyond the limit wait in
+a bounded queue served round-robin across sessions, so one chatty session cannot
+starve the others; when the queue is full callers are rejected immediately with
+a retry-after hint instead of piling onto the model server.
+Only real provider calls are admitted; LLM cache hits bypass the scheduler.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple, Type
+from langchain_core.language_models import BaseChatModel
+from pydantic import PrivateAttr
+
+try:
+    import fcntl
+except ImportError:  # Windows: süreçler arası slot yok (prefork sunucu da yok)
+    fcntl = None
+
+# Paylaşılan slot beklenirken yoklama aralığı (saniye); LLM çağrıları saniyeler sürer
+_SHARED_SLOT_POLL = 0.05
+
+
+class LLMQueueFullError(Exception):
+    """The LLM queue is full; retry after `retry_after` seconds"""
+
+    def __init__(self, backend: str, retry_after: int):
+        self.backend = backend
+        self.retry_after = retry_after
+        super().__init__(
+            f"LLM backend '{backend}' is busy, retry after {retry_after}s"
+        )
+
+
+class LLMDeadlineExceededError(Exception):
+    """The request waited in the LLM queue past its deadline"""
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class ProcessSlots:
+    """
+    Counting semaphore shared by the processes of one server: `size` lock
+    files, a slot being an exclusive flock on one of them. The kernel drops
+    the locks of a process that dies, so a killed worker never leaks a slot.
+    Files are opened per process (descriptors inherited over fork would
+    share the lock).
+    """
+
+    def __init__(self, directory: str, name: str, size: int):
+        self.paths = [os.path.join(directory, f"{name}.{index}.lock") for index in range(max(size, 1))]
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._fds: Dict[int, int] = {}
+        self._held: List[int] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.paths)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without blocking"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid, self._fds, self._held = os.getpid(), {}, []
+            for index, path in enumerate(self.paths):
+                # flock'u aynı descriptor üzerinden tekrar almak başarılı olur: süreç içi kontrol
+                if index in self._held:
+                    continue
+                fd = self._fds.get(index)
+                if fd is None:
+                    fd = self._fds[index] = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                self._held.append(index)
+                return True
+        return False
+
+    def release(self) -> None:
+        """Give back one slot held by this process (slots are interchangeable)"""
+        with self._lock:
+            if self._held:
+                fcntl.flock(self._fds[self._held.pop()], fcntl.LOCK_UN)
+
+
+class LLMScheduler:
+    """
+    Concurrency limiter with a bounded, per-session fair queue.
+
+    Slots are handed directly from a finishing call to the next waiter, taking
+    waiters from sessions in round-robin order. With shared_slots (multi-worker
+    server) a call also needs one of the server-wide slots, so max_concurrency
+    holds across processes while the queue and fairness stay per process.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        max_concurrency: int = 2,
+        max_queue: int = 32,
+        queue_timeout: float = 60.0,
+        shared_slots: Optional[ProcessSlots] = None,
+    ):
+        self.backend = backend
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.shared_slots = shared_slots
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        # session_id -> waiters; dict order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        # EWMA of how long a call holds a slot, for retry-after estimates
+        self._avg_hold = 5.0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue position frees up"""
+        waves = (self._queued + 1) / self.max_concurrency
+        return max(1, math.ceil(self._avg_hold * waves))
+
+    def is_saturated(self) -> bool:
+        """True if a new request would be rejected right now"""
+        with self._lock:
+            return self._active >= self.max_concurrency and self._queued >= self.max_queue
+
+    def acquire(self, session_id: str, deadline: Optional[float] = None) -> None:
+        """
+        Block until a slot is free.
+
+        Args:
+            session_id: Fairness key
+            deadline: Absolute time.monotonic() deadline; defaults to now + queue_timeout
+
+        Raises:
+            LLMQueueFullError: Queue is full (raised immediately)
+            LLMDeadlineExceededError: No slot became free before the deadline
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.queue_timeout
+        self._acquire_local(session_id, deadline)
+        if self.shared_slots is None:
+            return
+        while not self.shared_slots.try_acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._release_local()
+                with self._lock:
+                    self.timed_out += 1
+                raise LLMDeadlineExceededError(
+                    f"Timed out waiting for a server-wide slot of LLM backend '{self.backend}'"
+                )
+            time.sleep(min(_SHARED_SLOT_POLL, remaining))
+
+    def _acquire_local(self, session_id: str, deadline: float) -> None:
+        with self._lock:
+            if self._active < self.max_concurrency and self._queued == 0:
+                self._active += 1
+                return
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise LLMQueueFullError(self.backend, self.retry_after())
+            waiter = _Waiter()
+            self._queues.setdefault(session_id, deque()).append(waiter)
+            self._queued += 1
+
+        waiter.event.wait(timeout=max(deadline - time.monotonic(), 0))
+
+        with self._lock:
+            # A slot may have been granted between the timeout and taking the lock
+            if waiter.granted:
+                return
+            queue = self._queues.get(session_id)
+            if queue is not None:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[session_id]
+            self._queued -= 1
+            self.timed_out += 1
+        raise LLMDeadlineExceededError(
+            f"Timed out waiting for LLM backend '{self.backend}'"
+        )
+
+    def release(self, held_for: Optional[float] = None) -> None:
+        """Free a slot, handing it to the next session in round-robin order"""
+        if self.shared_slots is not None:
+            self.shared_slots.release()
+        self._release_local(held_for)
+
+    def _release_local(self, held_for: Optional[float] = None) -> None:
+        with self._lock:
+            if held_for is not None:
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_for
+            if not self._queues:
+                self._active -= 1
+                return
+            session_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            self._queued -= 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "active": self._active,
+                "queued": self._queued,
+                "waiting_sessions": len(self._queues),
+                "max_concurrency": self.max_concurrency,
+                "server_wide": self.shared_slots is not None,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_hold_seconds": round(self._avg_hold, 3),
+            }
+
+
+# Bu context'te slot zaten tutuluyor: _agenerate'in varsayılan hali _generate'i
+# executor'da çağırır, aynı çağrı ikinci bir slot almamalı
+_slot_held: ContextVar[bool] = ContextVar("llm_slot_held", default=False)
+
+
+def _fairness_key(run_manager: Any) -> Tuple[str, Optional[float]]:
+    metadata = getattr(run_manager, "metadata", None) or {}
+    return str(metadata.get("session_id", "anonymous")), metadata.get("deadline")
+
+
+@contextmanager
+def _hold_slot(scheduler: Optional[LLMScheduler], run_manager: Any) -> Iterator[None]:
+    if scheduler is None or _slot_held.get():
+        yield
+        return
+    session_id, deadline = _fairness_key(run_manager)
+    scheduler.acquire(session_id, deadline=deadline)
+    token = _slot_held.set(True)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _slot_held.reset(token)
+        scheduler.release(time.monotonic() - started)
+
+
+@asynccontextmanager
+async def _ahold_slot(scheduler: Optional[LLMScheduler], run_manager: Any) -> AsyncIterator[None]:
+    if scheduler is None or _slot_held.get():
+        yield
+        return
+    session_id, deadline = _fairness_key(run_manager)
+    acquiring = asyncio.ensure_future(asyncio.to_thread(scheduler.acquire, session_id, deadline))
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        # Bekleyen thread sonradan slot alırsa geri verilir
+        acquiring.add_done_callback(
+            lambda f: f.cancelled() or f.exception() is not None or scheduler.release()
+        )
+        raise
+    token = _slot_held.set(True)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _slot_held.reset(token)
+        scheduler.release(time.monotonic() - started)
+
+
+_admission_classes: Dict[type, type] = {}
+
+
+def admission_controlled(model_cls: Type[BaseChatModel]) -> Type[BaseChatModel]:
+    """
+    Subclass of a chat model class that holds a slot of its `_llm_scheduler`
+    around each provider call (_generate/_agenerate/_stream/_astream).
+
+    LangChain checks the response cache before calling these, so cache hits
+    never wait for or take a slot. The fairness key and optional deadline come
+    from run metadata:
+    config={"metadata": {"session_id": ..., "deadline": time.monotonic() + N}}
+    Admission errors (LLMQueueFullError, LLMDeadlineExceededError) propagate
+    out of invoke().
+    """
+    cls = _admission_classes.get(model_cls)
+    if cls is not None:
+        return cls
+
+    class AdmissionControlled(model_cls):
+        _llm_scheduler: Optional[LLMScheduler] = PrivateAttr(default=None)
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            with _hold_slot(self._llm_scheduler, run_manager):
+                return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            async with _ahold_slot(self._llm_scheduler, run_manager):
+                return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            with _hold_slot(self._llm_scheduler, run_manager):
+                yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            async with _ahold_slot(self._llm_scheduler, run_manager):
+                async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    yield chunk
+
+    # Aynı isim ve modül: serileştirilmiş model (LLM cache anahtarı) değişmez
+    AdmissionControlled.__name__ = model_cls.__name__
+    AdmissionControlled.__qualname__ = model_cls.__qualname__
+    AdmissionControlled.__module__ = model_cls.__module__
+    _admission_classes[model_cls] = AdmissionControlled
+    return AdmissionControlled
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+_shared_slot_dir: Optional[str] = None
+
+
+def share_llm_slots(directory: str) -> bool:
+    """
+    Multi-worker launcher, before forking: enforce the per-backend limits
+    server-wide through lock files in directory.
+
+    Returns:
+        False if cross-process locks are unavailable (limits are then split
+        between workers)
+    """
+    global _shared_slot_dir
+
+    if fcntl is None:
+        return False
+    _shared_slot_dir = directory
+    return True
+
+
+def get_llm_scheduler(backend: str) -> LLMScheduler:
+    """Get the process-wide scheduler for an LLM backend ('ollama', 'gemini')"""
+    backend = backend.lower()
+    scheduler = _schedulers.get(backend)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(backend)
+            if scheduler is None:
+                from app.core.config import (
+                    LLM_MAX_CONCURRENCY_OLLAMA, LLM_MAX_CONCURRENCY_GEMINI,
+                    LLM_QUEUE_MAX_SIZE, LLM_QUEUE_TIMEOUT, SERVER_WORKERS,
+                )
+                limits = {
+                    "ollama": LLM_MAX_CONCURRENCY_OLLAMA,
+                    "gemini": LLM_MAX_CONCURRENCY_GEMINI,
+                }
+                limit = limits.get(backend, LLM_MAX_CONCURRENCY_OLLAMA)
+                # Sınırlar sunucu başınadır; kuyruk her worker'da ayrı tutulur
+                workers = max(SERVER_WORKERS, 1)
+                shared_slots = None
+                if _shared_slot_dir is not None:
+                    shared_slots = ProcessSlots(_shared_slot_dir, backend, limit)
+                elif workers > 1:
+                    # Paylaşılan slot yoksa her worker eşit pay alır (en az 1)
+                    limit = max(limit // workers, 1)
+                scheduler = LLMScheduler(
+                    backend,
+                    max_concurrency=limit,
+                    max_queue=max(LLM_QUEUE_MAX_SIZE // workers, 1),
+                    queue_timeout=LLM_QUEUE_TIMEOUT,
+                    shared_slots=shared_slots,
+                )
+                _schedulers[backend] = scheduler
+    return scheduler
+
+
+def get_all_scheduler_stats() -> Dict[str, Dict[str, Any]]:
+    return {backend: scheduler.stats() for backend, scheduler in list(_schedulers.items())}
@@ -3,12 +3,19 @@ Abstract Memory Layer for Chat History Management
 Follows SOLID principles with Abstract Base Class and concrete implementations
 """
 
+import logging
 from abc import ABC, abstractmethod
 from typing import List, Optional, Dict, Any
 import json
-import redis
+import threading
+import time
+from collections import OrderedDict
+import msgpack
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from app.models import ChatMessage
+from app.services.prompt_budget import count_tokens
+
+logger = logging.getLogger(__name__)
 
 
 class AbstractChatMemory(ABC):
@@ -37,11 +44,164 @@ class AbstractChatMemory(ABC):
         """Check if session exists"""
         pass
 
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the rolling summary of older messages.
+
+        Returns:
+            {"content": str, "covered": int} or None. "covered" is the number of
+            oldest messages the summary replaces.
+        """
+        pass
+
+    @abstractmethod
+    def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        """Store the rolling summary of the oldest `covered` messages"""
+        pass
+
+    def count_messages(self, session_id: str) -> int:
+        """Number of stored messages for a session"""
+        return len(self.get_messages(session_id))
+
+    def get_recent_messages(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ) -> List[BaseMessage]:
+        """
+        Retrieve only the most recent messages.
+        Backends override _read_last to avoid loading the whole history.
+
+        Args:
+            limit: Maximum number of messages (last N)
+            max_tokens: Maximum total tokens; older messages are dropped first
+        """
+        messages = self._read_last(session_id, limit)
+        if max_tokens is not None:
+            messages = _trim_to_tokens(messages, max_tokens)
+        return messages
+
+    def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        messages = self.get_messages(session_id)
+        if limit is None:
+            return list(messages)
+        return list(messages[-limit:]) if limit > 0 else []
+
+
+def _trim_to_tokens(messages: List[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """Keep the newest messages whose total token count fits max_tokens"""
+    kept: List[BaseMessage] = []
+    used = 0
+    for message in reversed(messages):
+        used += count_tokens(str(message.content))
+        if used > max_tokens:
+            break
+        kept.append(message)
+    return list(reversed(kept))
+
+
+# Compact message encoding: 1-byte format marker + msgpack([type_code, content])
+_FORMAT_MSGPACK = b"\x01"
+_FORMAT_MSGPACK_ZSTD = b"\x02"
+_MESSAGE_TYPE_CODES = {"HumanMessage": 0, "AIMessage": 1}
+_MESSAGE_TYPES = {code: name for name, code in _MESSAGE_TYPE_CODES.items()}
+
+
+def _get_zstd():
+    """zstandard is optional; without it large messages are stored uncompressed"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class MessageCodec:
+    """
+    Compact binary encoding for stored chat messages.
+    Shared by the sync and async Redis backends; also reads the legacy JSON format.
+    """
+
+    def __init__(self, compress_threshold: int = 1024):
+        self.compress_threshold = compress_threshold
+        zstd = _get_zstd()
+        self._compressor = zstd.ZstdCompressor(level=3) if zstd else None
+        self._decompressor = zstd.ZstdDecompressor() if zstd else None
+
+    def encode(self, message: BaseMessage) -> bytes:
+        """Convert LangChain message to compact binary form"""
+        message_type = message.__class__.__name__
+        if message_type not in _MESSAGE_TYPE_CODES:
+            raise ValueError(f"Unknown message type: {message_type}")
+        payload = msgpack.packb(
+            [_MESSAGE_TYPE_CODES[message_type], message.content], use_bin_type=True
+        )
+        if self._compressor is not None and len(payload) >= self.compress_threshold:
+            return _FORMAT_MSGPACK_ZSTD + self._compressor.compress(payload)
+        return _FORMAT_MSGPACK + payload
+
+    def decode(self, raw: bytes) -> BaseMessage:
+        """Convert stored bytes back to LangChain message (legacy JSON entries included)"""
+        marker, body = raw[:1], raw[1:]
+        if marker == _FORMAT_MSGPACK_ZSTD:
+            if self._decompressor is None:
+                raise ValueError("zstandard is required to read compressed messages")
+            type_code, content = msgpack.unpackb(self._decompressor.decompress(body), raw=False)
+            message_type = _MESSAGE_TYPES.get(type_code)
+        elif marker == _FORMAT_MSGPACK:
+            type_code, content = msgpack.unpackb(body, raw=False)
+            message_type = _MESSAGE_TYPES.get(type_code)
+        else:
+            # Legacy format: {"type": "...", "content": "..."}
+            data = json.loads(raw)
+            message_type = data.get("type")
+            content = data.get("content", "")
+
+        if message_type == "HumanMessage":
+            return HumanMessage(content=content)
+        elif message_type == "AIMessage":
+            return AIMessage(content=content)
+        else:
+            raise ValueError(f"Unknown message type: {message_type}")
+
+    def decode_all(self, raw_messages: List[bytes]) -> List[BaseMessage]:
+        """Decode a list of stored messages, skipping corrupt entries"""
+        messages = []
+        for raw in raw_messages:
+            try:
+                messages.append(self.decode(raw))
+            except Exception as e:
+                # Log error but continue processing other messages
+                logger.warning("Failed to deserialize message: %s", e)
+                continue
+        
+        return messages
+
+    @staticmethod
+    def is_compact(raw: bytes) -> bool:
+        return raw[:1] in (_FORMAT_MSGPACK, _FORMAT_MSGPACK_ZSTD)
+
+
+# Özet hash'i varsa (content alanı) covered'ı kaydır ve TTL'ini yenile; yoksa
+# hiçbir anahtar oluşturma. EXISTS + HINCRBY arasında anahtar süresi dolabilirdi.
+SHIFT_SUMMARY_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], 'content') == 1 then
+    redis.call('HINCRBY', KEYS[1], 'covered', -tonumber(ARGV[1]))
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
 
 class RedisChatMemory(AbstractChatMemory):
     """
     Redis-based chat memory implementation.
     Provides persistent, distributed storage for production use.
+    Messages are stored msgpack-encoded (zstd-compressed above a size threshold)
+    and each session list is capped at max_messages.
     """
 
     def __init__(
@@ -51,108 +211,304 @@ class RedisChatMemory(AbstractChatMemory):
         db: int = 0,
         password: Optional[str] = None,
         ttl: int = 86400,  # 24 hours default TTL
+        max_messages: int = 200,
+        compress_threshold: int = 1024,
     ):
         self.ttl = ttl
+        self.max_messages = max_messages
+        self.codec = MessageCodec(compress_threshold)
+        import redis
+
         self.redis_client = redis.Redis(
             host=host,
             port=port,
             db=db,
             password=password,
-            decode_responses=True,
+            decode_responses=False,
         )
         # Test connection
         try:
             self.redis_client.ping()
         except redis.ConnectionError as e:
             raise ConnectionError(f"Failed to connect to Redis: {e}")
-
-    def _serialize_message(self, message: BaseMessage) -> Dict[str, Any]:
-        """Convert LangChain message to JSON-serializable dict"""
-        return {
-            "type": message.__class__.__name__,
-            "content": message.content,
-        }
-
-    def _deserialize_message(self, data: Dict[str, Any]) -> BaseMessage:
-        """Convert dict back to LangChain message"""
-        message_type = data.get("type")
-        content = data.get("content", "")
-
-        if message_type == "HumanMessage":
-            return HumanMessage(content=content)
-        elif message_type == "AIMessage":
-            return AIMessage(content=content)
-        else:
-            raise ValueError(f"Unknown message type: {message_type}")
+        self._shift_summary = self.redis_client.register_script(SHIFT_SUMMARY_SCRIPT)
 
     def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
-        """Add messages to Redis list with TTL"""
+        """Append messages with a single RPUSH, cap the list and refresh TTLs"""
+        if not messages:
+            return
         key = f"chat_history:{session_id}"
-        serialized = [json.dumps(self._serialize_message(msg)) for msg in messages]
+        summary_key = f"chat_summary:{session_id}"
+        serialized = [self.codec.encode(msg) for msg in messages]
         
         # Use pipeline for atomic operations
         pipe = self.redis_client.pipeline()
-        for msg in serialized:
-            pipe.rpush(key, msg)
+        pipe.rpush(key, *serialized)
+        pipe.ltrim(key, -self.max_messages, -1)
         pipe.expire(key, self.ttl)
-        pipe.execute()
+        pipe.expire(summary_key, self.ttl)
+        length = pipe.execute()[0]
+        
+        # Trimmed messages shift list indexes; keep the summary's covered count aligned
+        trimmed = length - self.max_messages
+        if trimmed > 0:
+            self._shift_summary(keys=[summary_key], args=[trimmed, self.ttl])
 
     def get_messages(self, session_id: str) -> List[BaseMessage]:
         """Retrieve all messages from Redis"""
         key = f"chat_history:{session_id}"
         raw_messages = self.redis_client.lrange(key, 0, -1)
-        
-        messages = []
-        for raw in raw_messages:
-            try:
-                data = json.loads(raw)
-                messages.append(self._deserialize_message(data))
-            except (json.JSONDecodeError, ValueError) as e:
-                # Log error but continue processing other messages
-                print(f"Warning: Failed to deserialize message: {e}")
-                continue
-        
-        return messages
+        return self.codec.decode_all(raw_messages)
+
+    def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        """LRANGE only the tail of the list"""
+        if limit is None:
+            return self.get_messages(session_id)
+        if limit <= 0:
+            return []
+        key = f"chat_history:{session_id}"
+        return self.codec.decode_all(self.redis_client.lrange(key, -limit, -1))
+
+    def count_messages(self, session_id: str) -> int:
+        """LLEN, O(1)"""
+        return self.redis_client.llen(f"chat_history:{session_id}")
 
     def clear_session(self, session_id: str) -> None:
         """Delete session from Redis"""
         key = f"chat_history:{session_id}"
-        self.redis_client.delete(key)
+        self.redis_client.delete(key, f"chat_summary:{session_id}")
 
     def session_exists(self, session_id: str) -> bool:
         """Check if session key exists in Redis"""
         key = f"chat_history:{session_id}"
         return self.redis_client.exists(key) > 0
 
+    def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Read the summary hash"""
+        data = self.redis_client.hgetall(f"chat_summary:{session_id}")
+        if not data or b"content" not in data:
+            return None
+        return {
+            "content": data[b"content"].decode("utf-8"),
+            "covered": max(int(data.get(b"covered", 0)), 0),
+        }
+
+    def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        """Store the summary as a hash sharing the history TTL"""
+        key = f"chat_summary:{session_id}"
+        pipe = self.redis_client.pipeline()
+        pipe.hset(key, mapping={"content": content, "covered": covered})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def migrate_session(self, session_id: str) -> bool:
+        """
+        Re-encode a session stored in the legacy JSON format, keeping its TTL.
+        
+        Returns:
+            True if the session was rewritten
+        """
+        from redis.exceptions import WatchError
+
+        key = f"chat_history:{session_id}"
+        summary_key = f"chat_summary:{session_id}"
+        with self.redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                raw_messages = pipe.lrange(key, 0, -1)
+                if all(MessageCodec.is_compact(raw) for raw in raw_messages):
+                    return False
+                
+                messages = self.codec.decode_all(raw_messages)
+                trimmed = max(len(messages) - self.max_messages, 0)
+                messages = messages[trimmed:]
+                ttl = pipe.ttl(key)
+                
+                ttl = ttl if ttl and ttl > 0 else self.ttl
+                
+                pipe.multi()
+                pipe.delete(key)
+                if messages:
+                    pipe.rpush(key, *[self.codec.encode(msg) for msg in messages])
+                    pipe.expire(key, ttl)
+                if trimmed:
+                    self._shift_summary(keys=[summary_key], args=[trimmed, ttl], client=pipe)
+                pipe.execute()
+            except WatchError:
+                # Session was written concurrently; new writes are already compact, retry later
+                return False
+        return True
+
+    def migrate_all_sessions(self) -> int:
+        """
+        Re-encode every legacy session. Safe to run while the app is serving traffic.
+        
+        Returns:
+            Number of migrated sessions
+        """
+        migrated = 0
+        for key in self.redis_client.scan_iter(match="chat_history:*", count=500):
+            session_id = key.decode("utf-8").split(":", 1)[1]
+            if self.migrate_session(session_id):
+                migrated += 1
+        return migrated
+
+
+def _message_size(message: BaseMessage) -> int:
+    """Approximate stored size of a message in bytes"""
+    return len(str(message.content).encode("utf-8")) + 64
+
+
+class _InMemorySession:
+    __slots__ = ("messages", "summary", "size", "last_access")
+
+    def __init__(self, now: float):
+        self.messages: List[BaseMessage] = []
+        self.summary: Optional[Dict[str, Any]] = None
+        self.size = 0
+        self.last_access = now
+
 
 class InMemoryChatMemory(AbstractChatMemory):
     """
     In-memory chat memory implementation.
     Suitable for development/testing or single-instance deployments.
     Data is lost on application restart.
+    
+    Bounded: sessions are kept in LRU order and evicted when they exceed
+    max_sessions or max_bytes, or stay idle longer than idle_ttl. Each session
+    keeps at most max_messages messages. Eviction is O(1) per session.
     """
 
-    def __init__(self):
-        self._storage: Dict[str, List[BaseMessage]] = {}
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_messages: int = 200,
+        idle_ttl: int = 86400,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        # Least recently used session first
+        self._storage: "OrderedDict[str, _InMemorySession]" = OrderedDict()
+        self._total_bytes = 0
+        self._total_messages = 0
+        self._evictions = {"lru": 0, "ttl": 0, "bytes": 0, "trimmed_messages": 0}
+        self._lock = threading.RLock()
+
+    def _drop(self, session_id: str, reason: Optional[str] = None) -> None:
+        session = self._storage.pop(session_id)
+        self._total_bytes -= session.size
+        self._total_messages -= len(session.messages)
+        if reason:
+            self._evictions[reason] += 1
+
+    def _expire_idle(self, now: float) -> None:
+        """Idle sessions sit at the LRU end, so expiry stops at the first live one"""
+        while self._storage:
+            session_id, session = next(iter(self._storage.items()))
+            if now - session.last_access <= self.idle_ttl:
+                break
+            self._drop(session_id, "ttl")
+
+    def _touch(self, session_id: str, now: float) -> Optional[_InMemorySession]:
+        self._expire_idle(now)
+        session = self._storage.get(session_id)
+        if session is not None:
+            session.last_access = now
+            self._storage.move_to_end(session_id)
+        return session
 
     def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
         """Add messages to in-memory storage"""
-        if session_id not in self._storage:
-            self._storage[session_id] = []
-        self._storage[session_id].extend(messages)
+        with self._lock:
+            now = time.monotonic()
+            session = self._touch(session_id, now)
+            if session is None:
+                session = self._storage[session_id] = _InMemorySession(now)
+            
+            session.messages.extend(messages)
+            added = sum(_message_size(m) for m in messages)
+            session.size += added
+            self._total_bytes += added
+            self._total_messages += len(messages)
+            
+            # Per-session cap: drop oldest messages, keep summary indexes aligned
+            overflow = len(session.messages) - self.max_messages
+            if overflow > 0:
+                removed = sum(_message_size(m) for m in session.messages[:overflow])
+                del session.messages[:overflow]
+                session.size -= removed
+                self._total_bytes -= removed
+                self._total_messages -= overflow
+                self._evictions["trimmed_messages"] += overflow
+                if session.summary:
+                    session.summary["covered"] = max(session.summary["covered"] - overflow, 0)
+            
+            while len(self._storage) > self.max_sessions:
+                self._drop(next(iter(self._storage)), "lru")
+            # Never evict the session being written to satisfy the byte budget
+            while self._total_bytes > self.max_bytes and len(self._storage) > 1:
+                self._drop(next(iter(self._storage)), "bytes")
 
     def get_messages(self, session_id: str) -> List[BaseMessage]:
         """Retrieve messages from memory"""
-        return self._storage.get(session_id, [])
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            return list(session.messages) if session else []
+
+    def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            if session is None:
+                return []
+            if limit is None:
+                return list(session.messages)
+            return session.messages[-limit:] if limit > 0 else []
+
+    def count_messages(self, session_id: str) -> int:
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            return len(session.messages) if session else 0
 
     def clear_session(self, session_id: str) -> None:
         """Clear session from memory"""
-        if session_id in self._storage:
-            del self._storage[session_id]
+        with self._lock:
+            if session_id in self._storage:
+                self._drop(session_id)
 
     def session_exists(self, session_id: str) -> bool:
         """Check if session exists in memory"""
-        return session_id in self._storage
+        with self._lock:
+            return self._touch(session_id, time.monotonic()) is not None
+
+    def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve summary from memory"""
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            return dict(session.summary) if session and session.summary else None
+
+    def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        """Store summary in memory"""
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            if session is not None:
+                session.summary = {"content": content, "covered": covered}
+
+    def stats(self) -> Dict[str, Any]:
+        """Current size and eviction counters"""
+        with self._lock:
+            self._expire_idle(time.monotonic())
+            return {
+                "sessions": len(self._storage),
+                "messages": self._total_messages,
+                "bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "evictions": dict(self._evictions),
+            }
 
 
 def create_memory_backend(backend_type: str = "redis", **kwargs) -> AbstractChatMemory:
@@ -161,7 +517,7 @@ def create_memory_backend(backend_type: str = "redis", **kwargs) -> AbstractChat
     Follows Factory Pattern for easy extensibility.
     
     Args:
-        backend_type: Type of backend ('redis', 'in-memory')
+        backend_type: Type of backend ('redis', 'sqlite', 'in-memory')
         **kwargs: Backend-specific configuration
     
     Returns:
@@ -172,10 +528,32 @@ def create_memory_backend(backend_type: str = "redis", **kwargs) -> AbstractChat
     """
     if backend_type.lower() == "redis":
         return RedisChatMemory(**kwargs)
+    elif backend_type.lower() == "sqlite":
+        from app.services.sqlite_memory import SQLiteChatMemory
+        return SQLiteChatMemory(**kwargs)
     elif backend_type.lower() == "in-memory":
-        return InMemoryChatMemory()
+        return InMemoryChatMemory(**kwargs)
     else:
         raise ValueError(
             f"Unsupported memory backend: {backend_type}. "
-            f"Supported backends: 'redis', 'in-memory'"
+            f"Supported backends: 'redis', 'sqlite', 'in-memory'"
         )
+
+
+if __name__ == "__main__":
+    # Eski JSON formatındaki Redis oturumlarını yeni formata çevir:
+    #   python -m app.services.memory
+    from app.core.config import (
+        REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_PASSWORD,
+        CHAT_HISTORY_TTL, CHAT_HISTORY_MAX_MESSAGES, CHAT_COMPRESS_THRESHOLD,
+    )
+    memory = RedisChatMemory(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        password=REDIS_PASSWORD,
+        ttl=CHAT_HISTORY_TTL,
+        max_messages=CHAT_HISTORY_MAX_MESSAGES,
+        compress_threshold=CHAT_COMPRESS_THRESHOLD,
+    )
+    print(f"✓ Migrated {memory.migrate_all_sessions()} sessions to the compact format")
@@ -0,0 +1,313 @@
+"""
+Prometheus Metrics
+Stage latency histograms (memory, schema, RAG, agent, SQL, upload), LLM call and
+token counters, agent iteration/tool timings and HTTP request metrics, exposed at
+/metrics. The hot path only pays for a perf_counter pair and a histogram observe;
+scheduler, cache and speculation gauges are read from their stats() at scrape time.
+Without prometheus_client installed (or with METRICS_ENABLED=false) all of this is a no-op.
+"""
+
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from app.core.config import METRICS_ENABLED
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    _ENABLED = METRICS_ENABLED
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    _ENABLED = False
+
+
+# Seconds; stages range from sub-millisecond memory reads to multi-minute agent runs
+_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+if _ENABLED:
+    STAGE_SECONDS = Histogram(
+        "text2sql_stage_duration_seconds", "Duration of a request processing stage",
+        ["stage"], buckets=_LATENCY_BUCKETS,
+    )
+    STAGE_ERRORS = Counter(
+        "text2sql_stage_errors_total", "Stages that raised an exception", ["stage"],
+    )
+    LLM_CALL_SECONDS = Histogram(
+        "text2sql_llm_call_duration_seconds", "Duration of a single chat model call",
+        ["backend", "model"], buckets=_LATENCY_BUCKETS,
+    )
+    LLM_CALLS = Counter(
+        "text2sql_llm_calls_total", "Chat model calls", ["backend", "model", "status"],
+    )
+    LLM_TOKENS = Counter(
+        "text2sql_llm_tokens_total", "Tokens reported by the chat model",
+        ["backend", "model", "kind"],
+    )
+    AGENT_ITERATION_SECONDS = Histogram(
+        "text2sql_agent_iteration_duration_seconds",
+        "Time between consecutive agent steps (LLM planning + previous tool run)",
+        buckets=_LATENCY_BUCKETS,
+    )
+    AGENT_ITERATIONS = Histogram(
+        "text2sql_agent_iterations", "Agent steps per request",
+        buckets=(1, 2, 3, 4, 5, 7, 10, 15),
+    )
+    AGENT_TOOL_SECONDS = Histogram(
+        "text2sql_agent_tool_duration_seconds", "Duration of an agent tool call (e.g. sql_db_query)",
+        ["tool"], buckets=_LATENCY_BUCKETS,
+    )
+    HTTP_REQUEST_SECONDS = Histogram(
+        "text2sql_http_request_duration_seconds", "HTTP request duration",
+        ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+    )
+    HTTP_REQUESTS_IN_PROGRESS = Gauge(
+        "text2sql_http_requests_in_progress", "HTTP requests being served",
+        multiprocess_mode="livesum",
+    )
+
+
+class track_stage(ContextDecorator):
+    """
+    Time a stage into text2sql_stage_duration_seconds{stage=...}.
+
+    Usable as `with track_stage("rag_search"):` or as a decorator.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started = 0.0
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call; the decorator instance is shared across threads
+        return track_stage(self.stage)
+
+    def __enter__(self) -> "track_stage":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if _ENABLED:
+            STAGE_SECONDS.labels(self.stage).observe(time.perf_counter() - self._started)
+            if exc_type is not None:
+                STAGE_ERRORS.labels(self.stage).inc()
+        return False
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    """(prompt, completion) tokens from usage_metadata, else provider llm_output"""
+    prompt = completion = 0
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not prompt and not completion:
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        prompt = usage.get("prompt_tokens", 0) or 0
+        completion = usage.get("completion_tokens", 0) or 0
+    return prompt, completion
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Attached to the shared chat model: duration, status and tokens of every call"""
+
+    def __init__(self, backend: str, model: Optional[str]):
+        self.backend = backend
+        self.model = model or "unknown"
+        self._lock = threading.Lock()
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID, status: str) -> None:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_CALL_SECONDS.labels(self.backend, self.model).observe(time.perf_counter() - started)
+        LLM_CALLS.labels(self.backend, self.model, status).inc()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+        prompt, completion = _token_usage(response)
+        if prompt:
+            LLM_TOKENS.labels(self.backend, self.model, "prompt").inc(prompt)
+        if completion:
+            LLM_TOKENS.labels(self.backend, self.model, "completion").inc(completion)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error")
+
+
+class AgentMetricsHandler(BaseCallbackHandler):
+    """Per-request handler for agent.invoke: iteration count/timing and tool durations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_step: Optional[float] = None
+        self._iterations = 0
+        self._tools: Dict[UUID, Tuple[str, float]] = {}
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._last_step = time.perf_counter()
+
+    def _step(self) -> None:
+        now = time.perf_counter()
+        if self._last_step is not None:
+            AGENT_ITERATION_SECONDS.observe(now - self._last_step)
+        self._last_step = now
+        self._iterations += 1
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        self._step()
+
+    def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
+        self._step()
+        AGENT_ITERATIONS.observe(self._iterations)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._tools[run_id] = ((serialized or {}).get("name", "unknown"), time.perf_counter())
+
+    def _tool_done(self, run_id: UUID) -> None:
+        with self._lock:
+            entry = self._tools.pop(run_id, None)
+        if entry is not None:
+            name, started = entry
+            AGENT_TOOL_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_done(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._tool_done(run_id)
+
+
+def llm_metrics_handler(backend: str, model: Optional[str]) -> Optional[LLMMetricsHandler]:
+    return LLMMetricsHandler(backend, model) if _ENABLED else None
+
+
+def agent_metrics_handler() -> Optional[AgentMetricsHandler]:
+    return AgentMetricsHandler() if _ENABLED else None
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request duration by route template and in-progress gauge"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            # Route template ("/api/v1/export/{fmt}") keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(
+                time.perf_counter() - started
+            )
+
+
+class _StatsCollector:
+    """Scrape-time gauges/counters from components that already keep stats()"""
+
+    def collect(self):
+        from app.services import llm_cache, llm_scheduler, speculative
+
+        scheduler_gauges = {
+            "active": GaugeMetricFamily("text2sql_llm_scheduler_active", "LLM calls holding a slot", labels=["backend"]),
+            "queued": GaugeMetricFamily("text2sql_llm_scheduler_queued", "LLM calls waiting for a slot", labels=["backend"]),
+        }
+        scheduler_counters = {
+            "rejected": CounterMetricFamily("text2sql_llm_scheduler_rejected", "Calls rejected with a full queue", labels=["backend"]),
+            "timed_out": CounterMetricFamily("text2sql_llm_scheduler_timed_out", "Calls that timed out in the queue", labels=["backend"]),
+        }
+        for backend, stats in llm_scheduler.get_all_scheduler_stats().items():
+            for key, family in {**scheduler_gauges, **scheduler_counters}.items():
+                family.add_metric([backend], stats[key])
+        yield from scheduler_gauges.values()
+        yield from scheduler_counters.values()
+
+        cache = llm_cache._llm_cache  # Only if already created; scraping must not open it
+        if cache is not None and hasattr(cache, "stats"):
+            stats = cache.stats()
+            for key in ("hits", "misses", "evictions"):
+                yield CounterMetricFamily(f"text2sql_llm_cache_{key}", f"LLM response cache {key}", value=stats[key])
+
+        executor = speculative._speculative_executor
+        if executor is not None:
+            stats = executor.stats()
+            yield GaugeMetricFamily("text2sql_speculative_pending", "Unclaimed speculative results", value=stats["pending"])
+            for key in ("hits", "misses"):
+                yield CounterMetricFamily(f"text2sql_speculative_{key}", f"Speculative result {key}", value=stats[key])
+
+
+_collector_lock = threading.Lock()
+_collector_registered = False
+
+
+def _multiprocess_dir() -> Optional[str]:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+
+def clear_multiprocess_dir() -> None:
+    """Multi-worker launcher, before forking: drop value files left by a previous run"""
+    directory = _multiprocess_dir()
+    if not _ENABLED or not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Multi-worker launcher: remove a dead worker's live gauges (livesum) from the aggregate"""
+    if _ENABLED and _multiprocess_dir():
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+
+def render_metrics() -> bytes:
+    """
+    Prometheus text exposition of all metrics in this process. With
+    PROMETHEUS_MULTIPROC_DIR set (multi-worker mode) the histograms and counters
+    of all workers are aggregated instead; the scrape-time component stats are
+    per worker there and stay on the /api/v1/*/stats endpoints.
+    """
+    global _collector_registered
+
+    if not _ENABLED:
+        return b"# metrics disabled\n"
+    if _multiprocess_dir():
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    if not _collector_registered:
+        with _collector_lock:
+            if not _collector_registered:
+                REGISTRY.register(_StatsCollector())
+                _collector_registered = True
+    return generate_latest(REGISTRY)
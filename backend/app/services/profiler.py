@@ -0,0 +1,404 @@
+"""
+Request Profiling
+Opt-in statistical profiler for single requests (X-Profile header with the admin
+token, or a sampled fraction of requests). While a profiled request runs, a sampler
+thread reads the stacks of the threads doing its work via sys._current_frames() every
+few milliseconds and counts them as folded stacks ("a;b;c N", the input format of
+flamegraph.pl and speedscope). LLM, tool and agent steps with their timings are
+recorded by a callback handler and stored in the same JSON artifact.
+"""
+
+import logging
+import asyncio
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+
+# Step inputs/outputs are truncated in the artifact
+_MAX_STEP_TEXT = 2000
+# Deepest frames kept per sample
+_MAX_STACK_DEPTH = 200
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace(os.sep, "/")
+    # "app/services/agent.py" or "site-packages/langchain/..." -> last two path parts
+    module = "/".join(path.rsplit("/", 2)[-2:]).removesuffix(".py")
+    return f"{module}:{code.co_name}".replace(";", ",")
+
+
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < _MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))  # Root first
+
+
+def _truncate(value: Any) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= _MAX_STEP_TEXT else text[:_MAX_STEP_TEXT] + "…"
+
+
+class ProfileSession:
+    """Samples and steps collected for one request"""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.reason = reason  # "header" or "sampled"
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        self.status: Optional[int] = None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.steps: List[Dict[str, Any]] = []
+        self.threads: set = set()
+        self.lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration = time.perf_counter() - self._started
+
+    def folded(self) -> str:
+        """flamegraph.pl / speedscope input"""
+        with self.lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def to_artifact(self) -> Dict[str, Any]:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": self.samples,
+            "sample_interval_ms": _sampler.interval * 1000,
+            "folded": self.folded(),
+            "steps": self.steps,
+        }
+
+
+class _Sampler:
+    """One daemon thread sampling the registered threads of all active sessions"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sessions: List[ProfileSession] = []
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unregister(self, session: ProfileSession) -> None:
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._wakeup.clear()
+            if not sessions:
+                # Idle: no cost until the next profiled request
+                self._wakeup.wait()
+                continue
+
+            frames = sys._current_frames()
+            for session in sessions:
+                with session.lock:
+                    for thread_id in session.threads:
+                        frame = frames.get(thread_id)
+                        if frame is not None and thread_id != own_id:
+                            session.stacks[_fold(frame)] += 1
+                            session.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileStepsHandler(BaseCallbackHandler):
+    """Records LLM calls, tool calls and agent actions of a profiled request"""
+
+    def __init__(self, session: ProfileSession):
+        self.session = session
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+
+    def _start(self, run_id: UUID, kind: str, name: str, payload: Any) -> None:
+        step = {
+            "type": kind,
+            "name": name,
+            "start_ms": self.session.elapsed_ms(),
+            "duration_ms": None,
+            "input": _truncate(payload),
+        }
+        with self.session.lock:
+            self._open[run_id] = step
+            self.session.steps.append(step)
+
+    def _end(self, run_id: UUID, output: Any, error: Optional[BaseException] = None) -> None:
+        with self.session.lock:
+            step = self._open.pop(run_id, None)
+        if step is None:
+            return
+        step["duration_ms"] = round(self.session.elapsed_ms() - step["start_ms"], 2)
+        if error is not None:
+            step["error"] = _truncate(str(error))
+        else:
+            step["output"] = _truncate(output)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or "chat_model"
+        last = messages[0][-1].content if messages and messages[0] else ""
+        self._start(run_id, "llm", name, last)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        generations = getattr(response, "generations", None) or [[]]
+        output = generations[0][0].text if generations[0] else ""
+        message = getattr(generations[0][0], "message", None) if generations[0] else None
+        tool_calls = getattr(message, "tool_calls", None)
+        self._end(run_id, output or tool_calls or "")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, None, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "tool", (serialized or {}).get("name", "tool"), input_str)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, output)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, None, error)
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        with self.session.lock:
+            self.session.steps.append({
+                "type": "agent_action",
+                "name": getattr(action, "tool", ""),
+                "start_ms": self.session.elapsed_ms(),
+                "input": _truncate(getattr(action, "tool_input", "")),
+                "log": _truncate(getattr(action, "log", "")),
+            })
+
+
+class ProfileStore:
+    """Keeps the newest max_artifacts profiles as JSON files"""
+
+    def __init__(self, directory: str, max_artifacts: int = 50):
+        self.directory = directory
+        self.max_artifacts = max_artifacts
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, session: ProfileSession) -> None:
+        path = self._path(session.profile_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session.to_artifact(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in files[:max(len(files) - self.max_artifacts, 0)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Newest first, without the stacks"""
+        profiles = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            artifact = self.load(entry.name[:-5])
+            if artifact is not None:
+                artifact.pop("folded", None)
+                artifact["steps"] = len(artifact.get("steps", []))
+                profiles.append(artifact)
+        return sorted(profiles, key=lambda p: p["started_at"], reverse=True)
+
+
+_current_profile: ContextVar[Optional[ProfileSession]] = ContextVar("current_profile", default=None)
+
+
+def _load_settings():
+    from app.core.config import PROFILE_SAMPLE_INTERVAL_MS, PROFILE_SAMPLE_RATE
+    return PROFILE_SAMPLE_INTERVAL_MS / 1000, PROFILE_SAMPLE_RATE
+
+
+_interval, _sample_rate = _load_settings()
+_sampler = _Sampler(_interval)
+_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+
+    if _store is None:
+        from app.core.config import PROFILE_DIR, PROFILE_MAX_ARTIFACTS
+        _store = ProfileStore(PROFILE_DIR, PROFILE_MAX_ARTIFACTS)
+    return _store
+
+
+def get_sample_rate() -> float:
+    return _sample_rate
+
+
+def set_sample_rate(rate: float) -> None:
+    """Admin switch: profile this fraction of requests (0 disables sampling)"""
+    global _sample_rate
+    _sample_rate = min(max(rate, 0.0), 1.0)
+
+
+def should_profile(header_requested: bool) -> Optional[str]:
+    """Reason for profiling this request, or None"""
+    if header_requested:
+        return "header"
+    if _sample_rate > 0 and random.random() < _sample_rate:
+        return "sampled"
+    return None
+
+
+def start_profile(method: str, path: str, reason: str) -> ProfileSession:
+    session = ProfileSession(method, path, reason)
+    _current_profile.set(session)
+    _sampler.register(session)
+    return session
+
+
+def stop_profile(session: ProfileSession, status: Optional[int]) -> None:
+    """Stop sampling and persist the artifact (blocking file write)"""
+    _sampler.unregister(session)
+    session.finish(status)
+    try:
+        get_profile_store().save(session)
+        logger.info(
+            "🔬 Saved profile %s for %s %s (%d samples, %d steps)",
+            session.profile_id, session.method, session.path, session.samples, len(session.steps),
+        )
+    except OSError as e:
+        logger.warning("⚠ Failed to save profile %s: %s", session.profile_id, e)
+
+
+@contextmanager
+def profile_thread():
+    """
+    Sample the current thread while inside, if the request is being profiled.
+    Usable as a decorator on functions run via run_in_threadpool (the context,
+    and thus the active profile, is copied into the worker thread).
+    """
+    session = _current_profile.get()
+    if session is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    with session.lock:
+        session.threads.add(thread_id)
+    try:
+        yield
+    finally:
+        with session.lock:
+            session.threads.discard(thread_id)
+
+
+def profile_callbacks() -> List[BaseCallbackHandler]:
+    """Step recorder for the active profile (empty when not profiling)"""
+    session = _current_profile.get()
+    return [ProfileStepsHandler(session)] if session is not None else []
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Admin features are disabled unless ADMIN_TOKEN is set"""
+    from app.core.config import ADMIN_TOKEN
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware deciding per request whether to profile it.
+    X-Profile: 1 (with a valid X-Admin-Token) always profiles; otherwise the
+    admin-set sample rate applies. The profile id is returned in X-Profile-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        requested = (
+            headers.get(b"x-profile") == b"1"
+            and is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1") or None)
+        )
+        reason = should_profile(requested)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = start_profile(scope["method"], scope["path"], reason)
+        status = [None]
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-profile-id", session.profile_id.encode("ascii"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await asyncio.to_thread(stop_profile, session, status[0])
@@ -0,0 +1,184 @@
+"""
+Prompt Token Budgeting
+Counts tokens per prompt section and trims sections to fit a configurable budget.
+Priority order: rules > relevant schema > recent history > samples
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+from langchain_core.messages import BaseMessage, SystemMessage
+from app.core.logging_config import VERBOSE
+
+logger = logging.getLogger(__name__)
+
+
+TRUNCATION_MARKER = "\n... (kısaltıldı)"
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    """tiktoken is optional; without it a ~4 characters/token estimate is used"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count (or estimate) the number of tokens in a text"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to max_tokens, marking the cut"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    keep = max(max_tokens - count_tokens(TRUNCATION_MARKER), 0)
+    encoder = _get_encoder()
+    if encoder is not None:
+        head = encoder.decode(encoder.encode(text, disallowed_special=())[:keep])
+    else:
+        head = text[:keep * 4]
+    # Prefer cutting at a line boundary so tables and lists stay readable
+    cut = head.rfind("\n")
+    if cut > len(head) // 2:
+        head = head[:cut]
+    return head + TRUNCATION_MARKER
+
+
+def compress_whitespace(text: str) -> str:
+    """Collapse trailing spaces and repeated blank lines"""
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+class BudgetedPrompt:
+    """Prompt sections after budgeting, with the token count of each section"""
+
+    def __init__(
+        self,
+        rules: str,
+        schema: str,
+        history: List[BaseMessage],
+        samples: str,
+        token_counts: Dict[str, int],
+    ):
+        self.rules = rules
+        self.schema = schema
+        self.history = history
+        self.samples = samples
+        self.token_counts = token_counts
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.token_counts.values())
+
+
+class PromptBudget:
+    """
+    Fits prompt sections into a token budget.
+    Rules are always kept; the schema is compressed and then truncated; history
+    keeps the most recent messages that fit; samples are dropped first.
+    """
+
+    def __init__(self, max_tokens: int = 6000, history_message_max_tokens: int = 400):
+        self.max_tokens = max_tokens
+        self.history_message_max_tokens = history_message_max_tokens
+
+    def _message_tokens(self, message: BaseMessage) -> int:
+        return count_tokens(str(message.content))
+
+    def _shorten_message(self, message: BaseMessage) -> BaseMessage:
+        """Long messages (e.g. SQL result tables) are cut to a per-message cap"""
+        content = str(message.content)
+        if count_tokens(content) <= self.history_message_max_tokens:
+            return message
+        return message.__class__(
+            content=truncate_to_tokens(content, self.history_message_max_tokens)
+        )
+
+    def _fit_history(self, history: List[BaseMessage], budget: int) -> List[BaseMessage]:
+        """Keep the newest messages that fit, preserving order; a leading summary is kept first"""
+        pinned: List[BaseMessage] = []
+        if history and isinstance(history[0], SystemMessage):
+            summary = history[0]
+            if self._message_tokens(summary) <= budget:
+                pinned.append(summary)
+                budget -= self._message_tokens(summary)
+            history = history[1:]
+
+        kept: List[BaseMessage] = []
+        used = 0
+        for message in reversed(history):
+            message = self._shorten_message(message)
+            tokens = self._message_tokens(message)
+            if used + tokens > budget:
+                break
+            kept.append(message)
+            used += tokens
+        return pinned + list(reversed(kept))
+
+    def fit(
+        self,
+        rules: str,
+        schema: str,
+        history: Optional[List[BaseMessage]] = None,
+        samples: str = "",
+    ) -> BudgetedPrompt:
+        """
+        Trim prompt sections to the budget in priority order.
+
+        Args:
+            rules: Task rules, never trimmed
+            schema: Relevant schema description
+            history: Chat history, oldest first
+            samples: Few-shot examples
+
+        Returns:
+            BudgetedPrompt with the kept sections and their token counts
+        """
+        history = history or []
+        remaining = self.max_tokens
+
+        rules_tokens = count_tokens(rules)
+        remaining -= rules_tokens
+
+        schema = compress_whitespace(schema)
+        if count_tokens(schema) > remaining:
+            schema = truncate_to_tokens(schema, remaining)
+        schema_tokens = count_tokens(schema)
+        remaining -= schema_tokens
+
+        kept_history = self._fit_history(history, max(remaining, 0))
+        history_tokens = sum(self._message_tokens(m) for m in kept_history)
+        remaining -= history_tokens
+
+        samples_tokens = count_tokens(samples)
+        if samples_tokens > remaining:
+            samples, samples_tokens = "", 0
+
+        token_counts = {
+            "rules": rules_tokens,
+            "schema": schema_tokens,
+            "history": history_tokens,
+            "samples": samples_tokens,
+        }
+        logger.info(
+            "Prompt tokens: rules=%d schema=%d history=%d (%d/%d msgs) samples=%d total=%d/%d",
+            rules_tokens, schema_tokens, history_tokens, len(kept_history), len(history),
+            samples_tokens, sum(token_counts.values()), self.max_tokens,
+            extra=VERBOSE,
+        )
+
+        return BudgetedPrompt(rules, schema, kept_history, samples, token_counts)
@@ -0,0 +1,285 @@
+"""
+Query Template Fast Path
+Answers common questions about the default database without the LLM: the question
+is matched against parameterized SQL templates from schema_metadata.json
+("query_templates") and slots such as N, country and year are filled in.
+Anything the matcher is not sure about falls through to the agent.
+"""
+
+import logging
+import json
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+# Turkish characters are folded so "satış", "satis" and "SATIŞ" all match
+_FOLD_TABLE = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+
+_YEAR_PATTERN = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+_NUMBER_PATTERN = re.compile(r"(?<!\d)(\d{1,3})(?!\d)")
+# "top 5", "en çok 5", "ilk 5": a number right after these is a row limit
+_LIMIT_MARKER_PATTERN = re.compile(r"(?<!\w)(?:top|first|ilk|en cok)\s*$")
+# Turkish case suffixes after an apostrophe ("Almanya'da", "2022'de")
+_APOSTROPHE_SUFFIX_PATTERN = re.compile(r"['’]\w*")
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Words (normalized, exact) that carry no filter or measure. Any other word that is
+# not a keyword or slot value ("rock", "AC/DC", "minutes") sends the question to the agent.
+_FILLER_WORDS = {
+    "en", "cok", "fazla", "yuksek", "iyi", "buyuk", "gore", "olan", "olarak", "ilk", "icin",
+    "bazinda", "hangi", "hangileri", "hangisi", "nedir", "neler", "kimler", "bana", "goster",
+    "listele", "sirala", "getir", "bul", "tum", "toplam", "yil", "yili", "yilin", "yilinda",
+    "yilindaki", "dagilim", "dagilimi", "lutfen",
+    "top", "first", "the", "a", "an", "of", "in", "for", "by", "me", "show", "list", "give",
+    "find", "get", "what", "which", "who", "are", "is", "were", "was", "best", "most",
+    "highest", "biggest", "total", "overall", "all", "time", "ever", "their", "with",
+    "have", "has", "distribution", "breakdown", "ranked", "ranking", "please",
+}
+
+# Every template accepting these slots joins Invoice
+_SLOT_FILTERS = {
+    "country": "Invoice.BillingCountry = {value}",
+    "year": "strftime('%Y', Invoice.InvoiceDate) = {value}",
+}
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def _normalize(text: str) -> str:
+    return text.replace("İ", "i").lower().translate(_FOLD_TABLE)
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _term_pattern(terms: List[str], suffixes: bool = True) -> re.Pattern:
+    """Match any term at a word start; Turkish suffixes ("sanatçıları") are allowed unless suffixes=False"""
+    alternatives = "|".join(re.escape(_normalize(t)) for t in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})" + (r"\w*" if suffixes else r"(?!\w)"))
+
+
+def _blank(text: str, start: int, end: int) -> str:
+    """Replace a span with spaces, keeping positions"""
+    return text[:start] + " " * (end - start) + text[end:]
+
+
+def _blank_matches(pattern: re.Pattern, text: str) -> str:
+    return pattern.sub(lambda m: " " * len(m.group(0)), text)
+
+
+class TemplateMatch:
+    """SQL produced by the fast path"""
+
+    def __init__(self, template_id: str, description: str, sql: str, chart_type: Optional[str], slots: Dict[str, Any]):
+        self.template_id = template_id
+        self.description = description
+        self.sql = sql
+        self.chart_type = chart_type
+        self.slots = slots
+
+
+class _Template:
+    def __init__(self, spec: Dict[str, Any]):
+        self.id = spec["id"]
+        self.description = spec.get("description", self.id)
+        self.sql = spec["sql"]
+        self.chart_type = spec.get("chart_type")
+        self.slots: Set[str] = set(spec.get("slots", []))
+        self.keywords = [_term_pattern(group) for group in spec["keywords"]]
+        self.exclude = _term_pattern(spec["exclude"]) if spec.get("exclude") else None
+
+
+class QueryTemplateMatcher:
+    """
+    Rule-based classifier over the configured templates.
+
+    A template matches when every keyword group occurs, no exclude term occurs,
+    and every detected slot (number, country, year) is accepted by the template.
+    Questions containing a global exclude term (inverse ordering such as
+    "en az"/"lowest", negation such as "hariç"/"excluding", comparisons such as
+    "over 40"/"40'tan fazla" or aggregates such as "average"/"kaç") never match:
+    every template sorts descending, filters by equality and reports one measure.
+    A grouping term ("per", "yıllara göre") must be part of the template's own
+    keywords. A number is only a row limit next to "top"/"en çok"/"ilk" or right
+    before an entity noun, and every other word must be a keyword, a slot value
+    or a filler word, so unknown filter values ("rock", "AC/DC") fall through.
+    Slot values are validated against the database before being inlined.
+    """
+
+    def __init__(self, metadata: Dict[str, Any], db_path: str):
+        config = metadata.get("query_templates", {})
+        self.templates = [_Template(spec) for spec in config.get("templates", [])]
+        self._exclude = _term_pattern(config["exclude"]) if config.get("exclude") else None
+        self._exclude_words = (
+            _term_pattern(config["exclude_words"], suffixes=False) if config.get("exclude_words") else None
+        )
+        self._group_by = _term_pattern(config["group_by"]) if config.get("group_by") else None
+        self._limit_nouns = _term_pattern(config["limit_nouns"]) if config.get("limit_nouns") else None
+        self._countries: Dict[str, str] = {}
+        self._years: Set[str] = set()
+        self._load_slot_values(db_path)
+
+        for alias, country in config.get("country_aliases", {}).items():
+            if country in self._countries.values():
+                self._countries[_normalize(alias)] = country
+        self._country_pattern = (
+            re.compile(
+                "|".join(
+                    # Short names ("uk", "usa") must be whole words
+                    rf"(?<!\w){re.escape(name)}" + (r"\w*" if len(name) >= 4 else r"(?!\w)")
+                    for name in sorted(self._countries, key=len, reverse=True)
+                )
+            )
+            if self._countries else None
+        )
+        self._keyword_pattern = _term_pattern(
+            [term for spec in config.get("templates", []) for group in spec["keywords"] for term in group]
+        )
+
+    def _load_slot_values(self, db_path: str) -> None:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            for (country,) in conn.execute("SELECT DISTINCT BillingCountry FROM Invoice"):
+                if country:
+                    self._countries[_normalize(country)] = country
+            for (year,) in conn.execute("SELECT DISTINCT strftime('%Y', InvoiceDate) FROM Invoice"):
+                if year:
+                    self._years.add(year)
+        finally:
+            conn.close()
+
+    def _extract_slots(self, normalized: str) -> Optional[Dict[str, Any]]:
+        """Detect slot values; None if the question is ambiguous or out of range"""
+        slots: Dict[str, Any] = {}
+
+        years = _YEAR_PATTERN.findall(normalized)
+        if len(set(years)) > 1:
+            return None
+        if years:
+            if years[0] not in self._years:
+                return None
+            slots["year"] = years[0]
+        # _normalize keeps character positions, so every recognized span is blanked in place
+        masked = _blank_matches(_YEAR_PATTERN, normalized)
+
+        numbers = list(_NUMBER_PATTERN.finditer(masked))
+        if len(numbers) > 1:
+            return None
+        if numbers:
+            number = numbers[0]
+            n = int(number.group(1))
+            if not 1 <= n <= MAX_LIMIT or not self._is_limit(masked, number.start(), number.end()):
+                return None  # "over 40", "5 minutes": not a row count
+            slots["n"] = n
+            masked = _blank(masked, number.start(), number.end())
+
+        if self._country_pattern is not None:
+            found = set()
+            for m in self._country_pattern.finditer(normalized):
+                found.add(self._lookup_country(m.group(0)))
+                masked = _blank(masked, m.start(), m.end())
+            found.discard(None)
+            if len(found) > 1:
+                return None
+            if found:
+                slots["country"] = found.pop()
+
+        # Unknown words are filters the templates cannot express (artists, genres, ...)
+        masked = _blank_matches(self._keyword_pattern, _APOSTROPHE_SUFFIX_PATTERN.sub(" ", masked))
+        if any(word not in _FILLER_WORDS for word in _WORD_PATTERN.findall(masked)):
+            return None
+
+        return slots
+
+    def _is_limit(self, text: str, start: int, end: int) -> bool:
+        """A number right after "top"/"en çok"/"ilk" or right before an entity noun"""
+        if _LIMIT_MARKER_PATTERN.search(text[:start]):
+            return True
+        return self._limit_nouns is not None and self._limit_nouns.match(text[end:].lstrip()) is not None
+
+    def _lookup_country(self, text: str) -> Optional[str]:
+        """Resolve a matched (possibly suffixed) country name"""
+        if text in self._countries:
+            return self._countries[text]
+        for name in sorted(self._countries, key=len, reverse=True):
+            if len(name) >= 4 and text.startswith(name):
+                return self._countries[name]
+        return None
+
+    def _groups_beyond(self, template: _Template, normalized: str) -> bool:
+        """Whether the question groups by something the template's keywords do not cover"""
+        if self._group_by is None:
+            return False
+        for pattern in template.keywords:
+            normalized = _blank_matches(pattern, normalized)
+        return self._group_by.search(normalized) is not None
+
+    def match(self, question: str) -> Optional[TemplateMatch]:
+        """
+        Match a question to a template and render its SQL.
+
+        Returns:
+            TemplateMatch or None if no template applies unambiguously
+        """
+        normalized = _normalize(question)
+        if self._exclude is not None and self._exclude.search(normalized):
+            return None
+        if self._exclude_words is not None and self._exclude_words.search(normalized):
+            return None
+        slots = self._extract_slots(normalized)
+        if slots is None:
+            return None
+
+        candidates = [
+            template for template in self.templates
+            if all(pattern.search(normalized) for pattern in template.keywords)
+            and not (template.exclude and template.exclude.search(normalized))
+            and set(slots) <= template.slots
+            and not self._groups_beyond(template, normalized)
+        ]
+        if not candidates:
+            return None
+        # Most specific template (most keyword groups) wins; ties keep file order
+        template = max(candidates, key=lambda t: len(t.keywords))
+
+        filters = [
+            _SLOT_FILTERS[name].format(value=_quote(str(slots[name])))
+            for name in ("country", "year") if name in slots
+        ]
+        sql = template.sql.format(
+            where=(" WHERE " + " AND ".join(filters)) if filters else "",
+            n=int(slots.get("n", DEFAULT_LIMIT)),
+        )
+        return TemplateMatch(template.id, template.description, sql, template.chart_type, slots)
+
+
+_matcher_instance: Optional[QueryTemplateMatcher] = None
+
+
+def get_query_template_matcher() -> Optional[QueryTemplateMatcher]:
+    """
+    Get or create the singleton matcher for the default database.
+    Returns None if the metadata or database cannot be loaded.
+    """
+    global _matcher_instance
+
+    if _matcher_instance is None:
+        from app.core.config import BASE_DIR, DB_PATH
+
+        metadata_path = os.path.join(BASE_DIR, "data", "schema_metadata.json")
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            _matcher_instance = QueryTemplateMatcher(metadata, DB_PATH)
+            logger.info("✓ Loaded %d query templates", len(_matcher_instance.templates))
+        except Exception as e:
+            logger.warning("⚠ Query templates unavailable: %s", e)
+            return None
+
+    return _matcher_instance
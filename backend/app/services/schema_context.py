@@ -0,0 +1,59 @@
+"""
+Schema Context Resolution
+Picks the schema description shown to the LLM for a question.
+Shared by the tool-calling agent and direct SQL generation.
+"""
+
+import logging
+import threading
+from typing import Optional
+from app.services.metrics import track_stage
+from app.core.config import RAG_TOP_K
+from app.core.logging_config import VERBOSE
+
+logger = logging.getLogger(__name__)
+
+# Set by initialize_schema_rag once the index is built; until then the full schema is used
+_schema_rag_ready = threading.Event()
+
+
+def mark_schema_rag_ready() -> None:
+    _schema_rag_ready.set()
+
+
+def is_schema_rag_ready() -> bool:
+    return _schema_rag_ready.is_set()
+
+
+@track_stage("schema_description")
+def resolve_schema_description(
+    user_query: str = "",
+    user_schema: Optional[str] = None,
+    use_rag: bool = True,
+    top_k: int = RAG_TOP_K,
+) -> str:
+    """
+    Schema description: Priority order: user_schema > RAG > full schema
+
+    Args:
+        user_query: User's question (used for RAG schema retrieval)
+        user_schema: User-uploaded database schema description
+        use_rag: Whether to use RAG for schema retrieval
+        top_k: Number of schema documents RAG retrieves
+    """
+    if user_schema:
+        # User uploaded database - use its schema
+        logger.info("Using user-uploaded database schema", extra=VERBOSE)
+        return user_schema
+
+    if use_rag and user_query and is_schema_rag_ready():
+        try:
+            from app.services.schema_rag import get_schema_rag
+            rag = get_schema_rag()
+            return rag.get_relevant_schema(user_query, top_k=top_k)
+        except Exception as e:
+            logger.warning("⚠ RAG failed, falling back to full schema: %s", e)
+
+    # Fallback to full schema
+    from app.services.database import generate_enhanced_schema_description
+    return generate_enhanced_schema_description()
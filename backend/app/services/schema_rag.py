@@ -3,22 +3,36 @@ RAG (Retrieval-Augmented Generation) System for Dynamic Schema Management
 Uses ChromaDB to store table/column embeddings and retrieve only relevant schema information
 """
 
+import logging
 import os
 import json
+import threading
 from typing import List, Dict, Any, Optional
 import chromadb
 from chromadb.config import Settings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 from app.services.llm_factory import LLMFactory
+from app.services.join_graph import JoinGraph
+from app.services.metrics import track_stage
 from app.core.config import (
     CHROMA_PERSIST_DIRECTORY, 
     BASE_DIR,
+    DB_PATH,
     LLM_BACKEND,
     GOOGLE_API_KEY,
+    LLM_REQUEST_TIMEOUT,
+    OLLAMA_KEEP_ALIVE,
     OLLAMA_BASE_URL,
-    OLLAMA_EMBEDDING_MODEL
+    OLLAMA_EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_RETRY_BACKOFF,
 )
+from app.core.logging_config import VERBOSE
+
+logger = logging.getLogger(__name__)
 
 
 class SchemaRAG:
@@ -34,30 +48,52 @@ class SchemaRAG:
     ):
         self.persist_directory = persist_directory
         self.collection_name = collection_name
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._join_graph: Optional[JoinGraph] = None
+        
+        # Ensure persist directory exists
+        os.makedirs(persist_directory, exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> None:
+        """Create the embedding client and open the persisted Chroma collection"""
+        # Batched, concurrent embedding for bulk indexing
+        batching = {
+            "batch_size": EMBEDDING_BATCH_SIZE,
+            "max_concurrency": EMBEDDING_MAX_CONCURRENCY,
+            "max_retries": EMBEDDING_MAX_RETRIES,
+            "retry_backoff": EMBEDDING_RETRY_BACKOFF,
+            "progress_callback": self._report_progress,
+        }
         
         # Use factory to create embeddings based on backend
         if LLM_BACKEND.lower() == "gemini":
             self.embeddings = LLMFactory.create_embedding_model(
                 backend="gemini",
-                api_key=GOOGLE_API_KEY
+                api_key=GOOGLE_API_KEY,
+                **batching
             )
         else:  # ollama
             self.embeddings = LLMFactory.create_embedding_model(
                 backend="ollama",
                 base_url=OLLAMA_BASE_URL,
-                embedding_model=OLLAMA_EMBEDDING_MODEL
+                embedding_model=OLLAMA_EMBEDDING_MODEL,
+                timeout=LLM_REQUEST_TIMEOUT,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                **batching
             )
         
-        # Ensure persist directory exists
-        os.makedirs(persist_directory, exist_ok=True)
-        
         # Initialize Chroma vector store
         self.vector_store = Chroma(
-            collection_name=collection_name,
+            collection_name=self.collection_name,
             embedding_function=self.embeddings,
-            persist_directory=persist_directory,
+            persist_directory=self.persist_directory,
         )
 
+    def _report_progress(self, done: int, total: int) -> None:
+        """Print indexing progress as embedding batches complete"""
+        logger.info("RAG indexing: %d/%d documents embedded", done, total)
+
     def initialize_from_metadata(self, metadata_path: Optional[str] = None) -> None:
         """
         Load schema metadata from JSON and create embeddings.
@@ -66,19 +102,15 @@ class SchemaRAG:
         Args:
             metadata_path: Path to schema_metadata.json file
         """
-        if metadata_path is None:
-            metadata_path = os.path.join(BASE_DIR, "data", "schema_metadata.json")
+        metadata = self._load_metadata(metadata_path)
         
-        if not os.path.exists(metadata_path):
-            raise FileNotFoundError(f"Schema metadata not found at {metadata_path}")
-        
-        with open(metadata_path, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
+        # Join graph is cheap to build and needed even when embeddings already exist
+        self._join_graph = JoinGraph.from_sources(DB_PATH, metadata)
         
         # Check if collection already has documents
         existing_count = self.vector_store._collection.count()
         if existing_count > 0:
-            print(f"Schema RAG already initialized with {existing_count} documents")
+            logger.info("Schema RAG already initialized with %d documents", existing_count)
             return
         
         documents = []
@@ -132,7 +164,27 @@ class SchemaRAG:
         
         # Add all documents to vector store
         self.vector_store.add_documents(documents)
-        print(f"✓ Initialized Schema RAG with {len(documents)} documents")
+        logger.info("✓ Initialized Schema RAG with %d documents", len(documents))
+
+    def _load_metadata(self, metadata_path: Optional[str] = None) -> Dict[str, Any]:
+        """Read schema_metadata.json once and keep it for join expansion"""
+        if metadata_path is None:
+            metadata_path = os.path.join(BASE_DIR, "data", "schema_metadata.json")
+        
+        if not os.path.exists(metadata_path):
+            raise FileNotFoundError(f"Schema metadata not found at {metadata_path}")
+        
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            self._metadata = json.load(f)
+        
+        return self._metadata
+
+    def get_join_graph(self) -> JoinGraph:
+        """Return the join graph, building it on first use"""
+        if self._join_graph is None:
+            metadata = self._metadata if self._metadata is not None else self._load_metadata()
+            self._join_graph = JoinGraph.from_sources(DB_PATH, metadata)
+        return self._join_graph
 
     def _format_table_document(
         self, table_name: str, table_info: Dict[str, Any], db_description: str
@@ -167,6 +219,7 @@ class SchemaRAG:
         
         return content
 
+    @track_stage("rag_search")
     def get_relevant_schema(
         self, user_query: str, top_k: int = 5
     ) -> str:
@@ -190,7 +243,7 @@ class SchemaRAG:
         join_patterns = []
         
         for doc in relevant_docs:
-            if doc.metadata.get("type") == "table":
+            if doc.metadata.get("type") in ("table", "relationships"):
                 relevant_tables.add(doc.metadata["table_name"])
             elif doc.metadata.get("type") == "join_pattern":
                 join_patterns.append(doc.page_content)
@@ -207,6 +260,34 @@ class SchemaRAG:
                 schema_parts.append(f"\n### {doc.metadata['table_name']}")
                 schema_parts.append(doc.page_content)
         
+        # Add intermediate tables on the shortest join paths between retrieved tables
+        join_edges = []
+        try:
+            graph = self.get_join_graph()
+            bridge_tables, join_edges = graph.expand(sorted(relevant_tables))
+            tables_meta = (self._metadata or {}).get("tables", {})
+            db_description = (self._metadata or {}).get("database_description", "")
+            formatted = {
+                doc.metadata["table_name"]
+                for doc in relevant_docs
+                if doc.metadata.get("type") == "table"
+            }
+            for table_name in sorted(relevant_tables - formatted) + bridge_tables:
+                if table_name in tables_meta and table_name not in formatted:
+                    formatted.add(table_name)
+                    schema_parts.append(f"\n### {table_name}")
+                    schema_parts.append(
+                        self._format_table_document(table_name, tables_meta[table_name], db_description)
+                    )
+            relevant_tables.update(bridge_tables)
+        except Exception as e:
+            logger.warning("⚠ Join graph expansion failed: %s", e)
+        
+        if join_edges:
+            schema_parts.append("\n## JOIN PATHS:")
+            for left, right, condition in join_edges:
+                schema_parts.append(f"- {left} ↔ {right}: {condition}" if condition else f"- {left} ↔ {right}")
+        
         # Add relevant join patterns
         if join_patterns:
             schema_parts.append("\n## RELEVANT JOIN PATTERNS:")
@@ -216,19 +297,23 @@ class SchemaRAG:
         result = "\n".join(schema_parts)
         
         # Debug info
-        print(f"RAG: Retrieved {len(relevant_tables)} relevant tables for query: '{user_query[:50]}...'")
-        print(f"Tables: {', '.join(relevant_tables)}")
+        logger.info(
+            "RAG: Retrieved %d relevant tables for query: '%s...' (%s)",
+            len(relevant_tables), user_query[:50], ", ".join(sorted(relevant_tables)),
+            extra=VERBOSE,
+        )
         
         return result
 
     def clear_collection(self) -> None:
         """Clear all documents from the vector store"""
         self.vector_store.delete_collection()
-        print("✓ Cleared schema RAG collection")
+        logger.info("✓ Cleared schema RAG collection")
 
 
 # Singleton instance
 _schema_rag_instance: Optional[SchemaRAG] = None
+_schema_rag_lock = threading.Lock()
 
 
 def get_schema_rag() -> SchemaRAG:
@@ -240,21 +325,50 @@ def get_schema_rag() -> SchemaRAG:
     """
     global _schema_rag_instance
     
+    # Warm-up thread'i ve istekler aynı anda çağırabilir; tek örnek oluşturulur
     if _schema_rag_instance is None:
-        _schema_rag_instance = SchemaRAG()
+        with _schema_rag_lock:
+            if _schema_rag_instance is None:
+                _schema_rag_instance = SchemaRAG()
     
     return _schema_rag_instance
 
 
-def initialize_schema_rag() -> None:
+def reopen_schema_rag() -> None:
+    """
+    Reconnect in a forked worker. Chroma's client (SQLite connections, cached
+    per path) and the embedding HTTP client must not be shared across processes;
+    the loaded metadata and join graph are kept, so they stay shared copy-on-write.
+    Call after LLMFactory.reset().
+    """
+    if _schema_rag_instance is None:
+        return
+    try:
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+    except (ImportError, AttributeError):
+        pass
+    _schema_rag_instance._connect()
+
+
+def initialize_schema_rag() -> bool:
     """
     Initialize Schema RAG system on application startup.
     Safe to call multiple times (checks if already initialized).
+
+    Returns:
+        True if the index is ready for retrieval
     """
+    from app.services.schema_context import is_schema_rag_ready, mark_schema_rag_ready
+
+    if is_schema_rag_ready():
+        return True
     try:
         rag = get_schema_rag()
         rag.initialize_from_metadata()
-        print("✓ Schema RAG system ready")
+        mark_schema_rag_ready()
+        logger.info("✓ Schema RAG system ready")
+        return True
     except Exception as e:
-        print(f"⚠ Failed to initialize Schema RAG: {e}")
-        print("⚠ Will fall back to full schema description")
+        logger.warning("⚠ Failed to initialize Schema RAG, will fall back to full schema description: %s", e)
+        return False
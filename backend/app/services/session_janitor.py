@@ -0,0 +1,279 @@
+"""
+Session Database Janitor
+Uploaded databases ({session_id}.db + {session_id}_metadata.json under
+USER_DB_DIRECTORY) are kept as long as the chat history that refers to them.
+A background sweep removes sessions unused for SESSION_DB_TTL or over the
+per-session quota, evicts the least recently used sessions while the directory
+exceeds the global quota, and VACUUMs/ANALYZEs databases whose size changed.
+"Last used" is the database file's mtime, refreshed by UserDatabaseService on
+access. With several workers only the process holding the lock file sweeps,
+at most once per interval.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from app.services.metrics import track_stage
+from app.services.user_database import UserDatabaseService, get_user_database_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: süreçler arası kilit yok, her worker kendi taramasını yapar
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = ".janitor.lock"
+_METADATA_SUFFIX = "_metadata.json"
+# SQLite yan dosyaları oturumun boyutuna dahil edilir
+_SIDECAR_SUFFIXES = ("-journal", "-wal", "-shm")
+
+
+class _SessionFiles:
+    __slots__ = ("session_id", "db_path", "size", "last_used")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.db_path: Optional[str] = None
+        self.size = 0
+        self.last_used = 0.0
+
+
+class SessionDatabaseJanitor:
+    """
+    TTL expiry, quotas with LRU eviction and compaction for session databases.
+
+    ttl, max_session_bytes and max_total_bytes of 0 disable that rule.
+    """
+
+    def __init__(
+        self,
+        service: UserDatabaseService,
+        directory: str,
+        ttl: int = 86400,
+        max_session_bytes: int = 0,
+        max_total_bytes: int = 0,
+        interval: int = 600,
+        vacuum_free_ratio: float = 0.25,
+    ):
+        self.service = service
+        self.directory = directory
+        self.ttl = ttl
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self.interval = interval
+        self.vacuum_free_ratio = vacuum_free_ratio
+        # Son incelemedeki boyut: değişmeyen veritabanları tekrar açılmaz
+        self._inspected: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-db-janitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wake(self) -> None:
+        """Ask for a sweep soon (e.g. after an upload grew the directory)"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        # İlk tarama hemen: kapalıyken süresi dolan oturumlar da temizlenir
+        while not self._stop.is_set():
+            forced = self._wake.is_set()
+            self._wake.clear()
+            try:
+                self.sweep(force=forced)
+            except Exception as e:
+                logger.warning("⚠ Session database sweep failed: %s", e)
+            self._wake.wait(self.interval)
+
+    def sweep(self, force: bool = False) -> Optional[Dict[str, int]]:
+        """
+        Run one sweep under the directory lock.
+
+        Returns:
+            Counts per action, or None if another process holds the lock or
+            swept less than half an interval ago (unless force)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        lock_path = os.path.join(self.directory, LOCK_FILENAME)
+        with open(lock_path, "a") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            # Kilit dosyasının mtime'ı son taramanın zamanıdır (worker'lar arasında ortak)
+            if not force and time.time() - os.stat(lock_path).st_mtime < self.interval / 2 and os.path.getsize(lock_path):
+                return None
+            with track_stage("session_janitor"):
+                stats = self._sweep()
+            lock_file.truncate(0)
+            lock_file.write(str(os.getpid()))
+            lock_file.flush()
+            os.utime(lock_path)
+
+        if stats["expired"] or stats["over_quota"] or stats["evicted"] or stats["vacuumed"]:
+            logger.info(
+                "🧹 Session databases: %d expired, %d over quota, %d evicted (LRU), %d vacuumed, %.1f MB freed",
+                stats["expired"], stats["over_quota"], stats["evicted"], stats["vacuumed"],
+                stats["bytes_freed"] / (1024 * 1024),
+            )
+        return stats
+
+    def _sweep(self) -> Dict[str, int]:
+        stats = {"expired": 0, "over_quota": 0, "evicted": 0, "vacuumed": 0, "analyzed": 0, "bytes_freed": 0}
+        now = time.time()
+        sessions = self._scan()
+
+        kept: List[_SessionFiles] = []
+        for session in sessions:
+            if self.ttl and now - session.last_used > self.ttl:
+                reason = "expired"
+            elif self.max_session_bytes and session.size > self.max_session_bytes:
+                reason = "over_quota"
+            else:
+                kept.append(session)
+                continue
+            self._remove(session)
+            stats[reason] += 1
+            stats["bytes_freed"] += session.size
+
+        # Genel kota: en uzun süredir kullanılmayandan başlayarak sil
+        total = sum(session.size for session in kept)
+        if self.max_total_bytes and total > self.max_total_bytes:
+            kept.sort(key=lambda s: s.last_used)
+            while kept and total > self.max_total_bytes:
+                session = kept.pop(0)
+                self._remove(session)
+                total -= session.size
+                stats["evicted"] += 1
+                stats["bytes_freed"] += session.size
+
+        for session in kept:
+            if session.db_path is not None:
+                freed, action = self._compact(session)
+                stats["bytes_freed"] += freed
+                if action:
+                    stats[action] += 1
+
+        live = {session.db_path for session in kept}
+        self._inspected = {path: size for path, size in self._inspected.items() if path in live}
+        return stats
+
+    def _scan(self) -> List[_SessionFiles]:
+        sessions: Dict[str, _SessionFiles] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.endswith(".db"):
+                    session_id, kind = name[:-3], "db"
+                elif name.endswith(_METADATA_SUFFIX):
+                    session_id, kind = name[: -len(_METADATA_SUFFIX)], "metadata"
+                else:
+                    sidecar = next((s for s in _SIDECAR_SUFFIXES if name.endswith(".db" + s)), None)
+                    if sidecar is None:
+                        continue
+                    session_id, kind = name[: -len(".db" + sidecar)], "sidecar"
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Tarama sırasında silindi
+                session = sessions.setdefault(session_id, _SessionFiles(session_id))
+                session.size += stat.st_size
+                if kind == "db":
+                    session.db_path = entry.path
+                    session.last_used = max(session.last_used, stat.st_mtime)
+                elif kind == "metadata":
+                    session.last_used = max(session.last_used, stat.st_mtime)
+        return list(sessions.values())
+
+    def _remove(self, session: _SessionFiles) -> None:
+        self.service.delete_user_database(session.session_id)
+        if session.db_path is not None:
+            for suffix in _SIDECAR_SUFFIXES:
+                try:
+                    os.remove(session.db_path + suffix)
+                except FileNotFoundError:
+                    pass
+            self._inspected.pop(session.db_path, None)
+
+    def _compact(self, session: _SessionFiles):
+        """
+        VACUUM when free pages exceed vacuum_free_ratio, ANALYZE when statistics
+        are missing. Only databases whose size changed since the last sweep are
+        opened. Returns (bytes freed, action or None).
+        """
+        path = session.db_path
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return 0, None
+        if self._inspected.get(path) == stat.st_size:
+            return 0, None
+
+        action = None
+        try:
+            conn = sqlite3.connect(path, timeout=1, isolation_level=None)
+            try:
+                page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                has_stats = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+                ).fetchone() is not None
+                if page_count and free_pages / page_count >= self.vacuum_free_ratio:
+                    conn.execute("VACUUM")
+                    action = "vacuumed"
+                if not has_stats or action:
+                    conn.execute("ANALYZE")
+                    action = action or "analyzed"
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # Kullanımda (kilitli) veya bozuk: bir sonraki taramada tekrar denenir
+            logger.debug("Skipping compaction of %s: %s", path, e)
+            return 0, None
+
+        # Bakım "kullanım" sayılmaz: LRU sırası için eski mtime geri yüklenir
+        os.utime(path, (stat.st_atime, stat.st_mtime))
+        new_size = os.path.getsize(path)
+        self._inspected[path] = new_size
+        return max(stat.st_size - new_size, 0), action
+
+
+# Singleton instance
+_janitor: Optional[SessionDatabaseJanitor] = None
+
+
+def get_session_janitor() -> SessionDatabaseJanitor:
+    """Get or create the process-wide janitor for USER_DB_DIRECTORY"""
+    global _janitor
+
+    if _janitor is None:
+        from app.core.config import (
+            USER_DB_DIRECTORY, SESSION_DB_TTL, SESSION_DB_MAX_BYTES, SESSION_DB_TOTAL_MAX_BYTES,
+            SESSION_DB_JANITOR_INTERVAL, SESSION_DB_VACUUM_FREE_RATIO,
+        )
+        _janitor = SessionDatabaseJanitor(
+            get_user_database_service(),
+            USER_DB_DIRECTORY,
+            ttl=SESSION_DB_TTL,
+            max_session_bytes=SESSION_DB_MAX_BYTES,
+            max_total_bytes=SESSION_DB_TOTAL_MAX_BYTES,
+            interval=SESSION_DB_JANITOR_INTERVAL,
+            vacuum_free_ratio=SESSION_DB_VACUUM_FREE_RATIO,
+        )
+    return _janitor
@@ -0,0 +1,234 @@
+"""
+Speculative SQL Pre-Execution
+While the user reviews a proposed query, it already runs in the background under
+a row and time budget. If the approved SQL is the same text, /execute-sql reuses
+the result (or waits for the in-flight run) instead of starting from scratch.
+Only the newest proposal per session is kept; older ones are cancelled. A result
+is only reused for the database it ran against, and replacing or deleting a
+session's database discards its speculation.
+"""
+
+import logging
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from app.services.chart_builder import ChartBuilder
+from app.services.metrics import track_stage
+from app.services.sql_executor import (
+    QueryBudgetExceeded,
+    QueryResult,
+    execute_query,
+    validate_read_only_sql,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_sql(sql_query: str) -> str:
+    return re.sub(r"\s+", " ", sql_query.strip().rstrip(";")).strip()
+
+
+class _Speculation:
+    __slots__ = ("sql", "db_path", "future", "cancel_event", "conn", "started_at")
+
+    def __init__(self, sql: str, db_path: str):
+        self.sql = sql
+        self.db_path = db_path
+        self.future: Optional[Future] = None
+        self.cancel_event = threading.Event()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.started_at = time.monotonic()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+        conn = self.conn
+        if conn is not None:
+            try:
+                conn.interrupt()
+            except sqlite3.ProgrammingError:
+                pass  # Already closed
+
+
+class SpeculativeExecutor:
+    """
+    Runs proposed SELECTs ahead of approval on a small thread pool.
+
+    Results are kept per session for result_ttl seconds. Runs that exceed
+    time_budget, hit max_rows or fail are discarded, and approval then runs
+    the query normally.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 10000,
+        time_budget: float = 5.0,
+        result_ttl: float = 120.0,
+        max_workers: int = 2,
+        max_sessions: int = 256,
+        preview_rows: Optional[int] = None,
+    ):
+        self.max_rows = max_rows
+        self.preview_rows = preview_rows
+        self.time_budget = time_budget
+        self.result_ttl = result_ttl
+        self.max_sessions = max_sessions
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-sql")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Speculation]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def start(
+        self,
+        session_id: str,
+        sql_query: str,
+        db_path: str,
+        chart_type: Optional[str] = None,
+    ) -> None:
+        """Begin pre-executing a proposal, replacing the session's previous one"""
+        try:
+            validate_read_only_sql(sql_query)
+        except ValueError:
+            return
+
+        speculation = _Speculation(_normalize_sql(sql_query), db_path)
+        with self._lock:
+            dropped = [self._entries.pop(session_id)] if session_id in self._entries else []
+            self._entries[session_id] = speculation
+            # Unclaimed results expire; entries are in start order, oldest first
+            while self._entries:
+                oldest_id, oldest = next(iter(self._entries.items()))
+                expired = time.monotonic() - oldest.started_at > self.result_ttl
+                if not expired and len(self._entries) <= self.max_sessions:
+                    break
+                dropped.append(self._entries.pop(oldest_id))
+            # Submitted under the lock: take() never sees an entry without its future
+            speculation.future = self._pool.submit(self._run, speculation, chart_type)
+        for previous in dropped:
+            previous.cancel()
+
+    def _run(self, speculation: _Speculation, chart_type: Optional[str]) -> Optional[QueryResult]:
+        if speculation.cancel_event.is_set():
+            return None
+
+        def _keep(conn: sqlite3.Connection) -> None:
+            speculation.conn = conn
+
+        try:
+            with track_stage("sql_speculative"):
+                result = execute_query(
+                    speculation.db_path,
+                    speculation.sql,
+                    max_rows=self.max_rows,
+                    time_budget=self.time_budget,
+                    cancel_event=speculation.cancel_event,
+                    on_connect=_keep,
+                    chart_builder=ChartBuilder(chart_type),
+                    preview_rows=self.preview_rows,
+                )
+        except (QueryBudgetExceeded, sqlite3.Error) as e:
+            # Approval will run it again and report the error if it persists
+            logger.info("⏱ Speculative query discarded: %s", e)
+            return None
+        finally:
+            speculation.conn = None
+
+        # A partial result is not reusable; approval re-runs without the cap
+        return None if result.truncated else result
+
+    async def take(self, session_id: str, sql_query: str, db_path: str) -> Optional[QueryResult]:
+        """
+        Claim the speculative result for an approved query against db_path.
+
+        Returns:
+            QueryResult (rows and chart) if a matching speculation finished (or
+            finishes within its budget), otherwise None
+        """
+        stale = None
+        with self._lock:
+            speculation = self._entries.get(session_id)
+            if speculation is not None and speculation.db_path != db_path:
+                # Ran against a database the session no longer uses
+                stale = self._entries.pop(session_id)
+                speculation = None
+            elif speculation is not None and speculation.sql == _normalize_sql(sql_query):
+                del self._entries[session_id]
+            else:
+                speculation = None
+        if stale is not None:
+            stale.cancel()
+
+        result = None
+        if speculation is not None:
+            age = time.monotonic() - speculation.started_at
+            if speculation.future is not None and age <= self.result_ttl:
+                try:
+                    remaining = max(self.time_budget - age, 0) + 0.1
+                    result = await asyncio.wait_for(
+                        asyncio.wrap_future(speculation.future), timeout=remaining
+                    )
+                except Exception:
+                    result = None
+            # Claimed or not, a removed speculation must not keep running
+            speculation.cancel()
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def discard(self, session_id: str) -> None:
+        """Drop any speculation for a session"""
+        with self._lock:
+            speculation = self._entries.pop(session_id, None)
+        if speculation is not None:
+            speculation.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for speculation in entries:
+            speculation.cancel()
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._entries)
+        return {"pending": pending, "hits": self.hits, "misses": self.misses}
+
+
+_speculative_executor: Optional[SpeculativeExecutor] = None
+
+
+def discard_speculation(session_id: str) -> None:
+    """Drop a session's speculation (e.g. its database changed); no-op if none was started"""
+    if _speculative_executor is not None:
+        _speculative_executor.discard(session_id)
+
+
+def get_speculative_executor() -> SpeculativeExecutor:
+    """Get or create the process-wide speculative executor"""
+    global _speculative_executor
+
+    if _speculative_executor is None:
+        from app.core.config import (
+            SPECULATIVE_MAX_ROWS, SPECULATIVE_TIME_BUDGET,
+            SPECULATIVE_RESULT_TTL, SPECULATIVE_MAX_WORKERS, EXECUTE_PREVIEW_ROWS,
+        )
+        _speculative_executor = SpeculativeExecutor(
+            max_rows=SPECULATIVE_MAX_ROWS,
+            time_budget=SPECULATIVE_TIME_BUDGET,
+            result_ttl=SPECULATIVE_RESULT_TTL,
+            max_workers=SPECULATIVE_MAX_WORKERS,
+            preview_rows=EXECUTE_PREVIEW_ROWS,
+        )
+
+    return _speculative_executor
@@ -0,0 +1,163 @@
+"""
+Read-Only SQL Execution
+Validation and execution of approved (or speculatively pre-run) SELECT queries.
+Queries run on a read-only connection; optional row and time budgets bound the work.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from app.services.chart_builder import ChartBuilder, ChartPayload
+
+
+DANGEROUS_KEYWORDS = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE', 'GRANT', 'REVOKE']
+
+# Progress handler is invoked every N SQLite VM instructions
+_PROGRESS_INTERVAL = 10000
+_FETCH_BATCH_SIZE = 1000
+
+
+class QueryBudgetExceeded(Exception):
+    """The query was stopped because it ran past its time budget or was cancelled"""
+
+
+class QueryResult:
+    """
+    Rows of an executed query.
+
+    truncated is True if max_rows stopped the query; rows may hold only a preview
+    of the row_count rows read.
+    """
+
+    def __init__(
+        self,
+        rows: List[Dict[str, Any]],
+        truncated: bool,
+        elapsed: float,
+        chart: Optional[ChartPayload] = None,
+        row_count: Optional[int] = None,
+    ):
+        self.rows = rows
+        self.truncated = truncated
+        self.elapsed = elapsed
+        self.chart = chart
+        self.row_count = len(rows) if row_count is None else row_count
+
+
+def validate_read_only_sql(sql_query: str) -> None:
+    """
+    Only allow SELECT statements.
+
+    Raises:
+        ValueError: With a user-facing (Turkish) message if the query is not allowed
+    """
+    sql_upper = sql_query.strip().upper()
+
+    # Security check: Block dangerous operations
+    for keyword in DANGEROUS_KEYWORDS:
+        if keyword in sql_upper:
+            raise ValueError(
+                f"Güvenlik nedeniyle {keyword} komutu engellenmiştir. Sadece SELECT sorguları çalıştırılabilir."
+            )
+
+    if not sql_upper.startswith('SELECT'):
+        raise ValueError("Güvenlik nedeniyle sadece SELECT sorguları çalıştırılabilir.")
+
+
+def connect_read_only(db_path: str) -> sqlite3.Connection:
+    """Read-only connection; usable from another thread (interrupt, streaming)"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Enable column name access
+    return conn
+
+
+def iter_batches(cursor: sqlite3.Cursor, batch_size: int = _FETCH_BATCH_SIZE) -> Iterator[List[Any]]:
+    """Yield fetched rows batch by batch, so memory stays bounded by batch_size"""
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield batch
+
+
+def execute_query(
+    db_path: str,
+    sql_query: str,
+    max_rows: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_connect=None,
+    chart_builder: Optional[ChartBuilder] = None,
+    preview_rows: Optional[int] = None,
+) -> QueryResult:
+    """
+    Run a SELECT on a read-only connection (blocking).
+
+    Args:
+        db_path: SQLite database file
+        sql_query: Validated SELECT query
+        max_rows: Stop after this many rows (result marked truncated)
+        time_budget: Abort after this many seconds
+        cancel_event: Abort when set
+        on_connect: Called with the connection before execution, e.g. to keep it
+            for conn.interrupt() from another thread
+        chart_builder: Fed every fetched batch; its chart is returned in the result
+        preview_rows: Keep only the first N rows in memory; row_count still counts all
+
+    Raises:
+        QueryBudgetExceeded: Time budget exceeded or cancelled
+        sqlite3.Error: Query failed
+    """
+    started = time.monotonic()
+    conn = connect_read_only(db_path)
+    if on_connect is not None:
+        on_connect(conn)
+
+    if time_budget is not None or cancel_event is not None:
+        deadline = started + time_budget if time_budget is not None else None
+
+        def _should_abort() -> int:
+            # Non-zero return aborts the statement with "interrupted"
+            if cancel_event is not None and cancel_event.is_set():
+                return 1
+            if deadline is not None and time.monotonic() > deadline:
+                return 1
+            return 0
+
+        conn.set_progress_handler(_should_abort, _PROGRESS_INTERVAL)
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql_query)
+        if chart_builder is not None and cursor.description:
+            chart_builder.set_columns([column[0] for column in cursor.description])
+
+        rows = []
+        row_count = 0
+        truncated = False
+        for batch in iter_batches(cursor):
+            if max_rows is not None and row_count + len(batch) > max_rows:
+                batch = batch[:max_rows - row_count]
+                truncated = True
+            row_count += len(batch)
+            if preview_rows is None:
+                rows.extend(batch)
+            elif len(rows) < preview_rows:
+                rows.extend(batch[:preview_rows - len(rows)])
+            if chart_builder is not None:
+                chart_builder.add_rows(batch)
+            if truncated:
+                break
+
+        chart = chart_builder.build() if chart_builder is not None else None
+        # Convert to list of dicts
+        return QueryResult(
+            [dict(row) for row in rows], truncated, time.monotonic() - started, chart, row_count
+        )
+    except sqlite3.OperationalError as e:
+        if "interrupted" in str(e):
+            raise QueryBudgetExceeded(str(e))
+        raise
+    finally:
+        conn.close()
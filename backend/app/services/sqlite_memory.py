@@ -0,0 +1,233 @@
+"""
+SQLite Chat Memory Backend
+Durable, multi-process-safe chat history for single-node deployments without Redis
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage
+from app.services.memory import AbstractChatMemory, MessageCodec
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    next_seq INTEGER NOT NULL DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    summary TEXT,
+    summary_covered INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated_at ON chat_sessions (updated_at);
+"""
+
+
+class SQLiteChatMemory(AbstractChatMemory):
+    """
+    SQLite-based chat memory implementation.
+    Uses WAL mode so several worker processes can read while one writes.
+    Messages are keyed by (session_id, seq), which doubles as the index for
+    windowed reads. Sessions idle longer than ttl are removed by a background
+    cleanup thread (so they may outlive the TTL by up to cleanup_interval).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: int = 86400,
+        max_messages: int = 200,
+        compress_threshold: int = 1024,
+        cleanup_interval: int = 300,
+        busy_timeout_ms: int = 5000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.busy_timeout_ms = busy_timeout_ms
+        self.codec = MessageCodec(compress_threshold)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+        self._stop = threading.Event()
+        self._cleaner = threading.Thread(
+            target=self._cleanup_loop,
+            args=(cleanup_interval,),
+            name="sqlite-memory-cleanup",
+            daemon=True,
+        )
+        self._cleaner.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit with explicit transactions for writes"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close() can release it; each thread uses its own
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
+        """Insert messages in one transaction and cap the session at max_messages"""
+        if not messages:
+            return
+        rows = [self.codec.encode(msg) for msg in messages]
+        now = time.time()
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front so seq allocation is race-free across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO chat_sessions (session_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO NOTHING",
+                (session_id, now),
+            )
+            next_seq, count, covered = conn.execute(
+                "SELECT next_seq, message_count, summary_covered FROM chat_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            conn.executemany(
+                "INSERT INTO chat_messages (session_id, seq, data) VALUES (?, ?, ?)",
+                [(session_id, next_seq + i, data) for i, data in enumerate(rows)],
+            )
+            next_seq += len(rows)
+            count += len(rows)
+
+            trimmed = count - self.max_messages
+            if trimmed > 0:
+                conn.execute(
+                    "DELETE FROM chat_messages WHERE session_id = ? AND seq < ?",
+                    (session_id, next_seq - self.max_messages),
+                )
+                count = self.max_messages
+                covered = max(covered - trimmed, 0)
+
+            conn.execute(
+                "UPDATE chat_sessions SET next_seq = ?, message_count = ?, summary_covered = ?, "
+                "updated_at = ? WHERE session_id = ?",
+                (next_seq, count, covered, now, session_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_messages(self, session_id: str) -> List[BaseMessage]:
+        """Retrieve all messages for a session"""
+        rows = self._conn().execute(
+            "SELECT data FROM chat_messages WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ).fetchall()
+        return self.codec.decode_all([row[0] for row in rows])
+
+    def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        """Index range scan from the newest seq backwards"""
+        if limit is None:
+            return self.get_messages(session_id)
+        if limit <= 0:
+            return []
+        rows = self._conn().execute(
+            "SELECT data FROM chat_messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        return self.codec.decode_all([row[0] for row in reversed(rows)])
+
+    def count_messages(self, session_id: str) -> int:
+        row = self._conn().execute(
+            "SELECT message_count FROM chat_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def clear_session(self, session_id: str) -> None:
+        """Delete a session and its messages"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def session_exists(self, session_id: str) -> bool:
+        return self.count_messages(session_id) > 0
+
+    def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT summary, summary_covered FROM chat_sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return {"content": row[0], "covered": row[1]}
+
+    def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        self._conn().execute(
+            "UPDATE chat_sessions SET summary = ?, summary_covered = ? WHERE session_id = ?",
+            (content, covered, session_id),
+        )
+
+    def cleanup_expired(self) -> int:
+        """
+        Delete sessions idle longer than the TTL.
+
+        Returns:
+            Number of removed sessions
+        """
+        cutoff = time.time() - self.ttl
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM chat_messages WHERE session_id IN "
+                "(SELECT session_id FROM chat_sessions WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            removed = conn.execute(
+                "DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def _cleanup_loop(self, interval: int) -> None:
+        while not self._stop.wait(interval):
+            try:
+                removed = self.cleanup_expired()
+                if removed:
+                    logger.info("🧹 Removed %d expired chat sessions from SQLite memory", removed)
+            except Exception as e:
+                logger.warning("⚠ SQLite memory cleanup failed: %s", e)
+
+    def close(self) -> None:
+        """Stop the cleanup thread and close all per-thread connections"""
+        self._stop.set()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
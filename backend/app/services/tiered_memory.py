@@ -0,0 +1,300 @@
+"""
+Two-Tier Chat Memory
+Per-worker L1 cache of recently active sessions in front of async Redis.
+Writes go through to Redis and are broadcast over pub/sub so other workers
+drop their stale copies; repeated reads of a hot session stay in-process.
+"""
+
+import logging
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage
+from app.services.async_memory import AsyncAbstractChatMemory, AsyncRedisChatMemory
+
+logger = logging.getLogger(__name__)
+
+
+INVALIDATION_CHANNEL = "chat_memory:invalidate"
+
+# Marker for "summary not loaded yet" (None means "loaded, no summary")
+_UNKNOWN = object()
+
+
+class _CacheEntry:
+    """
+    A suffix of a session's history: the last len(tail) messages, plus the
+    total count if known. Windowed reads only cache the window they fetched.
+    """
+
+    __slots__ = ("tail", "count", "summary", "loaded_at")
+
+    def __init__(self, now: float):
+        self.tail: List[BaseMessage] = []
+        self.count: Optional[int] = None
+        self.summary: Any = _UNKNOWN
+        self.loaded_at = now
+
+    @property
+    def complete(self) -> bool:
+        return self.count is not None and len(self.tail) == self.count
+
+    def covers(self, limit: Optional[int]) -> bool:
+        return self.complete or (limit is not None and len(self.tail) >= limit)
+
+    def last(self, limit: Optional[int]) -> List[BaseMessage]:
+        if limit is None:
+            return list(self.tail)
+        return self.tail[-limit:] if limit > 0 else []
+
+
+class TwoTierChatMemory(AsyncAbstractChatMemory):
+    """
+    Write-through L1 cache over AsyncRedisChatMemory.
+
+    Coherence: every write publishes {session_id, origin} on INVALIDATION_CHANNEL;
+    other workers evict that session. Entries also expire after ttl seconds, and
+    the whole cache is bypassed while the subscription is down.
+    """
+
+    def __init__(
+        self,
+        redis_memory: AsyncRedisChatMemory,
+        max_sessions: int = 1000,
+        ttl: float = 60.0,
+    ):
+        self.redis_memory = redis_memory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.worker_id = uuid.uuid4().hex
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # Striped write counters: a load only populates L1 if no write raced with it
+        self._versions = [0] * 1024
+        self._subscriber: Optional[asyncio.Task] = None
+        self._coherent = False
+        self.hits = 0
+        self.misses = 0
+
+    # ---- lifecycle ----
+
+    async def ping(self) -> None:
+        await self.redis_memory.ping()
+
+    async def start(self) -> None:
+        """Start listening for invalidations from other workers"""
+        if self._subscriber is None:
+            self._subscriber = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            try:
+                await self._subscriber
+            except asyncio.CancelledError:
+                pass
+            self._subscriber = None
+        self._coherent = False
+        self._cache.clear()
+        await self.redis_memory.close()
+
+    async def _listen(self) -> None:
+        backoff = 0.5
+        while True:
+            pubsub = self.redis_memory.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything cached before the subscription was live may be stale
+                self._cache.clear()
+                self._coherent = True
+                backoff = 0.5
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self._handle_invalidation(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠ L1 cache invalidation stream lost (%s), bypassing cache", e)
+                self._coherent = False
+                self._cache.clear()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def _handle_invalidation(self, data: Any) -> None:
+        try:
+            payload = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if payload.get("o") == self.worker_id:
+            return
+        session_id = payload.get("s")
+        self._bump(session_id)
+        self._cache.pop(session_id, None)
+
+    async def _publish(self, session_id: str) -> None:
+        try:
+            await self.redis_memory.redis_client.publish(
+                INVALIDATION_CHANNEL,
+                json.dumps({"s": session_id, "o": self.worker_id}),
+            )
+        except Exception as e:
+            logger.warning("⚠ Failed to publish L1 invalidation for %s: %s", session_id, e)
+
+    # ---- cache helpers ----
+
+    def _stripe(self, session_id: str) -> int:
+        return hash(session_id) % len(self._versions)
+
+    def _bump(self, session_id: str) -> None:
+        self._versions[self._stripe(session_id)] += 1
+
+    def _get_entry(self, session_id: str) -> Optional[_CacheEntry]:
+        if not self._coherent:
+            return None
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl:
+            del self._cache[session_id]
+            return None
+        self._cache.move_to_end(session_id)
+        return entry
+
+    def _store(self, session_id: str, entry: _CacheEntry) -> None:
+        self._cache[session_id] = entry
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.max_sessions:
+            self._cache.popitem(last=False)
+
+    def _cacheable_entry(self, session_id: str, version: int) -> Optional[_CacheEntry]:
+        """Entry to record a Redis read in; None if a write raced with the read"""
+        if not self._coherent or version != self._versions[self._stripe(session_id)]:
+            return None
+        entry = self._get_entry(session_id)
+        if entry is None:
+            entry = _CacheEntry(time.monotonic())
+            self._store(session_id, entry)
+        return entry
+
+    def _remember(
+        self, session_id: str, version: int, tail: List[BaseMessage], count: Optional[int]
+    ) -> None:
+        entry = self._cacheable_entry(session_id, version)
+        if entry is None:
+            return
+        if len(tail) > len(entry.tail):
+            entry.tail = tail
+        if count is not None:
+            entry.count = count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coherent": self._coherent,
+        }
+
+    # ---- reads ----
+    # Misses use the backend's windowed reads (LRANGE -N -1, LLEN, EXISTS) and
+    # cache only what they fetched; the full history is read only by get_messages.
+
+    async def get_messages(self, session_id: str) -> List[BaseMessage]:
+        return await self._read_last(session_id, None)
+
+    async def _read_last(self, session_id: str, limit: Optional[int]) -> List[BaseMessage]:
+        if limit is not None and limit <= 0:
+            return []
+        entry = self._get_entry(session_id)
+        if entry is not None and entry.covers(limit):
+            self.hits += 1
+            return entry.last(limit)
+
+        self.misses += 1
+        version = self._versions[self._stripe(session_id)]
+        messages = await self.redis_memory._read_last(session_id, limit)
+        # Fewer than asked for: the window is the whole history
+        complete = limit is None or len(messages) < limit
+        self._remember(session_id, version, messages, len(messages) if complete else None)
+        return list(messages)
+
+    async def count_messages(self, session_id: str) -> int:
+        entry = self._get_entry(session_id)
+        if entry is not None and entry.count is not None:
+            self.hits += 1
+            return entry.count
+
+        self.misses += 1
+        version = self._versions[self._stripe(session_id)]
+        count = await self.redis_memory.count_messages(session_id)
+        self._remember(session_id, version, [], count)
+        return count
+
+    async def session_exists(self, session_id: str) -> bool:
+        entry = self._get_entry(session_id)
+        if entry is not None and (entry.count is not None or entry.tail):
+            self.hits += 1
+            return bool(entry.count or entry.tail)
+
+        self.misses += 1
+        version = self._versions[self._stripe(session_id)]
+        exists = await self.redis_memory.session_exists(session_id)
+        if not exists:
+            self._remember(session_id, version, [], 0)
+        return exists
+
+    async def get_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._get_entry(session_id)
+        if entry is not None and entry.summary is not _UNKNOWN:
+            self.hits += 1
+            return dict(entry.summary) if entry.summary else None
+
+        version = self._versions[self._stripe(session_id)]
+        summary = await self.redis_memory.get_summary(session_id)
+        entry = self._cacheable_entry(session_id, version)
+        if entry is not None:
+            entry.summary = summary
+        return summary
+
+    # ---- writes (write-through) ----
+
+    async def add_messages(self, session_id: str, messages: List[BaseMessage]) -> None:
+        self._bump(session_id)
+        await self.redis_memory.add_messages(session_id, messages)
+        # Loads that started during the write must not cache pre-write data
+        self._bump(session_id)
+
+        entry = self._get_entry(session_id)
+        if entry is not None:
+            max_messages = self.redis_memory.max_messages
+            entry.tail = (entry.tail + list(messages))[-max_messages:]
+            if entry.count is None or entry.count + len(messages) > max_messages:
+                # Redis may have trimmed the list and shifted the summary's covered count
+                entry.summary = _UNKNOWN
+            if entry.count is not None:
+                entry.count = min(entry.count + len(messages), max_messages)
+        await self._publish(session_id)
+
+    async def set_summary(self, session_id: str, content: str, covered: int) -> None:
+        self._bump(session_id)
+        await self.redis_memory.set_summary(session_id, content, covered)
+        self._bump(session_id)
+        entry = self._get_entry(session_id)
+        if entry is not None:
+            entry.summary = {"content": content, "covered": covered}
+        await self._publish(session_id)
+
+    async def clear_session(self, session_id: str) -> None:
+        self._bump(session_id)
+        self._cache.pop(session_id, None)
+        await self.redis_memory.clear_session(session_id)
+        self._bump(session_id)
+        await self._publish(session_id)
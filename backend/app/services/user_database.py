@@ -3,15 +3,35 @@ User Database Management Service
 Handles CSV/Excel file uploads and converts them to session-specific SQLite databases
 """
 
+import logging
 import os
-import pandas as pd
 import sqlite3
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from fastapi import UploadFile
-from app.core.config import USER_DB_DIRECTORY
+from app.core.config import SESSION_DB_MAX_BYTES, USER_DB_DIRECTORY
+from app.services.metrics import track_stage
+from app.services.speculative import discard_speculation
 import json
+import time
 import uuid
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Son kullanım zamanı (mtime) en fazla bu sıklıkla güncellenir (saniye); janitor TTL/LRU için okur
+_TOUCH_INTERVAL = 60
+
+
+def _is_database_full(error: BaseException) -> bool:
+    """SQLITE_FULL anywhere in the chain (pandas wraps sqlite3 errors in its own DatabaseError)"""
+    while error is not None:
+        if getattr(error, "sqlite_errorcode", None) == sqlite3.SQLITE_FULL:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
 
 class UserDatabaseService:
     """Service for managing user-uploaded databases"""
@@ -41,17 +61,29 @@ class UserDatabaseService:
         Returns:
             Tuple of (success: bool, message: str, metadata: Optional[Dict])
         """
+        # pandas ilk upload'da yüklenir (startup süresine eklenmez)
+        import pandas as pd
+
         try:
             # Read file based on extension
             filename = file.filename.lower()
             
-            if filename.endswith('.csv'):
-                df = pd.read_csv(file.file)
-            elif filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file.file)
-            else:
+            if not filename.endswith(('.csv', '.xlsx', '.xls')):
                 return False, "Desteklenmeyen dosya formatı. Lütfen CSV veya Excel dosyası yükleyin.", None
 
+            # Kota ayrıştırmadan önce: ham dosya zaten sınırı aşıyorsa pandas'a hiç okutma
+            upload_size = self._upload_size(file)
+            if SESSION_DB_MAX_BYTES and upload_size > SESSION_DB_MAX_BYTES:
+                return False, (
+                    f"Dosya çok büyük ({upload_size / (1024 * 1024):.1f} MB). "
+                    f"Oturum başına sınır: {SESSION_DB_MAX_BYTES / (1024 * 1024):.0f} MB."
+                ), None
+            with track_stage("upload_parse"):
+                if filename.endswith('.csv'):
+                    df = pd.read_csv(file.file)
+                else:
+                    df = pd.read_excel(file.file)
+
             # Validate dataframe
             if df.empty:
                 return False, "Dosya boş veya okunamadı.", None
@@ -70,13 +102,35 @@ class UserDatabaseService:
             table_name = self._sanitize_table_name(file.filename)
             
             # Write dataframe to database
-            df.to_sql(table_name, conn, if_exists='replace', index=False)
+            quota_exceeded = False
+            try:
+                with track_stage("upload_write"):
+                    if SESSION_DB_MAX_BYTES:
+                        # Kota yazma sırasında: sınırı aşan sayfada SQLite SQLITE_FULL ile durur
+                        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                        conn.execute(f"PRAGMA max_page_count = {max(SESSION_DB_MAX_BYTES // page_size, 1)}")
+                    df.to_sql(table_name, conn, if_exists='replace', index=False)
+                    # Toplu yüklemeden sonra planner istatistikleri
+                    conn.execute("ANALYZE")
+            except Exception as e:
+                if not SESSION_DB_MAX_BYTES or not _is_database_full(e):
+                    raise
+                quota_exceeded = True
+            finally:
+                conn.close()
+                # Onay bekleyen sorgu eski veritabanında çalışmış olabilir
+                discard_speculation(session_id)
+            if quota_exceeded:
+                self.delete_user_database(session_id)
+                return False, (
+                    "Veritabanı oturum başına sınırı aşıyor "
+                    f"({SESSION_DB_MAX_BYTES / (1024 * 1024):.0f} MB)."
+                ), None
             
             # Generate and save metadata
-            metadata = self._generate_metadata(df, table_name, file.filename)
-            self._save_metadata(session_id, metadata)
-            
-            conn.close()
+            with track_stage("upload_metadata"):
+                metadata = self._generate_metadata(df, table_name, file.filename)
+                self._save_metadata(session_id, metadata)
             
             return True, f"Dosya başarıyla yüklendi. Tablo adı: {table_name}", metadata
 
@@ -85,6 +139,16 @@ class UserDatabaseService:
         except Exception as e:
             return False, f"Dosya işlenirken hata oluştu: {str(e)}", None
 
+    @staticmethod
+    def _upload_size(file: UploadFile) -> int:
+        """Byte size of the uploaded file, without reading it into memory"""
+        if file.size is not None:
+            return file.size
+        position = file.file.tell()
+        size = file.file.seek(0, os.SEEK_END)
+        file.file.seek(position)
+        return size
+
     def _sanitize_table_name(self, filename: str) -> str:
         """Convert filename to valid SQL table name"""
         # Remove extension
@@ -98,9 +162,11 @@ class UserDatabaseService:
         return name[:50].lower()
 
     def _generate_metadata(
-        self, df: pd.DataFrame, table_name: str, original_filename: str
+        self, df: "pd.DataFrame", table_name: str, original_filename: str
     ) -> Dict:
         """Generate metadata for user database"""
+        import pandas as pd
+
         column_info = {}
         
         for col in df.columns:
@@ -150,7 +216,17 @@ class UserDatabaseService:
             Path to database file or None if not found
         """
         db_path = self._get_user_db_path(session_id)
-        return db_path if os.path.exists(db_path) else None
+        try:
+            last_used = os.stat(db_path).st_mtime
+        except FileNotFoundError:
+            return None
+        # Kullanım zamanı: session janitor bu oturumu TTL/LRU'da yeni sayar
+        if time.time() - last_used > _TOUCH_INTERVAL:
+            try:
+                os.utime(db_path)
+            except OSError:
+                pass
+        return db_path
 
     def get_user_metadata(self, session_id: str) -> Optional[Dict]:
         """
@@ -213,6 +289,7 @@ class UserDatabaseService:
         Returns:
             True if successfully deleted, False otherwise
         """
+        discard_speculation(session_id)
         try:
             db_path = self._get_user_db_path(session_id)
             metadata_path = self._get_metadata_path(session_id)
@@ -229,7 +306,7 @@ class UserDatabaseService:
             
             return deleted
         except Exception as e:
-            print(f"Error deleting user database: {e}")
+            logger.error("Error deleting user database: %s", e)
             return False
 
     def has_user_database(self, session_id: str) -> bool:
@@ -0,0 +1,139 @@
+"""
+Background Warm-up and Readiness
+Chinook schema reflection, the query template matcher, the schema RAG index and
+the LLM warm-up run in a background task after startup, so the server accepts
+traffic (and answers liveness probes) immediately. Requests arriving before a
+stage finishes use the existing fallbacks (full schema, agent path).
+/ready reports 503 until every stage has finished, succeeded or not.
+In multi-worker mode the read-only stages also run once in the master before
+forking (preload_shared_state), so workers find them already done.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.config import LLM_WARMUP_ENABLED, QUERY_TEMPLATES_ENABLED
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+
+
+def _reflect_chinook() -> None:
+    from app.services.database import get_db
+    get_db()
+
+
+def _load_query_templates() -> None:
+    from app.services.query_templates import get_query_template_matcher
+    if get_query_template_matcher() is None:
+        raise RuntimeError("query template matcher could not be loaded")
+
+
+def _initialize_schema_rag() -> None:
+    from app.services.schema_rag import initialize_schema_rag
+    if not initialize_schema_rag():
+        raise RuntimeError("schema RAG index could not be built")
+
+
+def _warm_up_llm() -> None:
+    from app.services.llm import warm_up_llm
+    warm_up_llm()
+
+
+def _stages() -> List[Tuple[str, Callable[[], None], bool, bool]]:
+    # (name, function, enabled, shared); sıralı çalışır: RAG embedding'i ve LLM warm-up aynı Ollama'yı kullanır.
+    # shared: sonucu salt okunur, çok worker'lı modda fork öncesi bir kez yüklenir
+    return [
+        ("chinook_schema", _reflect_chinook, True, True),
+        ("query_templates", _load_query_templates, QUERY_TEMPLATES_ENABLED, True),
+        ("schema_rag", _initialize_schema_rag, True, True),
+        ("llm", _warm_up_llm, LLM_WARMUP_ENABLED, False),
+    ]
+
+
+class WarmupState:
+    """Per-stage status of the startup warm-up"""
+
+    def __init__(self, stage_names: List[str]):
+        self.stages: Dict[str, Dict] = {name: {"status": PENDING} for name in stage_names}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    def snapshot(self) -> Dict:
+        failed = [name for name, stage in self.stages.items() if stage["status"] == FAILED]
+        duration = None
+        if self.started_at is not None:
+            duration = round(((self.finished_at or time.time()) - self.started_at) * 1000, 1)
+        return {
+            "status": ("degraded" if failed else "ready") if self.ready else "starting",
+            "warmup_ms": duration,
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+        }
+
+
+def _new_state() -> WarmupState:
+    return WarmupState([name for name, _, _, _ in _stages()])
+
+
+_state = _new_state()
+
+
+def get_warmup_state() -> WarmupState:
+    return _state
+
+
+async def run_warmup() -> None:
+    """Run every stage in a worker thread, one after another; failures are logged, not raised"""
+    global _state
+
+    # Her process kendi warm-up'ını raporlar (fork edilen worker parent'ın durumunu devralmaz)
+    _state = _new_state()
+    _state.started_at = time.time()
+    for name, func, enabled, _ in _stages():
+        stage = _state.stages[name]
+        if not enabled:
+            stage["status"] = SKIPPED
+            continue
+        stage["status"] = RUNNING
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(func)
+            stage["status"] = DONE
+        except Exception as e:
+            stage["status"] = FAILED
+            stage["error"] = str(e)
+            logger.warning("⚠ Warm-up stage %s failed: %s", name, e)
+        stage["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    _state.finished_at = time.time()
+    logger.info("✓ Warm-up finished in %.0fms", (_state.finished_at - _state.started_at) * 1000)
+
+
+def preload_shared_state() -> None:
+    """
+    Multi-worker launcher, before forking: import the heavy libraries and run the
+    shared (read-only) stages once, so workers inherit them copy-on-write.
+    Workers still run run_warmup(); the shared stages are then cache hits.
+    """
+    started = time.perf_counter()
+    import pandas  # noqa: F401 (upload)
+    from langchain_community.agent_toolkits import create_sql_agent  # noqa: F401 (agent)
+
+    for name, func, enabled, shared in _stages():
+        if not (enabled and shared):
+            continue
+        try:
+            func()
+        except Exception as e:
+            logger.warning("⚠ Preload of %s failed, workers will retry: %s", name, e)
+    logger.info("✓ Shared state preloaded in %.0fms", (time.perf_counter() - started) * 1000)
+
+
+def start_warmup() -> asyncio.Task:
+    """Schedule run_warmup on the running event loop"""
+    return asyncio.create_task(run_warmup(), name="startup-warmup")
@@ -0,0 +1,338 @@
+"""
+Text-to-SQL Efficiency Evaluation
+Runs the fixed Chinook question set (chinook_questions.json) through build_agent
+for every combination of RAG top_k, prompt variant and model, and records per
+question: LLM calls, agent iterations, prompt/completion tokens, retrieved
+tables, end-to-end latency and whether the answer's result set matches the
+gold SQL on Chinook_Sqlite.sqlite. The summary shows, per configuration, the
+accuracy next to its token and round-trip cost, and recommends the cheapest
+configuration within --accuracy-tolerance of the most accurate one.
+
+Usage (from backend/):
+    python -m benchmarks.eval_sql --models ollama:llama3.1:8b --top-k 3 5 8
+    python -m benchmarks.eval_sql --models gemini:gemini-2.5-flash --prompts default no_samples compact
+    python -m benchmarks.eval_sql --fake          # offline smoke run with the scripted LLM
+
+top_k 0 means no RAG (full schema description).
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS_PATH = os.path.join(BENCH_DIR, "chinook_questions.json")
+MAX_RESULT_ROWS = 10_000
+
+_SQL_BLOCK = re.compile(r"```sql\s*([^`]+)\s*```", re.IGNORECASE | re.DOTALL)
+_SCHEMA_TABLE = re.compile(r"^### (\w+)", re.MULTILINE)
+
+COMPACT_RULES = """## GÖREV KURALLARI:
+1. Soruyu (ve varsa önceki konuşmayı) dikkate alarak tek bir SQLite SELECT sorgusu yaz, ÇALIŞTIRMA.
+2. Sorguyu ```sql ... ``` bloğunda ver; en fazla 1 kısa cümle açıklama ekle.
+3. Şema yukarıda verildi; gerekmedikçe şema araçlarını çağırma."""
+
+
+def prompt_variants() -> Dict[str, Dict[str, str]]:
+    """build_agent prompt overrides by name"""
+    from app.services.agent import RULES_PROMPT, SAMPLES_PROMPT
+
+    return {
+        "default": {"rules": RULES_PROMPT, "samples": SAMPLES_PROMPT},
+        "no_samples": {"rules": RULES_PROMPT, "samples": ""},
+        "compact": {"rules": COMPACT_RULES, "samples": ""},
+    }
+
+
+class EvalCallbackHandler(BaseCallbackHandler):
+    """Counts LLM calls, tokens, agent iterations and tool calls of one agent run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.iterations = 0
+        self.tools: List[str] = []
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self.llm_calls += 1
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        from app.services.metrics import _token_usage
+
+        prompt, completion = _token_usage(response)
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        self.iterations += 1
+
+    def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
+        self.iterations += 1
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        with self._lock:
+            self.tools.append((serialized or {}).get("name", "unknown"))
+
+
+def _normalize_value(value: Any) -> Any:
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _result_rows(db_path: str, sql: str) -> Tuple[List[Tuple], bool]:
+    """Normalized rows (column order ignored) and whether the query orders them"""
+    from app.services.sql_executor import connect_read_only
+
+    conn = connect_read_only(db_path)
+    try:
+        rows = conn.execute(sql).fetchmany(MAX_RESULT_ROWS)
+    finally:
+        conn.close()
+    normalized = [
+        tuple(sorted((_normalize_value(v) for v in row), key=lambda v: (type(v).__name__, repr(v))))
+        for row in rows
+    ]
+    return normalized, bool(re.search(r"\border\s+by\b", sql, re.IGNORECASE))
+
+
+def check_result(db_path: str, predicted_sql: Optional[str], gold_sql: str) -> Tuple[bool, Optional[str]]:
+    """
+    Execution accuracy: the predicted query returns the same rows as the gold
+    query (as a multiset; in order if the gold query has ORDER BY).
+    """
+    from app.services.sql_executor import validate_read_only_sql
+
+    if not predicted_sql:
+        return False, "no SQL in answer"
+    try:
+        validate_read_only_sql(predicted_sql)
+        predicted, _ = _result_rows(db_path, predicted_sql)
+    except (ValueError, sqlite3.Error) as e:
+        return False, f"predicted SQL failed: {e}"
+    gold, ordered = _result_rows(db_path, gold_sql)
+    if ordered:
+        return (True, None) if predicted == gold else (False, "rows differ (ordered)")
+    return (True, None) if Counter(predicted) == Counter(gold) else (False, "rows differ")
+
+
+def create_model(spec: str, fake: bool):
+    """'ollama:<model>' or 'gemini:<model>'; no response cache so every call reaches the model"""
+    from app.core.config import GOOGLE_API_KEY, LLM_REQUEST_TIMEOUT, OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE, OLLAMA_MODEL
+    from app.services.llm_factory import LLMFactory
+
+    backend, _, model = spec.partition(":")
+    if fake or backend == "ollama":
+        return LLMFactory.create_chat_model(
+            backend="ollama", base_url=OLLAMA_BASE_URL, model=model or OLLAMA_MODEL,
+            timeout=LLM_REQUEST_TIMEOUT, keep_alive=OLLAMA_KEEP_ALIVE,
+        )
+    if backend == "gemini":
+        if not GOOGLE_API_KEY:
+            raise ValueError("GOOGLE_API_KEY .env dosyasında bulunamadı!")
+        return LLMFactory.create_chat_model(
+            backend="gemini", api_key=GOOGLE_API_KEY, model=model or "gemini-2.5-flash",
+            timeout=LLM_REQUEST_TIMEOUT,
+        )
+    raise ValueError(f"Unknown model spec: {spec} (expected 'ollama:<model>' or 'gemini:<model>')")
+
+
+def evaluate_question(question: Dict[str, Any], llm, top_k: int, prompt: Dict[str, str]) -> Dict[str, Any]:
+    from app.core.config import DB_PATH
+    from app.services.agent import build_agent
+    from app.services.schema_context import resolve_schema_description
+
+    handler = EvalCallbackHandler()
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"id": question["id"]}
+    schema = ""
+    try:
+        # Şema burada bir kez çözülüp agent'a verilir, böylece getirilen tablolar kaydedilebilir
+        schema = resolve_schema_description(question["question"], use_rag=top_k > 0, top_k=max(top_k, 1))
+        agent, _ = build_agent(
+            user_query=question["question"], user_schema=schema, use_rag=False, llm=llm, **prompt
+        )
+        result = agent.invoke({"input": question["question"]}, config={"callbacks": [handler]})
+        output = result.get("output", "")
+        if isinstance(output, list):
+            output = " ".join(item.get("text", "") if isinstance(item, dict) else str(item) for item in output)
+        match = _SQL_BLOCK.search(str(output))
+        record["sql"] = match.group(1).strip() if match else None
+        record["error"] = None
+    except Exception as e:
+        record["sql"] = None
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_s"] = round(time.perf_counter() - started, 3)
+
+    correct, mismatch = check_result(DB_PATH, record["sql"], question["sql"]) if record["error"] is None else (False, None)
+    record.update({
+        "correct": correct,
+        "mismatch": mismatch,
+        "llm_calls": handler.llm_calls,
+        "iterations": handler.iterations,
+        "prompt_tokens": handler.prompt_tokens,
+        "completion_tokens": handler.completion_tokens,
+        "tools": handler.tools,
+        "retrieved_tables": _SCHEMA_TABLE.findall(schema or ""),
+    })
+    return record
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    count = len(records) or 1
+    latencies = sorted(r["latency_s"] for r in records)
+
+    def mean(key: str) -> float:
+        return round(sum(r[key] for r in records) / count, 2)
+
+    return {
+        "questions": len(records),
+        "accuracy": round(sum(r["correct"] for r in records) / count, 3),
+        "errors": sum(r["error"] is not None for r in records),
+        "avg_llm_calls": mean("llm_calls"),
+        "avg_iterations": mean("iterations"),
+        "avg_prompt_tokens": mean("prompt_tokens"),
+        "avg_completion_tokens": mean("completion_tokens"),
+        "avg_retrieved_tables": round(sum(len(r["retrieved_tables"]) for r in records) / count, 2),
+        "avg_latency_s": mean("latency_s"),
+        "p50_latency_s": latencies[len(latencies) // 2] if latencies else 0.0,
+    }
+
+
+def recommend(configs: List[Dict[str, Any]], tolerance: float) -> Optional[Dict[str, Any]]:
+    """Fewest tokens (then LLM calls) among configs within tolerance of the best accuracy"""
+    if not configs:
+        return None
+    best_accuracy = max(c["summary"]["accuracy"] for c in configs)
+    eligible = [c for c in configs if c["summary"]["accuracy"] >= best_accuracy - tolerance]
+    return min(
+        eligible,
+        key=lambda c: (
+            c["summary"]["avg_prompt_tokens"] + c["summary"]["avg_completion_tokens"],
+            c["summary"]["avg_llm_calls"],
+        ),
+    )
+
+
+def print_summary(configs: List[Dict[str, Any]], best: Optional[Dict[str, Any]]) -> None:
+    header = (
+        f"{'model':<26}{'top_k':>6} {'prompt':<11}{'acc':>6}{'calls':>7}{'iters':>7}"
+        f"{'prompt tok':>12}{'compl tok':>11}{'tables':>8}{'lat s':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for config in configs:
+        s = config["summary"]
+        marker = "  ← recommended" if config is best else ""
+        print(
+            f"{config['model']:<26}{config['top_k']:>6} {config['prompt']:<11}{s['accuracy']:>6.0%}"
+            f"{s['avg_llm_calls']:>7}{s['avg_iterations']:>7}{s['avg_prompt_tokens']:>12}"
+            f"{s['avg_completion_tokens']:>11}{s['avg_retrieved_tables']:>8}{s['avg_latency_s']:>8}{marker}"
+        )
+        for record in config["records"]:
+            if not record["correct"]:
+                print(f"   ✗ {record['id']}: {record['error'] or record['mismatch']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Text-to-SQL accuracy and cost evaluation on Chinook")
+    parser.add_argument("--models", nargs="+", default=None, help="backend:model, e.g. ollama:llama3.1:8b")
+    parser.add_argument("--top-k", nargs="+", type=int, default=None, help="RAG top_k values (0 = full schema)")
+    parser.add_argument("--prompts", nargs="+", default=["default"], help="Prompt variants: default, no_samples, compact")
+    parser.add_argument("--questions", nargs="+", help="Only these question ids")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.0, help="Accuracy loss accepted for cheaper configs")
+    parser.add_argument("--fake", action="store_true", help="Scripted LLM and hash embeddings (offline smoke run)")
+    parser.add_argument("--output", help="Write per-question records and summaries as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show agent and application output")
+    return parser.parse_args(argv)
+
+
+def run(args: argparse.Namespace, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from app.core.config import LLM_BACKEND, OLLAMA_MODEL, RAG_TOP_K
+
+    if args.fake:
+        from benchmarks.fakes import install_fake_llm
+        install_fake_llm(questions)
+    if any(k > 0 for k in args.top_k or [RAG_TOP_K]):
+        try:
+            from app.services.schema_rag import initialize_schema_rag
+            initialize_schema_rag()
+        except ImportError as e:
+            print(f"⚠ Schema RAG unavailable ({e}); top_k > 0 falls back to the full schema", file=sys.__stdout__)
+
+    variants = prompt_variants()
+    unknown = set(args.prompts) - set(variants)
+    if unknown:
+        raise SystemExit(f"Unknown prompt variant(s): {', '.join(sorted(unknown))}")
+
+    default_model = "gemini:gemini-2.5-flash" if LLM_BACKEND.lower() == "gemini" else f"ollama:{OLLAMA_MODEL}"
+    models = ["fake:scripted"] if args.fake else (args.models or [default_model])
+    configs = []
+    for model_spec, top_k, prompt_name in itertools.product(models, args.top_k or [RAG_TOP_K], args.prompts):
+        llm = create_model(model_spec, args.fake)
+        print(f"▶ {model_spec} top_k={top_k} prompt={prompt_name}", file=sys.__stdout__, flush=True)
+        records = [evaluate_question(q, llm, top_k, variants[prompt_name]) for q in questions]
+        configs.append({
+            "model": model_spec,
+            "top_k": top_k,
+            "prompt": prompt_name,
+            "summary": summarize(records),
+            "records": records,
+        })
+    return configs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        questions = json.load(f)
+    if args.questions:
+        questions = [q for q in questions if q["id"] in set(args.questions)]
+
+    os.environ["LOG_LEVEL"] = "INFO" if args.verbose else "WARNING"
+    os.environ["AGENT_VERBOSE"] = "true" if args.verbose else "false"
+    with contextlib.ExitStack() as stack:
+        if args.fake:
+            # Sahte embedding'ler gerçek şema indeksine yazılmasın
+            data_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="text2sql-eval-"))
+            os.environ["CHROMA_PERSIST_DIRECTORY"] = os.path.join(data_dir, "chroma_db")
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        configs = run(args, questions)
+
+    best = recommend(configs, args.accuracy_tolerance)
+    print_summary(configs, best)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "questions": [q["id"] for q in questions],
+                "recommended": best and {k: best[k] for k in ("model", "top_k", "prompt")},
+                "configs": configs,
+            }, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Deterministic Stand-ins for the LLM Providers
+A scripted chat model and hash-based embeddings that are swapped in behind
+LLMFactory, so the agent, direct SQL generation, schema RAG, the LLM scheduler,
+cache and metrics all run their real code paths without Ollama or Gemini.
+"""
+
+import hashlib
+import math
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.services.llm_factory import LLMFactory
+
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token, the same rule of thumb as prompt_budget
+    return max(1, len(text) // 4)
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Answers with a fixed SQL per known question (matched against the last human
+    message), otherwise with default_sql.
+
+    With the agent's tools bound it first makes tool_rounds tool calls
+    (sql_db_list_tables, then sql_db_schema for the tables in the SQL) and then
+    gives the final ```sql answer, like a well-behaved tool-calling model.
+    With a structured output schema bound (direct mode) it calls that tool once.
+    latency adds a fixed think time per call; token usage is estimated from the
+    text so metrics and evals see realistic counts.
+    """
+
+    responses: Dict[str, Dict[str, Any]] = {}
+    default_sql: str = "SELECT Name FROM Artist ORDER BY Name LIMIT 10"
+    latency: float = 0.0
+    tool_rounds: int = 2
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"tool_rounds": self.tool_rounds, "questions": len(self.responses)}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _answer_for(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        question = next((_text(m) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        for known, answer in self.responses.items():
+            if known in question:
+                return answer
+        return {"sql": self.default_sql, "chart_type": None}
+
+    def _reply(self, messages: List[BaseMessage], tools: List[Dict[str, Any]]) -> AIMessage:
+        answer = self._answer_for(messages)
+        sql = answer["sql"]
+        tool_names = {tool["function"]["name"] for tool in tools}
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+
+        # Structured output (with_structured_output binds the schema as the only tool)
+        if len(tool_names) == 1 and not tool_names & {"sql_db_list_tables", "sql_db_schema", "sql_db_query"}:
+            args = {
+                "sql": sql,
+                "explanation": "Sorgu istenen sonucu getirir.",
+                "chart_type": answer.get("chart_type") or "none",
+            }
+            return AIMessage(content="", tool_calls=[{"name": tool_names.pop(), "args": args, "id": call_id}])
+
+        rounds_done = sum(isinstance(m, ToolMessage) for m in messages)
+        if tool_names and rounds_done < self.tool_rounds:
+            if rounds_done == 0 and "sql_db_list_tables" in tool_names:
+                call = {"name": "sql_db_list_tables", "args": {"tool_input": ""}}
+            else:
+                tables = sorted(set(_TABLE_PATTERN.findall(sql)))
+                call = {"name": "sql_db_schema", "args": {"table_names": ", ".join(tables)}}
+            return AIMessage(content="", tool_calls=[{**call, "id": call_id}])
+
+        return AIMessage(
+            content=(
+                f"```sql\n{sql}\n```\n\n"
+                "Sorguyu onayladığınızda sonuçlar gösterilecektir."
+            )
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._reply(messages, kwargs.get("tools") or [])
+        output_text = _text(message) + str(message.tool_calls or "")
+        message.usage_metadata = {
+            "input_tokens": sum(_estimate_tokens(_text(m)) for m in messages),
+            "output_tokens": _estimate_tokens(output_text),
+            "total_tokens": 0,
+        }
+        message.usage_metadata["total_tokens"] = (
+            message.usage_metadata["input_tokens"] + message.usage_metadata["output_tokens"]
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Bag-of-words feature hashing into a fixed-size unit vector. Deterministic
+    across processes (no PYTHONHASHSEED dependence) and free of network calls;
+    texts sharing words still land close together, so RAG retrieval stays meaningful.
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in _WORD_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class ScriptedProvider:
+    """LLMProvider returning the fakes; cache and callbacks come from LLMFactory as usual"""
+
+    def __init__(self, chat_options: Dict[str, Any], cache=None, callbacks=None):
+        self.chat_options = chat_options
+        self.cache = cache
+        self.callbacks = callbacks
+
+    def create_chat_model(self) -> BaseChatModel:
+        return ScriptedChatModel(cache=self.cache, callbacks=self.callbacks, **self.chat_options)
+
+    def create_embedding_model(self) -> Embeddings:
+        return HashEmbeddings()
+
+
+def install_fake_llm(
+    questions: List[Dict[str, Any]],
+    latency: float = 0.0,
+    tool_rounds: int = 2,
+) -> None:
+    """
+    Route every LLMFactory provider (whatever LLM_BACKEND says) to the fakes.
+    questions: [{"question", "sql", "chart_type"}, ...] scripted answers
+    """
+    chat_options = {
+        "responses": {q["question"]: {"sql": q["sql"], "chart_type": q.get("chart_type")} for q in questions},
+        "latency": latency,
+        "tool_rounds": tool_rounds,
+    }
+
+    def create_provider(backend: str, kwargs: Dict[str, Any]) -> ScriptedProvider:
+        return ScriptedProvider(chat_options, cache=kwargs.get("cache"), callbacks=kwargs.get("callbacks"))
+
+    LLMFactory.reset()
+    LLMFactory._create_provider = staticmethod(create_provider)
@@ -0,0 +1,390 @@
+"""
+Offline Load Test
+Drives /chat, /execute-sql, /upload and /chat-history in-process (ASGI, no
+network) with the scripted LLM and hash embeddings from benchmarks.fakes, the
+Chinook database and synthetic CSV uploads. Reports throughput, p50/p95/p99
+latency and peak RSS per scenario, and compares against a stored baseline.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --concurrency 8 --requests 200
+    python -m benchmarks.load_test --save-baseline local
+    python -m benchmarks.load_test --compare local   # exit code 1 on regression
+
+Baselines are machine-specific and not committed (benchmarks/baselines/ is
+ignored). If --compare names a baseline that does not exist yet, the current
+run is stored under that name and the comparison starts with the next run.
+
+All state (user databases, chroma index, LLM cache, chat memory) lives in a
+temporary directory; backend/data is only read. Set app options with
+--env KEY=VALUE (e.g. --env AGENT_MODE=direct --env LLM_MAX_CONCURRENCY_OLLAMA=4).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+QUESTIONS_PATH = os.path.join(BENCH_DIR, "chinook_questions.json")
+SCENARIOS = ("upload", "chat", "execute-sql", "chat-history")
+
+
+def configure_environment(data_dir: str, memory_backend: str, verbose: bool, overrides: Dict[str, str]) -> None:
+    """Must run before anything from app is imported (config is read at import time)"""
+    os.environ.update({
+        "MEMORY_BACKEND": memory_backend,
+        "LLM_WARMUP_ENABLED": "false",
+        "LLM_CACHE_BACKEND": "none",  # Her istek gerçekten LLM yolundan geçsin
+        "LLM_CACHE_PATH": os.path.join(data_dir, "llm_cache.db"),
+        "SQLITE_MEMORY_PATH": os.path.join(data_dir, "chat_memory.db"),
+        "CHROMA_PERSIST_DIRECTORY": os.path.join(data_dir, "chroma_db"),
+        "USER_DB_DIRECTORY": os.path.join(data_dir, "user_databases"),
+        "PROFILE_DIR": os.path.join(data_dir, "profiles"),
+        "LOG_LEVEL": "INFO" if verbose else "WARNING",
+    })
+    os.environ.update(overrides)
+
+
+def synthetic_csv(rows: int, seed: int = 42) -> bytes:
+    """Sales-like CSV with dates, categories and numbers (deterministic)"""
+    rng = random.Random(seed)
+    regions = ["Marmara", "Ege", "Akdeniz", "İç Anadolu", "Karadeniz", "Doğu Anadolu", "Güneydoğu"]
+    products = [f"Ürün {i:03d}" for i in range(200)]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["order_id", "order_date", "region", "product", "quantity", "unit_price", "discount"])
+    for i in range(rows):
+        writer.writerow([
+            i + 1,
+            f"202{rng.randint(0, 4)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            rng.choice(regions),
+            rng.choice(products),
+            rng.randint(1, 50),
+            round(rng.uniform(5, 500), 2),
+            rng.choice(["", "0.05", "0.1", "0.2"]),
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class RssSampler:
+    """
+    Peak resident set size while a scenario runs. A thread samples
+    /proc/self/statm, so peaks inside blocking code on the event loop are seen;
+    elsewhere it falls back to the process-lifetime ru_maxrss.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def current(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except OSError:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+async def run_scenario(
+    send: Callable[[int], Awaitable[Optional[str]]], total: int, concurrency: int
+) -> Dict[str, Any]:
+    """
+    Issue `total` requests from `concurrency` workers. send(i) returns an error
+    message or None on success.
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+    indices = iter(range(total))
+
+    async def worker() -> None:
+        for i in indices:  # Paylaşılan iterator: her istek bir kez gönderilir
+            started = time.perf_counter()
+            try:
+                error = await send(i)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            latencies.append(time.perf_counter() - started)
+            if error:
+                errors.append(error)
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, total)))))
+        duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "first_error": errors[0][:300] if errors else None,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "mean": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(1000 * percentile(latencies, 50), 2),
+            "p95": round(1000 * percentile(latencies, 95), 2),
+            "p99": round(1000 * percentile(latencies, 99), 2),
+            "max": round(1000 * latencies[-1], 2) if latencies else 0.0,
+        },
+        "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+    }
+
+
+def _response_error(response, check: Callable[[Dict[str, Any]], Optional[str]]) -> Optional[str]:
+    if response.status_code >= 400:
+        return f"HTTP {response.status_code}: {response.text[:200]}"
+    return check(response.json())
+
+
+async def run_benchmarks(args: argparse.Namespace, questions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    from benchmarks.fakes import install_fake_llm
+
+    install_fake_llm(questions, latency=args.llm_latency_ms / 1000.0, tool_rounds=args.tool_rounds)
+    from main import app
+
+    chat_sessions = [f"bench-chat-{i}" for i in range(args.sessions)]
+    results: Dict[str, Dict[str, Any]] = {}
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm-up arka planda sürer; ölçüm hazır olduktan sonra başlar
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+
+            async def chat(i: int) -> Optional[str]:
+                response = await client.post("/api/v1/chat", json={
+                    "query": questions[i % len(questions)]["question"],
+                    "session_id": chat_sessions[i % len(chat_sessions)],
+                })
+                return _response_error(
+                    response,
+                    lambda body: body.get("error") or (None if body.get("sql_query") else "no SQL in answer"),
+                )
+
+            async def execute_sql(i: int) -> Optional[str]:
+                question = questions[i % len(questions)]
+                # Yeni oturum: spekülatif sonuç yok, sorgu gerçekten çalıştırılır
+                response = await client.post("/api/v1/execute-sql", json={
+                    "sql_query": question["sql"],
+                    "session_id": f"bench-exec-{i}",
+                    "chart_type": question.get("chart_type"),
+                })
+                return _response_error(response, lambda body: None if body.get("success") else body.get("error"))
+
+            async def chat_history(i: int) -> Optional[str]:
+                response = await client.get(
+                    "/api/v1/chat-history", params={"session_id": chat_sessions[i % len(chat_sessions)]}
+                )
+                return _response_error(response, lambda body: None)
+
+            upload_body = synthetic_csv(args.upload_rows) if "upload" in args.scenarios else b""
+
+            async def upload(i: int) -> Optional[str]:
+                response = await client.post(
+                    "/api/v1/upload",
+                    params={"session_id": f"bench-upload-{i}"},
+                    files={"file": ("sales.csv", upload_body, "text/csv")},
+                )
+                return _response_error(response, lambda body: None if body.get("success") else body.get("message"))
+
+            scenarios = {
+                "upload": (upload, args.upload_requests),
+                "chat": (chat, args.requests),
+                "execute-sql": (execute_sql, args.requests),
+                "chat-history": (chat_history, args.requests),
+            }
+            if "chat-history" in args.scenarios and "chat" not in args.scenarios:
+                # Geçmişi okunacak oturumlar önce doldurulur (ölçülmez)
+                await run_scenario(chat, len(chat_sessions) * 2, args.concurrency)
+
+            for name in SCENARIOS:
+                if name in args.scenarios:
+                    send, total = scenarios[name]
+                    results[name] = await run_scenario(send, total, args.concurrency)
+                    print(f"  ✓ {name}: {results[name]['throughput_rps']} req/s", file=sys.__stdout__, flush=True)
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_to_baseline(
+    report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float
+) -> List[str]:
+    """Regressions beyond the tolerance (relative) and min_delta_ms (absolute, latency only)"""
+    regressions = []
+    for name, current in report["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        for key in ("p50", "p95", "p99"):
+            now, before = current["latency_ms"][key], base["latency_ms"][key]
+            if now > before * (1 + tolerance) and now - before > min_delta_ms:
+                regressions.append(f"{name}: {key} {before} ms -> {now} ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {base['peak_rss_mb']} -> {current['peak_rss_mb']} MB")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'scenario':<14}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<14}{result['requests']:>7}{result['errors']:>8}{result['throughput_rps']:>10}"
+            f"{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{result['peak_rss_mb']:>9}"
+        )
+        if result["first_error"]:
+            print(f"   ⚠ {result['first_error']}")
+
+
+def save_baseline(report: Dict[str, Any], name: str) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"💾 Baseline saved: {path}")
+    return path
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test with a scripted LLM")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per chat/execute-sql/chat-history scenario")
+    parser.add_argument("--sessions", type=int, default=20, help="Chat sessions the chat requests rotate over")
+    parser.add_argument("--upload-requests", type=int, default=10)
+    parser.add_argument("--upload-rows", type=int, default=50_000)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated think time per LLM call")
+    parser.add_argument("--tool-rounds", type=int, default=2, help="Agent tool calls before the final answer")
+    parser.add_argument("--memory-backend", default="in-memory", choices=("in-memory", "sqlite", "redis"))
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app settings")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store the report as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against baselines/NAME.json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore latency changes below this")
+    parser.add_argument("--verbose", action="store_true", help="Show the application's own log output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    overrides = dict(item.split("=", 1) for item in args.env)
+
+    with open(QUESTIONS_PATH, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="text2sql-bench-") as data_dir:
+        configure_environment(data_dir, args.memory_backend, args.verbose, overrides)
+        print(f"🏁 Benchmark: {', '.join(args.scenarios)} (concurrency={args.concurrency})")
+        app_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with app_output:
+            scenarios = asyncio.run(run_benchmarks(args, questions))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": _git_revision(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "sessions": args.sessions,
+            "upload_requests": args.upload_requests,
+            "upload_rows": args.upload_rows,
+            "llm_latency_ms": args.llm_latency_ms,
+            "tool_rounds": args.tool_rounds,
+            "memory_backend": args.memory_backend,
+            "env": overrides,
+        },
+        "scenarios": scenarios,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        save_baseline(report, args.save_baseline)
+
+    if args.compare:
+        path = os.path.join(BASELINE_DIR, f"{args.compare}.json")
+        if not os.path.exists(path):
+            # Baseline'lar makineye özgü, repoya konmaz: ilk koşu baseline olur
+            print(f"ℹ No baseline '{args.compare}' yet; this run becomes the baseline")
+            save_baseline(report, args.compare)
+            return 0
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != report["config"]:
+            print("⚠ Baseline was recorded with different settings; comparison may be misleading")
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) vs baseline '{args.compare}' ({baseline.get('revision')}):")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✓ No regressions vs baseline '{args.compare}' ({baseline.get('revision')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
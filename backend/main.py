@@ -1,25 +1,47 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1.endpoints import chat, upload
+from app.core.logging_config import RequestContextMiddleware, setup_logging
+
+# Router modülleri import sırasında log yazar; kuyruk handler'ı önce kurulur
+setup_logging()
+
+from app.api.v1.endpoints import admin, chat, upload
+from app.services.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+from app.services.profiler import ProfilingMiddleware
+from app.services.warmup import get_warmup_state, start_warmup
 from contextlib import asynccontextmanager
+import logging
+
+logger = logging.getLogger("app")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
-    print("🚀 Starting AI Text-to-SQL Agent...")
+    logger.info("🚀 Starting AI Text-to-SQL Agent...")
+    
+    # Verify chat memory backend (falls back to in-memory if Redis is unreachable)
+    await chat.init_memory_backend()
+    
+    # Chinook reflection, query templates, Schema RAG and LLM warm-up run in the
+    # background; the server accepts traffic now and /ready reports completion
+    warmup_task = start_warmup()
     
-    # Initialize Schema RAG system
-    try:
-        from app.services.schema_rag import initialize_schema_rag
-        initialize_schema_rag()
-    except Exception as e:
-        print(f"⚠ Schema RAG initialization failed: {e}")
+    # Yüklenen oturum veritabanları: TTL, kota (LRU) ve sıkıştırma
+    from app.services.session_janitor import get_session_janitor
+    get_session_janitor().start()
     
     yield
     
     # Shutdown
-    print("👋 Shutting down AI Text-to-SQL Agent...")
+    if not warmup_task.done():
+        warmup_task.cancel()
+    get_session_janitor().stop()
+    await chat.close_memory_backend()
+    from app.services.speculative import get_speculative_executor
+    get_speculative_executor().shutdown()
+    logger.info("👋 Shutting down AI Text-to-SQL Agent...")
 
 app = FastAPI(
     title="AI Text-to-SQL Agent",
@@ -34,23 +56,47 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+# En dışta: request_id diğer middleware'ler ve endpoint'ler çalışmadan önce atanır
+app.add_middleware(RequestContextMiddleware)
+
 # Router'ları ekle
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
 app.include_router(upload.router, prefix="/api/v1", tags=["Upload"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 
 @app.get("/")
 def read_root():
     return {"message": "AI SQL Agent API Çalışıyor. /docs adresine gidin."}
 
+@app.get("/health", include_in_schema=False)
+def health():
+    """Liveness: the process is up and serving, regardless of warm-up"""
+    return {"status": "ok"}
+
+@app.get("/ready", include_in_schema=False)
+def ready():
+    """Readiness: 503 until the background warm-up has finished"""
+    state = get_warmup_state()
+    return JSONResponse(state.snapshot(), status_code=200 if state.ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
-    import uvicorn
-    # Reload sadece geliştirme ortamında true olmalı
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # SERVER_MODE=development: tek process + reload; production: fork öncesi yükleme + SERVER_WORKERS worker
+    from app.core.server import run
+    run(app)
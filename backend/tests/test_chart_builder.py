@@ -0,0 +1,147 @@
+import sqlite3
+
+import pytest
+
+from app.core.config import DB_PATH
+from app.services.chart_builder import OTHER_LABEL, ChartBuilder, is_additive, is_id_column, lttb
+
+
+def _build_sql(sql, chart_type=None):
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(sql)
+        builder = ChartBuilder(chart_type)
+        builder.set_columns([column[0] for column in cursor.description])
+        builder.add_rows(cursor.fetchall())
+        return builder.build()
+    finally:
+        conn.close()
+
+
+def _build(columns, rows, **kwargs):
+    builder = ChartBuilder(**kwargs)
+    builder.set_columns(columns)
+    builder.add_rows(rows)
+    return builder.build()
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    points = [(float(x), 0.0) for x in range(1000)]
+    points[437] = (437.0, 100.0)
+    sampled = lttb(points, 50)
+    assert len(sampled) == 50
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (437.0, 100.0) in sampled
+    assert [x for x, _ in sampled] == sorted(x for x, _ in sampled)
+
+
+def test_lttb_returns_small_series_unchanged():
+    points = [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)]
+    assert lttb(points, 10) == points
+    assert lttb(points, 2) == points
+
+
+@pytest.mark.parametrize("column, additive", [
+    ("total_sales", True),
+    ("COUNT(*)", True),
+    ("SUM(Total)", True),
+    ("adet", True),
+    ("AVG(Total)", False),
+    ("avg_price", False),
+    ("UnitPrice", False),
+    ("ortalama_tutar", False),
+    ("iade_oranı", False),
+    ("conversion_rate", False),
+    ("MAX(Milliseconds)", False),
+])
+def test_is_additive(column, additive):
+    assert is_additive(column) is additive
+
+
+def test_additive_categories_sum_repeats_and_bucket_the_tail():
+    rows = [(f"c{i}", i) for i in range(20)] + [("c0", 5)]
+    chart = _build(["category", "total"], rows, max_categories=5)
+    assert chart.chart_type == "bar" and chart.reduced
+    names = [point["name"] for point in chart.data]
+    assert names == ["c19", "c18", "c17", "c16", OTHER_LABEL]
+    assert chart.data[-1]["value"] == sum(range(16)) + 5
+    assert sum(point["value"] for point in chart.data) == sum(range(20)) + 5
+
+
+def test_non_additive_categories_average_repeats_without_other_bucket():
+    rows = [(f"c{i}", float(i)) for i in range(20)] + [("c19", 1.0)]
+    chart = _build(["category", "avg_price"], rows, max_categories=5)
+    names = [point["name"] for point in chart.data]
+    assert OTHER_LABEL not in names
+    assert names == ["c18", "c17", "c16", "c15", "c14"]
+
+    chart = _build(["category", "avg_price"], [("a", 10.0), ("a", 20.0), ("b", 4.0)])
+    assert chart.data == [{"name": "a", "value": 15.0}, {"name": "b", "value": 4.0}]
+
+
+def test_small_category_result_keeps_query_order():
+    chart = _build(["name", "cnt"], [("z", 1), ("a", 3), ("m", 2)])
+    assert [point["name"] for point in chart.data] == ["z", "a", "m"]
+    assert not chart.reduced
+
+
+def test_time_series_rolls_up_days_to_months():
+    rows = [(f"2024-{m:02d}-{d:02d}", 1) for m in range(1, 13) for d in range(1, 29)]
+    chart = _build(["day", "orders"], rows, max_points=20)
+    assert chart.chart_type == "line"
+    assert [point["name"] for point in chart.data] == [f"2024-{m:02d}" for m in range(1, 13)]
+    assert all(point["value"] == 28 for point in chart.data)
+
+
+def test_time_series_rollup_averages_non_additive_measures():
+    rows = [(f"2024-01-{d:02d}", 10.0) for d in range(1, 11)] + [(f"2024-02-{d:02d}", 30.0) for d in range(1, 31)]
+    chart = _build(["day", "avg_basket"], rows, max_points=5)
+    assert chart.data == [{"name": "2024-01", "value": 10.0}, {"name": "2024-02", "value": 30.0}]
+
+
+def test_numeric_axis_is_downsampled_with_lttb():
+    rows = [(x, x % 7) for x in range(1000)]
+    chart = _build(["x", "y"], rows, max_points=100)
+    assert chart.chart_type == "line" and len(chart.data) == 100
+    assert chart.data[0]["name"] == "0" and chart.data[-1]["name"] == "999"
+
+
+def test_single_column_or_non_numeric_results_have_no_chart():
+    assert _build(["name"], [("a",), ("b",)]) is None
+    assert _build(["name", "city"], [("a", "x")]) is None
+
+
+@pytest.mark.parametrize("column, is_id", [
+    ("CustomerId", True),
+    ("customer_id", True),
+    ("id", True),
+    ("ID", True),
+    ("TrackID", True),
+    ("Total", False),
+    ("paid", False),
+    ("valid_count", False),
+])
+def test_is_id_column(column, is_id):
+    assert is_id_column(column) is is_id
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT CustomerId, FirstName, LastName, SupportRepId FROM Customer",
+    "SELECT InvoiceId, CustomerId, Total FROM Invoice",
+    "SELECT FirstName, CustomerId FROM Customer",
+])
+def test_plain_row_listings_get_no_chart(sql):
+    assert _build_sql(sql) is None
+
+
+def test_aggregate_result_is_charted_without_hint():
+    chart = _build_sql("SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry")
+    assert chart is not None and chart.chart_type == "bar"
+    assert chart.data[0]["name"] == "USA"
+
+
+def test_hinted_result_never_uses_id_columns_as_measure_or_axis():
+    assert _build_sql("SELECT CustomerId, FirstName, LastName, SupportRepId FROM Customer", "bar") is None
+    chart = _build_sql("SELECT InvoiceId, CustomerId, Total FROM Invoice WHERE InvoiceId <= 3", "line")
+    assert [point["name"] for point in chart.data] == ["1", "2", "3"]
+    assert chart.data[0]["value"] == 1.98
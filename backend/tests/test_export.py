@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import sqlite3
+
+import pytest
+
+from app.services.export import open_export_cursor, stream_export
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """2500 rows (three fetch batches) with type changes after the first batch"""
+    path = str(tmp_path / "mixed.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER, amount, label, late, blob)")
+    rows = []
+    for i in range(2500):
+        amount = 1.5 if i == 1500 else i          # REAL after INTEGERs
+        label = "n/a" if i == 2200 else i * 10     # text in a numeric column
+        late = i if i >= 1000 else None            # NULL-only first batch
+        rows.append((i, amount, label, late, b"\x00\x01" if i == 0 else None))
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _export(db_path, fmt, sql="SELECT * FROM t ORDER BY id"):
+    return b"".join(stream_export(open_export_cursor(db_path, sql), fmt))
+
+
+def test_csv_has_bom_header_and_all_rows(db_path):
+    text = _export(db_path, "csv").decode("utf-8")
+    assert text.startswith("﻿id,amount,label,late,blob")
+    rows = list(csv.reader(io.StringIO(text.lstrip("﻿"))))
+    assert len(rows) == 2501
+    assert rows[1501][1] == "1.5"
+
+
+def test_json_is_an_array_of_row_objects(db_path):
+    data = json.loads(_export(db_path, "json"))
+    assert len(data) == 2500
+    assert data[0] == {"id": 0, "amount": 0, "label": 0, "late": None, "blob": "AAE="}
+    assert data[2200]["label"] == "n/a"
+
+
+def test_json_empty_result(db_path):
+    assert json.loads(_export(db_path, "json", "SELECT * FROM t WHERE id < 0")) == []
+
+
+def test_parquet_widens_types_across_batches(db_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(_export(db_path, "parquet")))
+    types = {field.name: str(field.type) for field in table.schema}
+    assert types == {
+        "id": "int64",
+        "amount": "double",
+        "label": "string",
+        "late": "int64",
+        "blob": "binary",
+    }
+    assert table.num_rows == 2500
+    columns = table.to_pydict()
+    assert columns["amount"][1500] == 1.5
+    assert columns["amount"][10] == 10.0
+    assert columns["label"][:2] == ["0", "10"]
+    assert columns["label"][2200] == "n/a"
+    assert columns["late"][999] is None and columns["late"][1000] == 1000
+
+
+def test_parquet_null_only_and_empty_columns_are_strings(db_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(_export(db_path, "parquet", "SELECT id, NULL AS empty_col FROM t")))
+    assert str(table.schema.field("empty_col").type) == "string"
+    assert table.num_rows == 2500
+
+    empty = pq.read_table(io.BytesIO(_export(db_path, "parquet", "SELECT * FROM t WHERE id < 0")))
+    assert empty.num_rows == 0
+    assert empty.column_names == ["id", "amount", "label", "late", "blob"]
+
+
+def test_xlsx_contains_all_rows(db_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.load_workbook(io.BytesIO(_export(db_path, "xlsx")), read_only=True)
+    rows = list(workbook["Results"].iter_rows(values_only=True))
+    assert rows[0] == ("id", "amount", "label", "late", "blob")
+    assert len(rows) == 2501
+
+
+def test_stream_export_closes_connection_when_abandoned(db_path):
+    export = open_export_cursor(db_path, "SELECT * FROM t")
+    chunks = stream_export(export, "csv")
+    next(chunks)
+    chunks.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        export.conn.execute("SELECT 1")
+
+
+def test_xlsx_encodes_blobs_and_drops_control_characters(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "odd.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (name, data)")
+    conn.execute("INSERT INTO t VALUES (?, ?)", ("a\x00b", b"\x00\x01"))
+    conn.commit()
+    conn.close()
+
+    workbook = openpyxl.load_workbook(io.BytesIO(_export(path, "xlsx", "SELECT * FROM t")), read_only=True)
+    assert list(workbook["Results"].iter_rows(values_only=True))[1] == ("ab", "AAE=")
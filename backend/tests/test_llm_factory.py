@@ -0,0 +1,49 @@
+import pytest
+
+from app.core.config import OLLAMA_BASE_URL, OLLAMA_EMBEDDING_MODEL, OLLAMA_KEEP_ALIVE, LLM_REQUEST_TIMEOUT
+from app.services.llm_factory import LLMFactory, _keep_alive_seconds
+
+
+@pytest.fixture(autouse=True)
+def fresh_factory():
+    LLMFactory.reset()
+    yield
+    LLMFactory.reset()
+
+
+def test_ollama_embedding_model_builds_with_default_config():
+    pytest.importorskip("langchain_ollama")
+    embeddings = LLMFactory.create_embedding_model(
+        backend="ollama",
+        base_url=OLLAMA_BASE_URL,
+        embedding_model=OLLAMA_EMBEDDING_MODEL,
+        timeout=LLM_REQUEST_TIMEOUT,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+    )
+    assert embeddings.embeddings.keep_alive == _keep_alive_seconds(OLLAMA_KEEP_ALIVE)
+
+
+def test_ollama_chat_model_keeps_duration_string():
+    pytest.importorskip("langchain_ollama")
+    model = LLMFactory.create_chat_model(backend="ollama", keep_alive="30m")
+    assert model.keep_alive == "30m"
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("30m", 1800),
+    ("1h30m", 5400),
+    ("45s", 45),
+    ("300", 300),
+    ("-1", -1),
+    ("-1m", -60),
+    (120, 120),
+    (None, None),
+])
+def test_keep_alive_seconds(value, seconds):
+    assert _keep_alive_seconds(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "forever", "30x", "5m garbage"])
+def test_keep_alive_seconds_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        _keep_alive_seconds(value)
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.caches import InMemoryCache
+from langchain_core.language_models.fake_chat_models import ParrotFakeChatModel
+
+from app.services.llm_factory import _build_chat_model
+from app.services.llm_scheduler import (
+    LLMDeadlineExceededError, LLMQueueFullError, LLMScheduler, admission_controlled,
+)
+
+
+def _wait_queued(scheduler, n):
+    for _ in range(200):
+        if scheduler.stats()["queued"] == n:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"expected {n} queued waiters, got {scheduler.stats()['queued']}")
+
+
+def test_acquire_within_limit_does_not_queue():
+    scheduler = LLMScheduler("test", max_concurrency=2, max_queue=0)
+    scheduler.acquire("a")
+    scheduler.acquire("b")
+    assert scheduler.stats()["active"] == 2
+    with pytest.raises(LLMQueueFullError) as excinfo:
+        scheduler.acquire("c")
+    assert excinfo.value.retry_after >= 1
+    scheduler.release()
+    scheduler.release()
+    assert scheduler.stats()["active"] == 0
+
+
+def test_deadline_exceeded_leaves_queue_empty():
+    scheduler = LLMScheduler("test", max_concurrency=1, max_queue=4)
+    scheduler.acquire("a")
+    with pytest.raises(LLMDeadlineExceededError):
+        scheduler.acquire("b", deadline=time.monotonic() + 0.05)
+    stats = scheduler.stats()
+    assert stats["queued"] == 0
+    assert stats["waiting_sessions"] == 0
+    assert stats["timed_out"] == 1
+
+
+def test_slots_are_handed_out_round_robin_across_sessions():
+    scheduler = LLMScheduler("test", max_concurrency=1, max_queue=8)
+    scheduler.acquire("holder")
+    order = []
+    threads = []
+    for i, session in enumerate(["a", "a", "b"]):
+        def worker(session=session):
+            scheduler.acquire(session)
+            order.append(session)
+            scheduler.release()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        threads.append(thread)
+        _wait_queued(scheduler, i + 1)
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order == ["a", "b", "a"]
+    assert scheduler.stats()["active"] == 0
+
+
+def _model(scheduler):
+    return _build_chat_model(ParrotFakeChatModel, scheduler, cache=InMemoryCache())
+
+
+def test_cache_hits_bypass_admission():
+    scheduler = LLMScheduler("test", max_concurrency=1, max_queue=0)
+    model = _model(scheduler)
+    model.invoke("hello")  # miss: takes and returns the slot, fills the cache
+    assert scheduler.stats()["active"] == 0
+
+    scheduler.acquire("busy")  # every slot taken, no queue room
+    assert model.invoke("hello").content == "hello"
+    with pytest.raises(LLMQueueFullError):
+        model.invoke("not cached")
+    scheduler.release()
+
+
+def test_metadata_sets_fairness_key_and_deadline():
+    scheduler = LLMScheduler("test", max_concurrency=1, max_queue=4)
+    model = _model(scheduler)
+    scheduler.acquire("busy")
+    config = {"metadata": {"session_id": "s1", "deadline": time.monotonic() + 0.05}}
+    with pytest.raises(LLMDeadlineExceededError):
+        model.invoke("hi", config=config)
+    scheduler.release()
+
+
+def test_async_call_takes_a_single_slot():
+    # _agenerate falls back to _generate in an executor; it must not queue for a second slot
+    scheduler = LLMScheduler("test", max_concurrency=1, max_queue=0)
+    model = _model(scheduler)
+    assert asyncio.run(model.ainvoke("hi")).content == "hi"
+    assert scheduler.stats()["active"] == 0
+
+
+def test_admission_class_keeps_serialized_identity():
+    model_cls = admission_controlled(ParrotFakeChatModel)
+    assert admission_controlled(ParrotFakeChatModel) is model_cls
+    assert model_cls.__name__ == ParrotFakeChatModel.__name__
+    assert model_cls().model_dump() == ParrotFakeChatModel().model_dump()
+
+
+def test_process_slots_are_shared_between_holders(tmp_path):
+    pytest.importorskip("fcntl")
+    from app.services.llm_scheduler import ProcessSlots
+
+    # Two instances open their own descriptors, like two worker processes
+    first = ProcessSlots(str(tmp_path), "ollama", 2)
+    second = ProcessSlots(str(tmp_path), "ollama", 2)
+    assert first.try_acquire()
+    assert second.try_acquire()
+    assert not first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release()
+    second.release()
+
+
+def test_process_slot_is_freed_when_holder_dies(tmp_path):
+    pytest.importorskip("fcntl")
+    import os
+    from app.services.llm_scheduler import ProcessSlots
+
+    slots = ProcessSlots(str(tmp_path), "ollama", 1)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = slots.try_acquire()
+        os.write(write_fd, b"1" if ok else b"0")
+        time.sleep(10)
+        os._exit(0)
+    assert os.read(read_fd, 1) == b"1"
+    assert not slots.try_acquire()
+    os.kill(pid, 9)
+    os.waitpid(pid, 0)
+    assert slots.try_acquire()
+    slots.release()
+
+
+def test_scheduler_waits_for_server_wide_slot(tmp_path):
+    pytest.importorskip("fcntl")
+    from app.services.llm_scheduler import ProcessSlots
+
+    other_worker = ProcessSlots(str(tmp_path), "ollama", 1)
+    scheduler = LLMScheduler(
+        "ollama", max_concurrency=1, max_queue=4,
+        shared_slots=ProcessSlots(str(tmp_path), "ollama", 1),
+    )
+    assert other_worker.try_acquire()
+    with pytest.raises(LLMDeadlineExceededError):
+        scheduler.acquire("s", deadline=time.monotonic() + 0.1)
+    assert scheduler.stats()["active"] == 0  # local slot given back
+
+    threading.Timer(0.1, other_worker.release).start()
+    scheduler.acquire("s", deadline=time.monotonic() + 2)
+    assert not other_worker.try_acquire()
+    scheduler.release()
+    assert other_worker.try_acquire()
+    other_worker.release()
@@ -0,0 +1,29 @@
+from benchmarks.load_test import compare_to_baseline, percentile
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+    assert percentile([7.0], 99) == 7
+    assert percentile([], 50) == 0.0
+
+
+def _scenario(p95: float, rps: float = 100.0, rss: float = 100.0, errors: int = 0) -> dict:
+    return {
+        "latency_ms": {"p50": 10.0, "p95": p95, "p99": p95},
+        "throughput_rps": rps,
+        "peak_rss_mb": rss,
+        "errors": errors,
+    }
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"scenarios": {"chat": _scenario(20.0)}}
+    assert compare_to_baseline({"scenarios": {"chat": _scenario(23.0)}}, baseline, 0.2, 5.0) == []
+    regressions = compare_to_baseline({"scenarios": {"chat": _scenario(40.0, errors=1)}}, baseline, 0.2, 5.0)
+    assert any("p95" in line for line in regressions)
+    assert any("errors" in line for line in regressions)
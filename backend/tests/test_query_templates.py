@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from app.core.config import BASE_DIR, DB_PATH
+from app.services.query_templates import QueryTemplateMatcher
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    with open(os.path.join(BASE_DIR, "data", "schema_metadata.json"), encoding="utf-8") as f:
+        metadata = json.load(f)
+    return QueryTemplateMatcher(metadata, DB_PATH)
+
+
+@pytest.mark.parametrize("question, template_id", [
+    ("en çok satan 5 sanatçı", "top_artists_by_sales"),
+    ("top 5 selling albums", "top_albums_by_sales"),
+    ("türe göre satışlar", "sales_by_genre"),
+    ("ülkelere göre gelir", "revenue_by_country"),
+    ("sales by year", "yearly_sales"),
+    ("aylık satışlar", "monthly_sales"),
+    ("which employees have the most customers", "top_employees_by_customers"),
+])
+def test_matches_common_questions(matcher, question, template_id):
+    match = matcher.match(question)
+    assert match is not None
+    assert match.template_id == template_id
+
+
+def test_fills_slots(matcher):
+    match = matcher.match("2022 yılında Almanya'da en çok satan 3 sanatçı")
+    assert match.slots == {"year": "2022", "n": 3, "country": "Germany"}
+    assert "Invoice.BillingCountry = 'Germany'" in match.sql
+    assert "strftime('%Y', Invoice.InvoiceDate) = '2022'" in match.sql
+    assert match.sql.endswith("LIMIT 3")
+
+
+@pytest.mark.parametrize("question", [
+    # Ters sıralama: şablonların hepsi DESC
+    "satışı en düşük 5 sanatçı",
+    "en az satan 5 albüm",
+    "least selling artists",
+    "lowest revenue countries",
+    "bottom 5 albums by sales",
+    # Olumsuzlama: şablonlar eşitlikle filtreler
+    "top 5 artists excluding USA",
+    "USA hariç en çok satan sanatçılar",
+    "Almanya dışında en çok satan albümler",
+    "top selling tracks except Brazil",
+])
+def test_inverse_and_negated_questions_fall_through(matcher, question):
+    assert matcher.match(question) is None
+
+
+@pytest.mark.parametrize("question", [
+    "AC/DC albümlerinin satışları",  # tanınmayan özel isim
+    "Rock türünde en çok satan albümler",
+    "en çok satan 5 ve 10 albüm",  # birden fazla sayı
+    "2022 ve 2023 aylık satışlar",  # birden fazla yıl
+    "2010 yılında en çok satan sanatçılar",  # veritabanında olmayan yıl
+    "en çok satan 500 albüm",  # MAX_LIMIT üstü
+])
+def test_ambiguous_questions_fall_through(matcher, question):
+    assert matcher.match(question) is None
+
+
+def test_limit_needs_top_marker_or_entity_noun(matcher):
+    assert matcher.match("top 10 artists by sales").slots == {"n": 10}
+    assert matcher.match("ilk 10 albüm satış").slots == {"n": 10}
+    assert matcher.match("en uzun 7 parça").sql.endswith("LIMIT 7")
+
+
+@pytest.mark.parametrize("question", [
+    # Sayı LIMIT değil, karşılaştırma / birim
+    "revenue by country for tracks longer than 5 minutes",
+    "artists with sales over 40",
+    "40'tan fazla satan albümler",
+    "tracks sold 3 times",
+    # Toplama: şablonlar tek bir sıralı ölçü döndürür
+    "average sales per artist",
+    "how many tracks sold",
+    "sanatçı başına ortalama satış",
+    "kaç albüm satıldı",
+    "percentage of sales by genre",
+    # Şablonun kapsamadığı gruplama
+    "top artists by sales by year",
+    "yıllara göre en çok satan sanatçılar",
+    # Tanınmayan küçük harfli filtre değeri
+    "top artists by sales in rock genre",
+    "en çok satan metal albümleri",
+])
+def test_questions_the_templates_cannot_answer_fall_through(matcher, question):
+    assert matcher.match(question) is None
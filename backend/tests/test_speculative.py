@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.services.speculative import SpeculativeExecutor, _Speculation
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "s.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (name TEXT, total INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [("a", 3), ("b", 5), ("c", 1)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def executor():
+    executor = SpeculativeExecutor(max_rows=100, time_budget=2.0, result_ttl=60.0, max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_matching_approval_reuses_the_result(executor, db_path):
+    executor.start("s", "SELECT name, total FROM t ORDER BY total DESC", db_path)
+    # Whitespace and a trailing semicolon do not change the query
+    result = asyncio.run(executor.take("s", "SELECT name, total\n  FROM t ORDER BY total DESC;", db_path))
+    assert result is not None
+    assert [row["name"] for row in result.rows] == ["b", "a", "c"]
+    assert executor.stats() == {"pending": 0, "hits": 1, "misses": 0}
+
+
+def test_edited_sql_is_a_miss(executor, db_path):
+    executor.start("s", "SELECT * FROM t", db_path)
+    assert asyncio.run(executor.take("s", "SELECT name FROM t", db_path)) is None
+    assert executor.stats()["misses"] == 1
+    assert executor.stats()["pending"] == 1  # still waiting for its own approval
+
+
+def test_take_cancels_entry_whose_future_is_not_set_yet(executor):
+    speculation = _Speculation("SELECT 1", "unused.db")
+    executor._entries["s"] = speculation
+    assert asyncio.run(executor.take("s", "SELECT 1", "unused.db")) is None
+    assert speculation.cancel_event.is_set()
+    # The run, if it is submitted afterwards, exits immediately
+    assert executor._run(speculation, None) is None
+
+
+def test_new_proposal_cancels_the_previous_one(executor, db_path):
+    executor.start("s", "SELECT * FROM t", db_path)
+    first = executor._entries["s"]
+    executor.start("s", "SELECT name FROM t", db_path)
+    assert first.cancel_event.is_set()
+    assert executor._entries["s"].future is not None
+
+
+def test_discard_cancels(executor, db_path):
+    executor.start("s", "SELECT * FROM t", db_path)
+    speculation = executor._entries["s"]
+    executor.discard("s")
+    assert speculation.cancel_event.is_set()
+    assert executor.stats()["pending"] == 0
+
+
+def test_writes_are_never_speculated(executor, db_path):
+    executor.start("s", "DELETE FROM t", db_path)
+    assert "s" not in executor._entries
+
+
+def test_result_from_another_database_is_not_reused(executor, db_path, tmp_path):
+    executor.start("s", "SELECT * FROM t", db_path)
+    speculation = executor._entries["s"]
+    assert asyncio.run(executor.take("s", "SELECT * FROM t", str(tmp_path / "uploaded.db"))) is None
+    assert speculation.cancel_event.is_set()
+    assert executor.stats() == {"pending": 0, "hits": 0, "misses": 1}
+
+
+def test_replacing_the_session_database_discards_its_speculation(executor, db_path, tmp_path, monkeypatch):
+    from app.services import speculative, user_database
+
+    monkeypatch.setattr(speculative, "_speculative_executor", executor)
+    monkeypatch.setattr(user_database, "USER_DB_DIRECTORY", str(tmp_path))
+    service = user_database.UserDatabaseService()
+    executor.start("s", "SELECT * FROM t", db_path)
+    speculation = executor._entries["s"]
+    service.delete_user_database("s")
+    assert speculation.cancel_event.is_set()
+    assert "s" not in executor._entries
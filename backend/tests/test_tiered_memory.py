@@ -0,0 +1,189 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.services.async_memory import AsyncAbstractChatMemory
+from app.services.history_summary import HistorySummarizer
+from app.services.tiered_memory import TwoTierChatMemory
+
+
+class _FakePublisher:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+
+
+class FakeRedisMemory(AsyncAbstractChatMemory):
+    """AsyncRedisChatMemory stand-in that records which read path was used"""
+
+    def __init__(self, max_messages: int = 200):
+        self.max_messages = max_messages
+        self.lists: Dict[str, List[BaseMessage]] = {}
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.calls: List[str] = []
+        self.redis_client = _FakePublisher()
+
+    async def add_messages(self, session_id, messages):
+        self.calls.append("rpush")
+        history = self.lists.setdefault(session_id, []) + list(messages)
+        trimmed = len(history) - self.max_messages
+        self.lists[session_id] = history[-self.max_messages:]
+        if trimmed > 0 and session_id in self.summaries:
+            self.summaries[session_id]["covered"] -= trimmed
+
+    async def get_messages(self, session_id):
+        self.calls.append("lrange_all")
+        return list(self.lists.get(session_id, []))
+
+    async def _read_last(self, session_id, limit):
+        if limit is None:
+            return await self.get_messages(session_id)
+        self.calls.append(f"lrange_last_{limit}")
+        return list(self.lists.get(session_id, [])[-limit:]) if limit > 0 else []
+
+    async def count_messages(self, session_id):
+        self.calls.append("llen")
+        return len(self.lists.get(session_id, []))
+
+    async def session_exists(self, session_id):
+        self.calls.append("exists")
+        return bool(self.lists.get(session_id))
+
+    async def clear_session(self, session_id):
+        self.lists.pop(session_id, None)
+        self.summaries.pop(session_id, None)
+
+    async def get_summary(self, session_id):
+        self.calls.append("hgetall")
+        summary = self.summaries.get(session_id)
+        return dict(summary) if summary else None
+
+    async def set_summary(self, session_id, content, covered):
+        self.summaries[session_id] = {"content": content, "covered": covered}
+
+
+def _history(n: int) -> List[BaseMessage]:
+    return [HumanMessage(content=f"q{i}") if i % 2 == 0 else AIMessage(content=f"a{i}") for i in range(n)]
+
+
+@pytest.fixture
+def backend():
+    return FakeRedisMemory()
+
+
+@pytest.fixture
+def memory(backend):
+    memory = TwoTierChatMemory(backend, ttl=60)
+    memory._coherent = True  # invalidation subscription is live
+    return memory
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_misses_use_windowed_reads(backend, memory):
+    backend.lists["s"] = _history(50)
+
+    recent = run(memory.get_recent_messages("s", limit=6))
+    assert [m.content for m in recent] == [m.content for m in _history(50)[-6:]]
+    assert run(memory.count_messages("s")) == 50
+    assert run(memory.session_exists("s")) is True
+    assert backend.calls == ["lrange_last_6", "llen"]
+    assert "lrange_all" not in backend.calls
+
+
+def test_cached_window_serves_smaller_windows(backend, memory):
+    backend.lists["s"] = _history(50)
+    run(memory.get_recent_messages("s", limit=10))
+    backend.calls.clear()
+
+    assert len(run(memory.get_recent_messages("s", limit=4))) == 4
+    assert backend.calls == []
+    # A larger window is a miss, fetched with LRANGE -N
+    assert len(run(memory.get_recent_messages("s", limit=20))) == 20
+    assert backend.calls == ["lrange_last_20"]
+
+
+def test_short_history_window_is_complete(backend, memory):
+    backend.lists["s"] = _history(3)
+    run(memory.get_recent_messages("s", limit=10))
+    backend.calls.clear()
+
+    assert run(memory.count_messages("s")) == 3
+    assert len(run(memory.get_messages("s"))) == 3
+    assert backend.calls == []
+
+
+def test_missing_session_is_cached_as_empty(backend, memory):
+    assert run(memory.session_exists("nope")) is False
+    assert run(memory.session_exists("nope")) is False
+    assert run(memory.count_messages("nope")) == 0
+    assert backend.calls == ["exists"]
+
+
+def test_write_through_updates_cached_window(backend, memory):
+    backend.lists["s"] = _history(10)
+    run(memory.get_recent_messages("s", limit=4))
+    run(memory.count_messages("s"))
+    run(memory.add_messages("s", [HumanMessage(content="new q"), AIMessage(content="new a")]))
+    backend.calls.clear()
+
+    recent = run(memory.get_recent_messages("s", limit=3))
+    assert [m.content for m in recent] == ["a9", "new q", "new a"]
+    assert run(memory.count_messages("s")) == 12
+    assert backend.calls == []
+    assert json.loads(backend.redis_client.published[-1][1])["s"] == "s"
+
+
+def test_write_past_cap_reloads_summary(memory, backend):
+    backend.max_messages = 10
+    backend.lists["s"] = _history(10)
+    backend.summaries["s"] = {"content": "old", "covered": 6}
+    assert run(memory.get_summary("s"))["covered"] == 6
+    run(memory.count_messages("s"))
+
+    run(memory.add_messages("s", _history(2)))
+    backend.calls.clear()
+    assert run(memory.get_summary("s"))["covered"] == 4
+    assert backend.calls == ["hgetall"]
+    assert run(memory.count_messages("s")) == 10
+
+
+def test_invalidation_from_other_worker_evicts(backend, memory):
+    backend.lists["s"] = _history(10)
+    run(memory.get_recent_messages("s", limit=4))
+    memory._handle_invalidation(json.dumps({"s": "s", "o": "other-worker"}))
+    backend.calls.clear()
+
+    run(memory.get_recent_messages("s", limit=4))
+    assert backend.calls == ["lrange_last_4"]
+
+
+def test_incoherent_cache_is_bypassed(backend, memory):
+    memory._coherent = False
+    backend.lists["s"] = _history(10)
+    run(memory.get_recent_messages("s", limit=4))
+    run(memory.get_recent_messages("s", limit=4))
+    assert backend.calls == ["lrange_last_4", "lrange_last_4"]
+    assert memory.stats()["sessions"] == 0
+
+
+def test_summarized_turn_reads_only_the_window(backend, memory):
+    backend.lists["s"] = _history(120)
+    backend.summaries["s"] = {"content": "summary", "covered": 110}
+    summarizer = HistorySummarizer(memory, window=10, threshold=40)
+
+    context = run(summarizer.load_context("s"))
+    assert context[0].content == "summary"
+    assert len(context) == 11
+    assert backend.calls == ["hgetall", "llen", "lrange_last_10"]
+
+    backend.calls.clear()
+    run(summarizer.load_context("s"))
+    assert backend.calls == []
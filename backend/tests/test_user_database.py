@@ -0,0 +1,57 @@
+import asyncio
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from app.services import user_database
+from app.services.user_database import UserDatabaseService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_database, "USER_DB_DIRECTORY", str(tmp_path))
+    return UserDatabaseService()
+
+
+def _upload(service, content: bytes, size=None):
+    file = UploadFile(file=io.BytesIO(content), filename="sales.csv", size=size)
+    return asyncio.run(service.process_upload(file, "s1"))
+
+
+def _csv(rows: int) -> bytes:
+    lines = ["id,region,amount"] + [f"{i},region-{i % 7}-{'x' * 40},{i * 1.5}" for i in range(rows)]
+    return "\n".join(lines).encode("utf-8")
+
+
+def test_upload_within_quota(service, monkeypatch):
+    monkeypatch.setattr(user_database, "SESSION_DB_MAX_BYTES", 10 * 1024 * 1024)
+    ok, _, metadata = _upload(service, _csv(100))
+    assert ok and metadata["row_count"] == 100
+    assert service.has_user_database("s1")
+
+
+def test_oversized_file_rejected_before_parsing(service, monkeypatch):
+    monkeypatch.setattr(user_database, "SESSION_DB_MAX_BYTES", 1024)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed an oversized upload")
+
+    monkeypatch.setattr("pandas.read_csv", fail)
+    content = _csv(100)
+    for size in (len(content), None):  # Content-Length yoksa dosyanın kendisi ölçülür
+        ok, message, _ = _upload(service, content, size)
+        assert not ok and "Dosya çok büyük" in message
+    assert not os.listdir(user_database.USER_DB_DIRECTORY)
+
+
+def test_write_aborts_when_database_outgrows_quota(service, monkeypatch):
+    content = _csv(5000)
+    # Ham dosya sınırın altında, ama SQLite'a yazılınca sınırı aşar
+    monkeypatch.setattr(user_database, "SESSION_DB_MAX_BYTES", len(content) // 2)
+    monkeypatch.setattr(UserDatabaseService, "_upload_size", staticmethod(lambda file: 0))
+    ok, message, _ = _upload(service, content)
+    assert not ok and "sınırı aşıyor" in message
+    assert not service.has_user_database("s1")
+    assert not os.listdir(user_database.USER_DB_DIRECTORY)
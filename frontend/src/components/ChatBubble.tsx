@@ -12,7 +12,7 @@ import { getOrCreateSessionId } from '@/lib/api';
 
 interface ChatBubbleProps {
   message: Message;
-  onResultMessage?: (content: string, chartData?: any) => void;
+  onResultMessage?: (content: string, chartData?: any, chartType?: string | null) => void;
 }
 
 export const ChatBubble: React.FC<ChatBubbleProps> = ({ message, onResultMessage }) => {
@@ -70,7 +70,7 @@ export const ChatBubble: React.FC<ChatBubbleProps> = ({ message, onResultMessage
            {/* Chart Rendering (Only for Assistant) */}
            {isAssistant && message.chartData && (
              <div className="mt-2 w-full animate-in fade-in zoom-in duration-300">
-               <ChartRenderer data={message.chartData} />
+               <ChartRenderer data={message.chartData} type={message.chartType || 'bar'} />
              </div>
            )}
            
@@ -80,11 +80,12 @@ export const ChatBubble: React.FC<ChatBubbleProps> = ({ message, onResultMessage
                <SqlApprovalPanel 
                  initialSql={message.sqlQuery} 
                  sessionId={getOrCreateSessionId()}
+                 chartType={message.chartType}
                  onExecutionComplete={(result) => {
                    if (result.success && result.message) {
                      // Notify parent to add result as new message
                      if (onResultMessage) {
-                       onResultMessage(result.message, result.chart_data);
+                       onResultMessage(result.message, result.chart_data, result.chart_type);
                      }
                    }
                  }}
@@ -117,6 +117,7 @@ export const ChatInterface = () => {
         role: 'assistant',
         content: response.answer,
         chartData: response.chart_data,
+        chartType: response.chart_type,
         sqlQuery: response.sql_query,
         requiresApproval: response.requires_approval
       };
@@ -133,12 +134,13 @@ export const ChatInterface = () => {
       setIsLoading(false);
     }
   };
-  const handleResultMessage = (content: string, chartData?: any) => {
+  const handleResultMessage = (content: string, chartData?: any, chartType?: string | null) => {
     const resultMessage: Message = {
       id: `result-${Date.now()}`,
       role: 'assistant',
       content: content,
-      chartData: chartData
+      chartData: chartData,
+      chartType: chartType
     };
     setMessages(prev => [...prev, resultMessage]);
   };
@@ -1,17 +1,19 @@
 import React, { useState } from 'react';
 import { Play, Edit2, Copy, Check, AlertTriangle, Download } from 'lucide-react';
-import { executeSql } from '@/lib/api';
-import { exportToCSV, exportToExcel, exportToJSON } from '@/lib/export';
+import { executeSql, getExportUrl, ExportFormat } from '@/lib/api';
+import { downloadFromUrl } from '@/lib/export';
 
 interface SqlApprovalPanelProps {
   initialSql: string;
   sessionId: string;
+  chartType?: string | null;
   onExecutionComplete?: (result: any) => void;
 }
 
 export default function SqlApprovalPanel({
   initialSql,
   sessionId,
+  chartType,
   onExecutionComplete
 }: SqlApprovalPanelProps) {
   const [sql, setSql] = useState(initialSql);
@@ -19,6 +21,7 @@ export default function SqlApprovalPanel({
   const [executing, setExecuting] = useState(false);
   const [copied, setCopied] = useState(false);
   const [result, setResult] = useState<any>(null);
+  const [executedSql, setExecutedSql] = useState(initialSql);
 
   const handleCopy = () => {
     navigator.clipboard.writeText(sql);
@@ -31,8 +34,9 @@ export default function SqlApprovalPanel({
     setResult(null);
 
     try {
-      const response = await executeSql(sql, sessionId);
+      const response = await executeSql(sql, sessionId, chartType);
       setResult(response);
+      setExecutedSql(sql);
       
       if (onExecutionComplete) {
         onExecutionComplete(response);
@@ -47,6 +51,11 @@ export default function SqlApprovalPanel({
     }
   };
 
+  // Tüm sonuç sunucudan akışla indirilir; /execute-sql sadece önizleme satırlarını döner
+  const handleExport = (format: ExportFormat) => {
+    downloadFromUrl(getExportUrl(executedSql, sessionId, format), `query-results.${format}`);
+  };
+
   return (
     <div className="mt-3 border border-blue-500/30 rounded-lg overflow-hidden bg-gray-900/50">
       {/* Header */}
@@ -143,35 +152,27 @@ export default function SqlApprovalPanel({
             </div>
 
             {/* Export buttons for full result set */}
-            {result.success && Array.isArray(result.data) && result.data.length > 0 && (
+            {result.success && result.row_count > 0 && (
               <div className="flex flex-wrap items-center gap-2">
                 <span className="text-xs text-gray-400 mr-2">
                   Tüm sonuçları indir:
                 </span>
-                <button
-                  type="button"
-                  onClick={() => exportToCSV(result.data, 'query-results.csv')}
-                  className="inline-flex items-center px-2.5 py-1.5 text-xs rounded-md bg-gray-800 hover:bg-gray-700 text-gray-100 border border-gray-700 transition-colors"
-                >
-                  <Download className="w-3 h-3 mr-1" />
-                  CSV
-                </button>
-                <button
-                  type="button"
-                  onClick={() => exportToExcel(result.data, 'query-results.xlsx', 'Results')}
-                  className="inline-flex items-center px-2.5 py-1.5 text-xs rounded-md bg-gray-800 hover:bg-gray-700 text-gray-100 border border-gray-700 transition-colors"
-                >
-                  <Download className="w-3 h-3 mr-1" />
-                  Excel
-                </button>
-                <button
-                  type="button"
-                  onClick={() => exportToJSON(result.data, 'query-results.json')}
-                  className="inline-flex items-center px-2.5 py-1.5 text-xs rounded-md bg-gray-800 hover:bg-gray-700 text-gray-100 border border-gray-700 transition-colors"
-                >
-                  <Download className="w-3 h-3 mr-1" />
-                  JSON
-                </button>
+                {([
+                  ['csv', 'CSV'],
+                  ['xlsx', 'Excel'],
+                  ['json', 'JSON'],
+                  ['parquet', 'Parquet'],
+                ] as [ExportFormat, string][]).map(([format, label]) => (
+                  <button
+                    key={format}
+                    type="button"
+                    onClick={() => handleExport(format)}
+                    className="inline-flex items-center px-2.5 py-1.5 text-xs rounded-md bg-gray-800 hover:bg-gray-700 text-gray-100 border border-gray-700 transition-colors"
+                  >
+                    <Download className="w-3 h-3 mr-1" />
+                    {label}
+                  </button>
+                ))}
               </div>
             )}
           </div>
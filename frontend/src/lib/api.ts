@@ -126,10 +126,24 @@ export async function deleteDatabase(sessionId: string): Promise<void> {
   }
 }
 
+export type ExportFormat = 'csv' | 'json' | 'xlsx' | 'parquet';
+
+/**
+ * URL that streams the full result of an approved query from the server
+ */
+export function getExportUrl(sqlQuery: string, sessionId: string, format: ExportFormat): string {
+  const params = new URLSearchParams({ session_id: sessionId, sql_query: sqlQuery });
+  return `${API_URL}/export/${format}?${params.toString()}`;
+}
+
 /**
  * Execute user-approved SQL query
  */
-export async function executeSql(sqlQuery: string, sessionId: string): Promise<any> {
+export async function executeSql(
+  sqlQuery: string,
+  sessionId: string,
+  chartType?: string | null
+): Promise<any> {
   const response = await fetch(`${API_URL}/execute-sql`, {
     method: 'POST',
     headers: {
@@ -137,7 +151,8 @@ export async function executeSql(sqlQuery: string, sessionId: string): Promise<a
     },
     body: JSON.stringify({
       sql_query: sqlQuery,
-      session_id: sessionId
+      session_id: sessionId,
+      chart_type: chartType ?? null
     }),
   });
 
@@ -107,6 +107,19 @@ function downloadBlob(blob: Blob, filename: string): void {
   URL.revokeObjectURL(url);
 }
 
+/**
+ * Download a file the server streams (e.g. the full query result from /export).
+ * The browser saves the response directly, so the rows never pass through JS memory.
+ */
+export function downloadFromUrl(url: string, filename: string): void {
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = filename;
+  document.body.appendChild(link);
+  link.click();
+  document.body.removeChild(link);
+}
+
 /**
  * Copy data to clipboard as tab-separated values (Excel-compatible)
  */
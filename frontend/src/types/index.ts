@@ -19,6 +19,7 @@ export interface Message {
   role: 'user' | 'assistant';
   content: string;
   chartData?: ChartDataPoint[] | null;
+  chartType?: string | null;
   sqlQuery?: string | null;
   requiresApproval?: boolean;
 }